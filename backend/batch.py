@@ -0,0 +1,248 @@
+# backend/batch.py
+# Profile many datasets at once, one file per worker process.
+# Used by POST /analyze-many and from the command line:
+#
+#     python -m backend.batch exports/ --workers 8 > profiles.ndjson
+#
+# Each finished file is one JSON line; the last line is {"summary": {...}}.
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+
+from shared.eda import build_analysis, profile_csv
+from shared.ingest import SUPPORTED_EXTENSIONS, content_hash, content_hash_file, parse_dataset
+
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", str(os.cpu_count() or 4)))
+
+# Directory the HTTP API may read from; unset = only uploaded files are accepted
+BATCH_ALLOWED_ROOT = os.getenv("BATCH_ALLOWED_ROOT")
+
+# CSV files larger than this are profiled in chunks instead of loaded whole
+STREAMING_EDA_MB = float(os.getenv("STREAMING_EDA_MB", "256"))
+
+
+# --------------------------------------------------
+# Worker side (runs in a child process)
+# --------------------------------------------------
+def profile_source(name: str, data: bytes | None = None, path: str | None = None) -> dict:
+    """
+    EDA result line for one uploaded file (`data`) or file on disk (`path`).
+    Errors are returned in the line, so one bad file never stops a batch.
+    """
+    start = time.perf_counter()
+    try:
+        if path is not None:
+            size = os.path.getsize(path)
+            if path.lower().endswith(".csv") and size > STREAMING_EDA_MB * 1024 * 1024:
+                with open(path, "rb") as f:
+                    dataset_id = content_hash_file(f)
+                analysis = profile_csv(path)
+            else:
+                with open(path, "rb") as f:
+                    data = f.read()
+
+        if data is not None:
+            size = len(data)
+            dataset_id = content_hash(data)
+            df, _ = parse_dataset(data, name)
+            analysis = build_analysis(df)
+
+    except Exception as e:
+        return {
+            "file_name": name,
+            "error": str(e),
+            "seconds": round(time.perf_counter() - start, 4)
+        }
+
+    return {
+        "file_name": name,
+        "dataset_id": dataset_id,
+        "bytes": size,
+        "seconds": round(time.perf_counter() - start, 4),
+        "analysis": analysis
+    }
+
+
+# --------------------------------------------------
+# Parent side
+# --------------------------------------------------
+@dataclass
+class BatchStats:
+    files: int = 0
+    failed: int = 0
+    rows: int = 0
+    bytes: int = 0
+    started: float = 0.0
+
+    def __post_init__(self):
+        self.started = self.started or time.perf_counter()
+
+    def add(self, result: dict):
+        self.files += 1
+        if "error" in result:
+            self.failed += 1
+            return
+        self.rows += result["analysis"]["rows"]
+        self.bytes += result["bytes"]
+
+    def to_dict(self) -> dict:
+        seconds = time.perf_counter() - self.started
+        return {
+            "files": self.files,
+            "succeeded": self.files - self.failed,
+            "failed": self.failed,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "seconds": round(seconds, 4),
+            "files_per_sec": round(self.files / seconds, 2) if seconds else 0.0,
+            "mb_per_sec": round(self.bytes / 1024 / 1024 / seconds, 2) if seconds else 0.0
+        }
+
+
+_POOL: ProcessPoolExecutor | None = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """
+    The shared process pool, started on first use. "spawn" keeps children
+    from inheriting the server's threads and open sockets.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            _POOL = ProcessPoolExecutor(
+                max_workers=BATCH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _POOL
+
+
+def shutdown_pool():
+    """
+    Stops the shared pool's worker processes, dropping files not started yet.
+    A later get_pool() starts a new pool.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def dataset_files(paths: Iterable[str], recursive: bool = False) -> list[str]:
+    """
+    Files to profile: given files as they are, directories expanded to the
+    CSV/Excel files they contain (sorted, optionally recursive).
+    """
+    found = []
+    for path in paths:
+        if not os.path.isdir(path):
+            found.append(path)
+            continue
+        if recursive:
+            walk = ((root, names) for root, _, names in os.walk(path))
+        else:
+            walk = [(path, os.listdir(path))]
+        for root, names in walk:
+            found.extend(
+                os.path.join(root, name) for name in sorted(names)
+                if name.lower().endswith(SUPPORTED_EXTENSIONS)
+                and os.path.isfile(os.path.join(root, name))
+            )
+    return found
+
+
+def allowed_directory(directory: str) -> tuple[str | None, dict | None]:
+    """
+    (real path, error) for a directory named in an HTTP request. Only paths
+    inside BATCH_ALLOWED_ROOT may be read, so clients cannot browse the server.
+    """
+    if not BATCH_ALLOWED_ROOT:
+        return None, {"error": "Directory input is disabled. Set BATCH_ALLOWED_ROOT to enable it."}
+
+    root = os.path.realpath(BATCH_ALLOWED_ROOT)
+    path = os.path.realpath(os.path.join(root, directory))
+    if os.path.commonpath([root, path]) != root:
+        return None, {"error": "Directory is outside BATCH_ALLOWED_ROOT"}
+    if not os.path.isdir(path):
+        return None, {"error": f"Not a directory: {directory}"}
+    return path, None
+
+
+def run_batch(jobs: list[dict], pool: ProcessPoolExecutor | None = None) -> Iterator[dict]:
+    """
+    Yields profile_source results as they finish, then {"summary": ...}.
+    Each job holds profile_source keyword arguments.
+    """
+    pool = pool or get_pool()
+    stats = BatchStats()
+    futures = [pool.submit(profile_source, **job) for job in jobs]
+    try:
+        for future in as_completed(futures):
+            result = future.result()
+            stats.add(result)
+            yield result
+    finally:
+        for future in futures:
+            future.cancel()
+    yield {"summary": stats.to_dict()}
+
+
+def _finite(value):
+    # NaN / inf (e.g. std of a one-row column) have no JSON form: null instead
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def json_line(result: dict) -> str:
+    """
+    One strict-JSON NDJSON line (no bare NaN, which most parsers reject).
+    """
+    return json.dumps(_finite(result), allow_nan=False, default=str) + "\n"
+
+
+# --------------------------------------------------
+# Command line
+# --------------------------------------------------
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m backend.batch",
+        description="Profile CSV/Excel files in parallel and print one JSON line per file."
+    )
+    parser.add_argument("paths", nargs="+", help="files or directories")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="worker processes")
+    parser.add_argument("--recursive", action="store_true", help="also search subdirectories")
+    args = parser.parse_args(argv)
+
+    paths = dataset_files(args.paths, recursive=args.recursive)
+    if not paths:
+        parser.error("no CSV or Excel files found")
+
+    jobs = [{"name": path, "path": path} for path in paths]
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for result in run_batch(jobs, pool):
+            failed += "error" in result
+            sys.stdout.write(json_line(result))
+            sys.stdout.flush()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# backend/concurrency.py
+# Bounded concurrency for LLM calls: a few run, a few wait, the rest get a 429.
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class LLMQueueFull(Exception):
+    def __init__(self, waiting: int, in_flight: int):
+        super().__init__("The AI is busy with other requests. Please try again shortly.")
+        self.waiting = waiting
+        self.in_flight = in_flight
+
+
+class LLMLimiter:
+    """
+    Lets at most `max_in_flight` generations run at once.
+    Up to `max_queue` more wait their turn; beyond that, callers are rejected
+    with LLMQueueFull instead of piling up on the server.
+    """
+
+    def __init__(self, max_in_flight: int, max_queue: int):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    def check(self):
+        """Raises LLMQueueFull if a new caller would have to be rejected."""
+        if self.in_flight >= self.max_in_flight and self.waiting >= self.max_queue:
+            raise LLMQueueFull(self.waiting, self.in_flight)
+
+    @asynccontextmanager
+    async def slot(self, reject: bool = True):
+        """
+        Holds one of the `max_in_flight` slots. reject=False always waits,
+        for callers that are queued elsewhere already (background jobs).
+        """
+        if reject:
+            self.check()
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue
+        }
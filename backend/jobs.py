@@ -0,0 +1,219 @@
+# backend/jobs.py
+# Background LLM jobs: submitting returns a job ID at once, worker threads
+# run the prompts in priority order, and clients poll for the result.
+# The queue is a SQLite table, so queued work survives restarts and several
+# uvicorn workers can share one queue (claiming a job is a single UPDATE).
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Callable
+
+
+JOBS_DB = os.getenv(
+    "JOBS_DB",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "jobs.sqlite")
+)
+LLM_JOB_WORKERS = int(os.getenv("LLM_JOB_WORKERS", "2"))
+
+# Finished jobs are kept this long for polling
+JOB_TTL = float(os.getenv("JOB_TTL", str(24 * 3600)))
+
+# A job "running" for longer than this lost its worker (e.g. the process
+# was restarted) and is queued again
+JOB_LEASE = float(os.getenv("JOB_LEASE", "900"))
+
+FINISHED = ("done", "failed", "cancelled")
+
+_COLUMNS = "id, kind, priority, status, payload, result, error, created_at, started_at, finished_at"
+
+
+class JobQueue:
+    """
+    Priority queue of LLM jobs (higher priority first, then oldest first).
+
+    handler(kind, payload) -> str runs on a worker thread; its return value
+    becomes the job result and any exception marks the job as failed.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[str, dict], str],
+        db_path: str = JOBS_DB,
+        workers: int = LLM_JOB_WORKERS,
+        ttl: float = JOB_TTL,
+        lease: float = JOB_LEASE,
+        poll_interval: float = 1.0
+    ):
+        self.handler = handler
+        self.workers = workers
+        self.ttl = ttl
+        self.lease = lease
+        self.poll_interval = poll_interval
+
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS llm_jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, priority INTEGER NOT NULL, "
+            "status TEXT NOT NULL, payload TEXT NOT NULL, result TEXT, error TEXT, "
+            "created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS llm_jobs_queue ON llm_jobs (status, priority DESC, created_at)"
+        )
+        self._db.commit()
+
+    # --------------------------------------------------
+    # Client side
+    # --------------------------------------------------
+    def submit(self, kind: str, payload: dict, priority: int = 0) -> dict:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO llm_jobs (id, kind, priority, status, payload, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, priority, json.dumps(payload), now)
+            )
+            self._db.execute(
+                "DELETE FROM llm_jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?",
+                (now - self.ttl,)
+            )
+            self._db.commit()
+
+        with self._wake:
+            self._wake.notify()
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM llm_jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._to_dict(row)
+            if job["status"] == "queued":
+                # Jobs that will run before this one
+                job["position"] = self._db.execute(
+                    "SELECT COUNT(*) FROM llm_jobs WHERE status = 'queued' "
+                    "AND (priority > ? OR (priority = ? AND created_at < ?))",
+                    (row[2], row[2], row[7])
+                ).fetchone()[0]
+            return job
+
+    def cancel(self, job_id: str) -> dict | None:
+        """
+        Cancels a job that has not started yet. Running jobs finish normally.
+        """
+        with self._lock:
+            self._db.execute(
+                "UPDATE llm_jobs SET status = 'cancelled', finished_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            self._db.commit()
+        return self.get(job_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM llm_jobs GROUP BY status"
+            ).fetchall())
+        return {
+            "workers": self.workers,
+            **{status: counts.get(status, 0) for status in ("queued", "running", *FINISHED)}
+        }
+
+    # --------------------------------------------------
+    # Worker side
+    # --------------------------------------------------
+    def start(self):
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(target=self._work, name=f"llm-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None):
+        self._stopping.set()
+        with self._wake:
+            self._wake.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._stopping.clear()
+
+    def _work(self):
+        while not self._stopping.is_set():
+            claimed = self._claim()
+            if claimed is None:
+                with self._wake:
+                    self._wake.wait(self.poll_interval)
+                continue
+
+            job_id, kind, payload = claimed
+            try:
+                result, error = self.handler(kind, payload), None
+            except Exception as e:
+                result, error = None, str(e) or type(e).__name__
+            self._finish(job_id, result, error)
+
+    def _claim(self) -> tuple[str, str, dict] | None:
+        now = time.time()
+
+        with self._lock:
+            self._db.execute(
+                "UPDATE llm_jobs SET status = 'queued', started_at = NULL "
+                "WHERE status = 'running' AND started_at < ?",
+                (now - self.lease,)
+            )
+            # One statement, so two workers (or processes) never claim the same job
+            row = self._db.execute(
+                "UPDATE llm_jobs SET status = 'running', started_at = ? "
+                "WHERE id = (SELECT id FROM llm_jobs WHERE status = 'queued' "
+                "ORDER BY priority DESC, created_at LIMIT 1) AND status = 'queued' "
+                "RETURNING id, kind, payload",
+                (now,)
+            ).fetchone()
+            self._db.commit()
+
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def _finish(self, job_id: str, result: str | None, error: str | None):
+        with self._lock:
+            self._db.execute(
+                "UPDATE llm_jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND status = 'running'",
+                ("failed" if error else "done", result, error, time.time(), job_id)
+            )
+            self._db.commit()
+
+    @staticmethod
+    def _to_dict(row) -> dict:
+        payload = json.loads(row[4])
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "priority": row[2],
+            "status": row[3],
+            "dataset_id": payload.get("dataset_id"),
+            "result": row[5],
+            "error": row[6],
+            "created_at": row[7],
+            "started_at": row[8],
+            "finished_at": row[9]
+        }
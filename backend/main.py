@@ -1,45 +1,328 @@
 # backend/main.py
 
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, Form, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import pandas as pd
-import subprocess
-import json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, nullcontext
+import asyncio
+import contextvars
+import os
+import threading
+import time
+
+from backend import batch, metrics
+from backend.concurrency import LLMLimiter, LLMQueueFull
+from backend.jobs import FINISHED, JobQueue
+from backend.store import AnalysisStore, DatasetStore, file_format
+from shared import profiling
+from shared.column_index import ColumnIndex
+from shared.context import build_context, estimate_tokens
+from shared.eda import build_analysis, profile_csv
+from shared.ingest import content_hash_file
+from shared.llm import CoalescingClient, LLMError, make_client
+from shared.llm_cache import CachedClient, ResponseCache
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # The job queue (its SQLite file and worker threads) exists only while
+    # the app is served, not as a side effect of importing this module.
+    # The batch process pool starts on first use and is stopped here too
+    global JOBS, APP_LOOP
+    APP_LOOP = asyncio.get_running_loop()
+    JOBS = JobQueue(handler=run_llm_job)
+    JOBS.start()
+    try:
+        yield
+    finally:
+        # Off the event loop: a worker may be waiting on it for an LLM slot
+        await asyncio.to_thread(JOBS.stop, 5)
+        # Batch worker processes would otherwise outlive the server
+        await asyncio.to_thread(batch.shutdown_pool)
+
 
-app = FastAPI(title="LLM-Powered Data Analyst (Backend)")
+app = FastAPI(title="LLM-Powered Data Analyst (Backend)", lifespan=lifespan)
 
 # --------------------------------------------------
-# Temporary in-memory storage for last analysis
+# Worker pools
+# Pandas parsing/EDA and blocking LLM calls each get their own threads,
+# so neither can starve the event loop (or /health).
 # --------------------------------------------------
-LAST_ANALYSIS = {}
+EDA_EXECUTOR = ThreadPoolExecutor(
+    max_workers=int(os.getenv("EDA_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="eda"
+)
+
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "2"))
+LLM_EXECUTOR = ThreadPoolExecutor(max_workers=LLM_MAX_IN_FLIGHT, thread_name_prefix="llm")
+LLM_LIMITER = LLMLimiter(
+    max_in_flight=LLM_MAX_IN_FLIGHT,
+    max_queue=int(os.getenv("LLM_MAX_QUEUE", "8"))
+)
+
+
+async def run_eda(fn, *args):
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the request's context so profiling spans reach its trace
+    return await loop.run_in_executor(EDA_EXECUTOR, contextvars.copy_context().run, fn, *args)
+
+
+@app.exception_handler(LLMQueueFull)
+async def llm_queue_full_handler(request: Request, exc: LLMQueueFull):
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": "10"},
+        content={
+            "error": str(exc),
+            "queue_length": exc.waiting,
+            "in_flight": exc.in_flight
+        }
+    )
+
+# --------------------------------------------------
+# Parsed uploads, keyed by content hash (dataset_id)
+# --------------------------------------------------
+DATASETS = DatasetStore(
+    max_bytes=int(os.getenv("DATASET_CACHE_MB", "1024")) * 1024 * 1024,
+    max_items=int(os.getenv("DATASET_CACHE_ITEMS", "32"))
+)
+
+# --------------------------------------------------
+# EDA results per dataset_id, used to answer questions.
+# Set ANALYSIS_DB to share them between uvicorn workers.
+# --------------------------------------------------
+ANALYSES = AnalysisStore(
+    max_items=int(os.getenv("ANALYSIS_CACHE_ITEMS", "128")),
+    ttl=float(os.getenv("ANALYSIS_TTL", str(6 * 3600))),
+    db_path=os.getenv("ANALYSIS_DB")
+)
+
+
+def resolve_dataset(file: UploadFile | None, dataset_id: str | None):
+    """
+    Returns (entry, error) for either a fresh upload or a known dataset_id.
+    Uploads are parsed once; later calls with the same bytes or ID reuse it.
+    """
+    if dataset_id:
+        entry = DATASETS.get(dataset_id)
+        if entry is None:
+            return None, {"error": "Unknown dataset_id. Please upload the file again."}
+        return entry, None
+
+    if file is None:
+        return None, {"error": "Send a file or a dataset_id"}
+
+    try:
+        data = file.file.read()
+        metrics.UPLOAD_BYTES.observe(len(data), format=file_format(file.filename))
+        return DATASETS.add(data, file.filename), None
+    except ValueError as e:
+        return None, {"error": str(e)}
+
+
+def analysis_for(entry) -> dict:
+    """
+    EDA for a stored dataset, computed once and then reused by every endpoint.
+    """
+    analysis = ANALYSES.get(entry.dataset_id)
+    if analysis is None:
+        start = time.perf_counter()
+        analysis = build_analysis(entry.df)
+        metrics.EDA_SECONDS.observe(time.perf_counter() - start, mode="memory")
+        ANALYSES.put(entry.dataset_id, analysis)
+    return analysis
+
+
+# CSV uploads larger than this are profiled in chunks instead of loaded whole
+STREAMING_EDA_MB = float(os.getenv("STREAMING_EDA_MB", "256"))
+
+
+def use_streaming(file: UploadFile, mode: str) -> bool:
+    if not file.filename.lower().endswith(".csv"):
+        return False
+    if mode == "streaming":
+        return True
+    if mode == "memory":
+        return False
+    return (file.size or 0) > STREAMING_EDA_MB * 1024 * 1024
+
+
+def resolve_analysis(file: UploadFile | None, dataset_id: str | None, mode: str = "auto"):
+    """
+    Returns (dataset_id, file_name, analysis, error).
+
+    Large CSVs (see use_streaming) are profiled chunk by chunk and never held
+    in memory. Their analysis is still stored under the dataset_id, so later
+    calls and questions can refer to it by ID.
+    """
+    if dataset_id:
+        entry = DATASETS.get(dataset_id)
+        if entry is not None:
+            return entry.dataset_id, entry.file_name, analysis_for(entry), None
+        analysis = ANALYSES.get(dataset_id)
+        if analysis is not None:
+            return dataset_id, None, analysis, None
+        return None, None, None, {"error": "Unknown dataset_id. Please upload the file again."}
+
+    if file is not None and use_streaming(file, mode):
+        metrics.UPLOAD_BYTES.observe(file.size or 0, format="csv")
+        dataset_id = content_hash_file(file.file)
+        analysis = ANALYSES.get(dataset_id)
+        if analysis is None:
+            start = time.perf_counter()
+            try:
+                analysis = profile_csv(file.file)
+            except ValueError as e:
+                return None, None, None, {"error": str(e)}
+            metrics.EDA_SECONDS.observe(time.perf_counter() - start, mode="streaming")
+            ANALYSES.put(dataset_id, analysis)
+        return dataset_id, file.filename, analysis, None
+
+    entry, error = resolve_dataset(file, None)
+    if error:
+        return None, None, None, error
+    return entry.dataset_id, entry.file_name, analysis_for(entry), None
 
 # --------------------------------------------------
 # 1) Health check
 # --------------------------------------------------
 @app.get("/health")
-def health_check():
+async def health_check():
     return {"status": "ok"}
 
 
+@app.middleware("http")
+async def record_request(request: Request, call_next):
+    metrics.HTTP_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.HTTP_IN_FLIGHT.dec()
+        # The route template ("/jobs/{job_id}"), so IDs do not become labels
+        route = request.scope.get("route")
+        metrics.HTTP_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route else "unmatched",
+            status=status
+        )
+
+
+@metrics.REGISTRY.collector
+def collect_component_stats():
+    cache = LLM_CACHE.stats()
+    metrics.LLM_CACHE_LOOKUPS.set(cache["hits"], result="hit")
+    metrics.LLM_CACHE_LOOKUPS.set(cache["misses"], result="miss")
+
+    calls = LLM_CALLS.stats()
+    metrics.LLM_CALLS.set(calls["calls"], result="sent")
+    metrics.LLM_CALLS.set(calls["coalesced"], result="coalesced")
+
+    limiter = LLM_LIMITER.stats()
+    metrics.LLM_ACTIVE.set(limiter["in_flight"], state="running")
+    metrics.LLM_ACTIVE.set(limiter["waiting"], state="waiting")
+
+    datasets = DATASETS.stats()
+    metrics.DATASETS_CACHED.set(datasets["datasets"])
+    metrics.DATASET_CACHE_BYTES.set(datasets["bytes"])
+
+    if JOBS is not None:
+        for status, count in JOBS.stats().items():
+            if status != "workers":
+                metrics.JOBS.set(count, status=status)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    # Scrape target for Prometheus (text exposition format)
+    return Response(await run_eda(metrics.REGISTRY.render), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/llm/status")
+async def llm_status():
+    return {
+        **LLM_LIMITER.stats(),
+        "cache": LLM_CACHE.stats(),
+        "coalescing": LLM_CALLS.stats()
+    }
+
+
+# --------------------------------------------------
+# Opt-in profiling: send "X-Profile: 1" or ?profile=1 and the response
+# carries an X-Trace-Id; fetch the trace from /traces/{trace_id}
+# --------------------------------------------------
+TRACES = profiling.TraceLog()
+
+
+def wants_profile(request: Request) -> bool:
+    flag = request.headers.get("x-profile") or request.query_params.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    if not wants_profile(request):
+        return await call_next(request)
+
+    with profiling.trace(f"{request.method} {request.url.path}") as trace:
+        response = await call_next(request)
+    # Streamed bodies keep adding spans to the stored trace until they end
+    TRACES.add(trace)
+    response.headers["X-Trace-Id"] = trace.id
+    return response
+
+
+@app.get("/traces")
+async def list_traces():
+    return {"traces": TRACES.recent()}
+
+
+@app.get("/traces/{trace_id}")
+async def get_trace(trace_id: str, format: str = "json"):
+    """
+    format=json: spans with wall/CPU time and RSS change.
+    format=collapsed: folded stacks for flamegraph.pl or speedscope.
+    """
+    trace = TRACES.get(trace_id)
+    if trace is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown trace_id"})
+
+    if format == "collapsed":
+        return Response(
+            trace.collapsed(),
+            media_type="text/plain; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="trace-{trace_id}.folded"'}
+        )
+    return JSONResponse(
+        trace.to_dict(),
+        headers={"Content-Disposition": f'attachment; filename="trace-{trace_id}.json"'}
+    )
+
+
 # --------------------------------------------------
 # 2) Upload file and basic info
 # --------------------------------------------------
 @app.post("/upload")
-def upload_file(file: UploadFile = File(...)):
-    filename = file.filename
+async def upload_file(file: UploadFile = File(...)):
+    entry, error = await run_eda(resolve_dataset, file, None)
+    if error:
+        return error
 
-    if filename.endswith(".csv"):
-        df = pd.read_csv(file.file)
-    elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-        df = pd.read_excel(file.file)
-    else:
-        return {"error": "Only CSV or Excel files are allowed"}
+    df = entry.df
 
     return {
-        "file_name": filename,
+        "dataset_id": entry.dataset_id,
+        "file_name": file.filename,
         "rows": df.shape[0],
         "columns": df.shape[1],
-        "column_names": list(df.columns)
+        "column_names": list(df.columns),
+        "parse": entry.parse_stats.to_dict()
     }
 
 
@@ -47,96 +330,194 @@ def upload_file(file: UploadFile = File(...)):
 # 3) Automatic data analysis (EDA)
 # --------------------------------------------------
 @app.post("/analyze")
-def analyze_file(file: UploadFile = File(...)):
-    filename = file.filename
-
-    if filename.endswith(".csv"):
-        df = pd.read_csv(file.file)
-    elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-        df = pd.read_excel(file.file)
-    else:
-        return {"error": "Only CSV or Excel files are allowed"}
-
-    analysis = {
-        "rows": df.shape[0],
-        "columns": df.shape[1],
-        "missing_values": df.isnull().sum().to_dict(),
-        "data_types": df.dtypes.astype(str).to_dict(),
-        "numeric_summary": df.describe().round(2).to_dict()
-    }
+async def analyze_file(
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = Form(None),
+    mode: str = Form("auto")
+):
+    """
+    mode: "auto" (stream CSVs over STREAMING_EDA_MB), "memory" or "streaming".
+    """
+    dataset_id, file_name, analysis, error = await run_eda(resolve_analysis, file, dataset_id, mode)
+    if error:
+        return error
 
     return {
-        "file_name": filename,
+        "dataset_id": dataset_id,
+        "file_name": file_name,
         "shape": {
-            "rows": df.shape[0],
-            "columns": df.shape[1]
+            "rows": analysis["rows"],
+            "columns": analysis["columns"]
         },
         **analysis
     }
 
 
 # --------------------------------------------------
-# 4) Call Ollama via CLI (Windows-safe)
+# 4) Call Ollama (HTTP server, CLI as fallback)
 # --------------------------------------------------
-def ask_ollama(prompt: str) -> str:
+LLM_CACHE = ResponseCache()
+
+# Identical prompts already being generated are joined, not sent again
+LLM_CALLS = CoalescingClient(make_client(timeout=300))
+LLM = CachedClient(LLM_CALLS, LLM_CACHE)
+
+
+@profiling.traced("llm.generate")
+def ask_ollama(prompt: str, fingerprint: str = "", check_cache: bool = True) -> str:
     """
-    Calls Ollama using CLI.
-    Works on Windows without --prompt flag.
+    Sends the prompt to the local model.
+    Answers are cached per dataset fingerprint, so repeated questions return instantly.
+    Errors come back as a readable message instead of an exception.
     """
 
     try:
-        result = subprocess.run(
-            ["ollama", "run", "gemma:2b"],
-            input=prompt,              # 👈 prompt sent via stdin
-            capture_output=True,
-            text=True,
-            timeout=300
-        )
+        return LLM.generate(prompt, fingerprint, check_cache)
 
-        if result.returncode != 0:
-            return f"Ollama error: {result.stderr}"
+    except LLMError as e:
+        return str(e)
 
-        return result.stdout.strip()
+    except Exception as e:
+        return f"Unexpected error: {str(e)}"
 
-    except FileNotFoundError:
-        return "Ollama is not installed or not available in PATH."
 
-    except subprocess.TimeoutExpired:
-        return "Ollama took too long to respond. Try again."
+def stream_ollama(prompt: str, fingerprint: str = "", check_cache: bool = True):
+    """
+    Yields the answer piece by piece as the model writes it.
+    Errors are yielded as text, since the response has already started.
+    """
+
+    try:
+        yield from LLM.stream(prompt, fingerprint, check_cache)
+
+    except LLMError as e:
+        yield str(e)
 
     except Exception as e:
-        return f"Unexpected error: {str(e)}"
+        yield f"Unexpected error: {str(e)}"
 
 
-# --------------------------------------------------
-# 5) Analyze data + explain with LLM
-# --------------------------------------------------
-@app.post("/analyze-with-llm")
-def analyze_with_llm(file: UploadFile = File(...)):
-    global LAST_ANALYSIS
+def record_answer(mode: str, source: str, start: float = 0.0, answer: str = ""):
+    """
+    Counts an answer by source: "model", "cache_hit" or "coalesced" (joined a
+    generation another request started). Only model answers are timed, so
+    the latency and tokens/sec histograms describe real backend calls.
+    """
+    metrics.LLM_ANSWERS.inc(mode=mode, source=source)
+    if source != "model":
+        return
+    seconds = time.perf_counter() - start
+    metrics.LLM_SECONDS.observe(seconds, mode=mode)
+    if answer and seconds > 0:
+        metrics.LLM_TOKENS_PER_SECOND.observe(estimate_tokens(answer) / seconds, mode=mode)
 
-    filename = file.filename
 
-    if filename.endswith(".csv"):
-        df = pd.read_csv(file.file)
-    elif filename.endswith(".xlsx") or filename.endswith(".xls"):
-        df = pd.read_excel(file.file)
-    else:
-        return {"error": "Only CSV or Excel files are allowed"}
+def llm_slot(prompt: str, stream: bool = False, reject: bool = True):
+    """
+    (limiter slot, executor) for one call. Joining an in-flight generation
+    only waits, so it uses neither an LLM slot nor an LLM worker thread.
+    """
+    if LLM_CALLS.in_flight(prompt, stream):
+        return nullcontext(), None
+    return LLM_LIMITER.slot(reject), LLM_EXECUTOR
 
-    analysis = {
-        "rows": df.shape[0],
-        "columns": df.shape[1],
-        "column_names": list(df.columns),
-        "missing_values": df.isnull().sum().to_dict(),
-        "data_types": df.dtypes.astype(str).to_dict(),
-        "numeric_summary": df.describe().round(2).to_dict()
-    }
 
-    # Store for question answering
-    LAST_ANALYSIS = analysis
+async def ask_llm(prompt: str, fingerprint: str = "") -> str:
+    """
+    ask_ollama behind the LLM limiter, run on the LLM worker pool.
+    Raises LLMQueueFull (-> 429) when too many requests are already waiting.
+    Cached answers are returned at once, and a prompt that is already being
+    generated is joined, neither taking a slot.
+    """
+    metrics.PROMPT_TOKENS.observe(estimate_tokens(prompt), mode="generate")
+    answer = LLM.lookup(prompt, fingerprint)
+    if answer is not None:
+        record_answer("generate", "cache_hit")
+        return answer
+
+    slot, executor = llm_slot(prompt)
+    queued = time.perf_counter()
+    async with slot:
+        start = time.perf_counter()
+        metrics.LLM_QUEUE_SECONDS.observe(start - queued)
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(
+            executor, contextvars.copy_context().run, ask_ollama, prompt, fingerprint, False
+        )
+    record_answer("generate", "model" if executor else "coalesced", start, answer)
+    return answer
+
 
-    prompt = f"""
+async def stream_llm(prompt: str, fingerprint: str = ""):
+    """
+    stream_ollama behind the LLM limiter; cached answers skip it.
+    The slot and the worker thread are freed as soon as the client goes away.
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+
+    try:
+        metrics.PROMPT_TOKENS.observe(estimate_tokens(prompt), mode="stream")
+        answer = LLM.lookup(prompt, fingerprint)
+        if answer is not None:
+            record_answer("stream", "cache_hit")
+            yield answer
+            return
+
+        slot, executor = llm_slot(prompt, stream=True)
+        queued = time.perf_counter()
+        async with slot:
+            start = time.perf_counter()
+            metrics.LLM_QUEUE_SECONDS.observe(start - queued)
+            tokens = stream_ollama(prompt, fingerprint, check_cache=False)
+            # A disconnect cancels this task while next() may still be running
+            # on a worker; the lock makes close() wait for it instead of failing
+            # with "generator already executing"
+            in_use = threading.Lock()
+
+            def step():
+                with in_use:
+                    return next(tokens, done)
+
+            def close():
+                with in_use:
+                    tokens.close()
+
+            parts = []
+            try:
+                while True:
+                    token = await loop.run_in_executor(executor, step)
+                    if token is done:
+                        record_answer("stream", "model" if executor else "coalesced", start, "".join(parts))
+                        break
+                    parts.append(token)
+                    yield token
+            finally:
+                # Submitted before the first await, so it runs (and the Ollama
+                # connection is released) even if this task is cancelled again
+                await asyncio.shield(loop.run_in_executor(executor, close))
+
+    except LLMQueueFull as e:
+        yield str(e)
+
+
+def stream_response(
+    prompt: str,
+    fingerprint: str = "",
+    headers: dict | None = None
+) -> StreamingResponse:
+    # Reject before the 200 status line goes out if the queue is already full
+    LLM_LIMITER.check()
+
+    return StreamingResponse(
+        stream_llm(prompt, fingerprint),
+        media_type="text/plain; charset=utf-8",
+        headers=headers
+    )
+
+
+def explain_prompt(analysis: dict) -> str:
+    return f"""
 Explain this dataset in very simple English.
 Avoid technical words.
 Mention any data quality issues and patterns.
@@ -147,29 +528,11 @@ Column names: {analysis['column_names']}
 Missing values: {analysis['missing_values']}
 """
 
-    explanation = ask_ollama(prompt)
 
-    return {
-        "file_name": filename,
-        "llm_explanation": explanation
-    }
-
-
-# --------------------------------------------------
-# 6) Ask questions about the data
-# --------------------------------------------------
-class QuestionRequest(BaseModel):
-    question: str
-
-
-@app.post("/ask-question")
-def ask_question(request: QuestionRequest):
-    if not LAST_ANALYSIS:
-        return {
-            "answer": "No dataset has been analyzed yet. Please upload and analyze a file first."
-        }
-
-    prompt = f"""
+def question_prompt(analysis: dict, question: str, relevant: list | None = None) -> str:
+    # Ranked facts cut to LLM_CONTEXT_TOKENS, not the whole analysis
+    context, _ = build_context(analysis, question, relevant=relevant)
+    return f"""
 You are a junior data analyst explaining data to a non-technical manager.
 
 Rules:
@@ -184,19 +547,319 @@ Rules:
 
 Explain:
 1. What this dataset is about
-2. Answer the question: {request.question}
+2. Answer the question: {question}
 3. Key patterns or trends
 4. Any data quality issues
 5. One practical takeaway
 
 Dataset information:
-{json.dumps(LAST_ANALYSIS, indent=2)}
+{context}
 
 Now write the summary:
 """
 
-    answer = ask_ollama(prompt)
+
+# --------------------------------------------------
+# 5) Analyze data + explain with LLM
+# --------------------------------------------------
+@app.post("/analyze-with-llm")
+async def analyze_with_llm(
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = Form(None),
+    mode: str = Form("auto")
+):
+    # Stored per dataset_id for question answering
+    dataset_id, file_name, analysis, error = await run_eda(resolve_analysis, file, dataset_id, mode)
+    if error:
+        return error
+
+    prompt = explain_prompt(analysis)
+
+    explanation = await ask_llm(prompt, dataset_id)
+
+    return {
+        "dataset_id": dataset_id,
+        "file_name": file_name,
+        "llm_explanation": explanation
+    }
+
+
+@app.post("/analyze-with-llm/stream")
+async def analyze_with_llm_stream(
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = Form(None),
+    mode: str = Form("auto")
+):
+    """
+    Same as /analyze-with-llm, but the explanation is streamed as plain text
+    while the model writes it. The dataset ID is sent in the X-Dataset-Id header.
+    """
+    dataset_id, file_name, analysis, error = await run_eda(resolve_analysis, file, dataset_id, mode)
+    if error:
+        return error
+
+    return stream_response(
+        explain_prompt(analysis),
+        fingerprint=dataset_id,
+        headers={"X-Dataset-Id": dataset_id}
+    )
+
+
+# --------------------------------------------------
+# 6) Ask questions about the data
+# --------------------------------------------------
+class QuestionRequest(BaseModel):
+    question: str
+    dataset_id: str | None = None
+
+
+def question_analysis(request: QuestionRequest):
+    """
+    Returns (dataset_id, analysis, error) for the dataset the question is about.
+    The dataset_id is required: with a shared ANALYSIS_DB, "the latest dataset"
+    would be whichever user uploaded last.
+    """
+    if not request.dataset_id:
+        return None, None, JSONResponse(
+            status_code=400,
+            content={"error": "dataset_id is required. Send the one returned by /upload or /analyze."}
+        )
+
+    analysis = ANALYSES.get(request.dataset_id)
+    if analysis is None:
+        entry = DATASETS.get(request.dataset_id)
+        if entry is None:
+            return None, None, {"error": "Unknown dataset_id. Please upload and analyze the file again."}
+        analysis = analysis_for(entry)
+    return request.dataset_id, analysis, None
+
+
+# Column search index per dataset_id, built on the first question;
+# kept for as many datasets as ANALYSES keeps analyses
+COLUMN_INDEXES: "OrderedDict[str, ColumnIndex]" = OrderedDict()
+COLUMN_INDEX_ITEMS = ANALYSES.max_items
+COLUMN_INDEX_LOCK = threading.Lock()
+
+
+def column_index(dataset_id: str, analysis: dict) -> ColumnIndex:
+    with COLUMN_INDEX_LOCK:
+        index = COLUMN_INDEXES.get(dataset_id)
+        if index is not None:
+            COLUMN_INDEXES.move_to_end(dataset_id)
+            return index
+
+    # Sample values need the data; without it names and types are indexed
+    entry = DATASETS.get(dataset_id)
+    index = ColumnIndex.from_analysis(analysis, entry.df if entry else None)
+
+    with COLUMN_INDEX_LOCK:
+        COLUMN_INDEXES[dataset_id] = index
+        while len(COLUMN_INDEXES) > COLUMN_INDEX_ITEMS:
+            COLUMN_INDEXES.popitem(last=False)
+    return index
+
+
+def relevant_question_prompt(dataset_id: str, analysis: dict, question: str) -> str:
+    """
+    question_prompt describing only the top COLUMN_TOP_K columns for the
+    question, so prompt size stays flat however wide the dataset is.
+    """
+    relevant = column_index(dataset_id, analysis).top_columns(question)
+    return question_prompt(analysis, question, relevant)
+
+
+@app.post("/ask-question")
+async def ask_question(request: QuestionRequest):
+    dataset_id, analysis, error = await run_eda(question_analysis, request)
+    if error:
+        return error
+
+    prompt = await run_eda(relevant_question_prompt, dataset_id, analysis, request.question)
+
+    answer = await ask_llm(prompt, dataset_id)
 
     return {
+        "dataset_id": dataset_id,
+        "prompt_tokens": estimate_tokens(prompt),
         "llm_explanation": answer
     }
+
+
+@app.post("/ask-question/stream")
+async def ask_question_stream(request: QuestionRequest):
+    dataset_id, analysis, error = await run_eda(question_analysis, request)
+    if error:
+        return error
+
+    prompt = await run_eda(relevant_question_prompt, dataset_id, analysis, request.question)
+
+    return stream_response(
+        prompt,
+        fingerprint=dataset_id,
+        headers={"X-Dataset-Id": dataset_id, "X-Prompt-Tokens": str(estimate_tokens(prompt))}
+    )
+
+
+# --------------------------------------------------
+# 7) Profile many files at once
+# --------------------------------------------------
+async def stream_batch(jobs: list[dict]):
+    """
+    NDJSON lines from the batch process pool, in the order files finish.
+    Each analysis is stored under its dataset_id for later questions.
+    """
+    stats = batch.BatchStats()
+    pool = batch.get_pool()
+    futures = [asyncio.wrap_future(pool.submit(batch.profile_source, **job)) for job in jobs]
+
+    try:
+        for next_done in asyncio.as_completed(futures):
+            result = await next_done
+            stats.add(result)
+            if "error" not in result:
+                ANALYSES.put(result["dataset_id"], result["analysis"])
+                # Parse + EDA happen together in the worker process
+                metrics.UPLOAD_BYTES.observe(result["bytes"], format=file_format(result["file_name"]))
+                metrics.EDA_SECONDS.observe(result["seconds"], mode="batch")
+            yield batch.json_line(result)
+
+        yield batch.json_line({"summary": stats.to_dict()})
+
+    finally:
+        # Client went away: drop the files that have not started yet
+        for future in futures:
+            future.cancel()
+
+
+@app.post("/analyze-many")
+async def analyze_many(
+    files: list[UploadFile] | None = File(None),
+    directory: str | None = Form(None),
+    recursive: bool = Form(False)
+):
+    """
+    Profiles uploaded files and/or a server directory (inside
+    BATCH_ALLOWED_ROOT) in parallel worker processes. Streams one JSON
+    line per file as it finishes, then a {"summary": ...} line.
+    """
+    jobs = [{"name": file.filename, "data": await file.read()} for file in files or []]
+
+    if directory:
+        path, error = batch.allowed_directory(directory)
+        if error:
+            return error
+        paths = await run_eda(batch.dataset_files, [path], recursive)
+        jobs += [{"name": os.path.relpath(p, path), "path": p} for p in paths]
+
+    if not jobs:
+        return {"error": "Send files or a directory with CSV or Excel files"}
+
+    return StreamingResponse(stream_batch(jobs), media_type="application/x-ndjson")
+
+
+# --------------------------------------------------
+# 8) Background LLM jobs
+# Submit returns a job ID immediately; LLM_JOB_WORKERS threads work through
+# the queue independently of HTTP requests. Poll GET /jobs/{job_id}.
+# The queue is created and started by lifespan().
+# --------------------------------------------------
+JOBS: JobQueue | None = None
+APP_LOOP: asyncio.AbstractEventLoop | None = None
+
+
+async def generate_job(prompt: str, fingerprint: str) -> str:
+    # Same LLM_MAX_IN_FLIGHT slots as HTTP requests; jobs are already queued,
+    # so they wait for a slot instead of being rejected. Cached answers need neither
+    answer = LLM.lookup(prompt, fingerprint)
+    if answer is not None:
+        record_answer("job", "cache_hit")
+        return answer
+
+    slot, executor = llm_slot(prompt, reject=False)
+    async with slot:
+        start = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        answer = await loop.run_in_executor(executor, LLM.generate, prompt, fingerprint, False)
+    record_answer("job", "model" if executor else "coalesced", start, answer)
+    return answer
+
+
+def run_llm_job(kind: str, payload: dict) -> str:
+    # Runs on a job worker thread. Errors raise, so the job is marked failed
+    # instead of "done" with an error text
+    metrics.PROMPT_TOKENS.observe(estimate_tokens(payload["prompt"]), mode="job")
+    return asyncio.run_coroutine_threadsafe(
+        generate_job(payload["prompt"], payload["fingerprint"]), APP_LOOP
+    ).result()
+
+# Longest a GET /jobs/{job_id}?wait=... request may block
+JOB_MAX_WAIT = 60.0
+
+
+class QuestionJobRequest(QuestionRequest):
+    priority: int = 0
+
+
+def job_payload(dataset_id: str, prompt: str) -> dict:
+    return {"dataset_id": dataset_id, "fingerprint": dataset_id, "prompt": prompt}
+
+
+@app.get("/jobs")
+async def job_stats():
+    return await run_eda(JOBS.stats)
+
+
+@app.post("/jobs/analyze-with-llm")
+async def submit_analyze_job(
+    file: UploadFile | None = File(None),
+    dataset_id: str | None = Form(None),
+    mode: str = Form("auto"),
+    priority: int = Form(0)
+):
+    """
+    Queues the /analyze-with-llm explanation. The EDA runs now (it is fast);
+    only the LLM call is deferred. Higher priority runs first.
+    """
+    dataset_id, file_name, analysis, error = await run_eda(resolve_analysis, file, dataset_id, mode)
+    if error:
+        return error
+
+    job = await run_eda(JOBS.submit, "explain", job_payload(dataset_id, explain_prompt(analysis)), priority)
+    return {**job, "file_name": file_name}
+
+
+@app.post("/jobs/ask-question")
+async def submit_question_job(request: QuestionJobRequest):
+    dataset_id, analysis, error = await run_eda(question_analysis, request)
+    if error:
+        return error
+
+    prompt = await run_eda(relevant_question_prompt, dataset_id, analysis, request.question)
+    job = await run_eda(JOBS.submit, "question", job_payload(dataset_id, prompt), request.priority)
+    return {**job, "prompt_tokens": estimate_tokens(prompt)}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status and, once done, its result. With `wait` (seconds, at most
+    JOB_MAX_WAIT) the request is held until the job finishes, so clients
+    can long-poll instead of polling in a tight loop.
+    """
+    deadline = time.monotonic() + min(max(wait, 0.0), JOB_MAX_WAIT)
+
+    while True:
+        job = await run_eda(JOBS.get, job_id)
+        if job is None:
+            return JSONResponse(status_code=404, content={"error": "Unknown job_id"})
+        if job["status"] in FINISHED or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(0.25)
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    job = await run_eda(JOBS.cancel, job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": "Unknown job_id"})
+    return job
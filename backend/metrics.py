@@ -0,0 +1,213 @@
+# backend/metrics.py
+# Counters, gauges and histograms in the Prometheus text format, served at
+# GET /metrics. Dependency-free: a metric is a dict of label values -> numbers
+# behind a lock, and render() writes the exposition format by hand.
+
+import math
+import threading
+from typing import Callable, Iterable
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTES_BUCKETS = tuple(1024 * 4 ** i for i in range(12))          # 1 KB .. 4 GB
+TOKENS_BUCKETS = tuple(2 ** i for i in range(5, 15))              # 32 .. 16384
+RATE_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._values: dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(labels.get(name, "") for name in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, value: float, **labels):
+        # For totals counted elsewhere (e.g. cache stats) and copied at scrape time
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return self.header() + [
+            f"{self.name}{_labels(self.label_names, key)} {_number(value)}"
+            for key, value in values.items()
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, buckets: tuple, labels: Iterable[str] = ()):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            # [per-bucket counts..., count, sum]
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += 1
+            state[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {key: list(state) for key, state in self._values.items()}
+
+        lines = self.header()
+        for key, state in values.items():
+            *counts, count, total = state
+            cumulative = 0
+            for bound, n in zip(self.buckets + (math.inf,), counts + [count - sum(counts)]):
+                cumulative += n
+                le = 'le="%s"' % _number(bound)
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Registry:
+    """
+    Metrics in one exposition. Collectors are called at scrape time to
+    refresh gauges that mirror state kept elsewhere (cache stats, queues).
+    """
+
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+        self._collectors: list[Callable[[], None]] = []
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: tuple, labels: Iterable[str] = ()) -> Histogram:
+        return self._add(Histogram(name, help, buckets, labels))
+
+    def collector(self, fn: Callable[[], None]) -> Callable[[], None]:
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        for collect in self._collectors:
+            collect()
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+
+# --------------------------------------------------
+# Backend metrics
+# --------------------------------------------------
+REGISTRY = Registry()
+
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "http_requests_in_flight", "Requests being handled right now"
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to the response headers, per route",
+    SECONDS_BUCKETS, labels=("method", "route", "status")
+)
+UPLOAD_BYTES = REGISTRY.histogram(
+    "upload_bytes", "Size of uploaded files", BYTES_BUCKETS, labels=("format",)
+)
+PARSE_SECONDS = REGISTRY.histogram(
+    "dataset_parse_seconds", "Time to turn an upload into a DataFrame",
+    SECONDS_BUCKETS, labels=("format", "engine")
+)
+EDA_SECONDS = REGISTRY.histogram(
+    "eda_seconds", "Time to compute an analysis", SECONDS_BUCKETS, labels=("mode",)
+)
+PROMPT_TOKENS = REGISTRY.histogram(
+    "llm_prompt_tokens", "Estimated prompt size", TOKENS_BUCKETS, labels=("mode",)
+)
+LLM_QUEUE_SECONDS = REGISTRY.histogram(
+    "llm_queue_wait_seconds", "Time waiting for an LLM slot", SECONDS_BUCKETS
+)
+LLM_ANSWERS = REGISTRY.counter(
+    "llm_answers_total", "Answers returned, by source (model, cache_hit, coalesced)",
+    labels=("mode", "source")
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "llm_generation_seconds", "Time for the model to write a complete answer (model answers only)",
+    SECONDS_BUCKETS, labels=("mode",)
+)
+LLM_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "llm_tokens_per_second", "Estimated answer tokens per second (model answers only)",
+    RATE_BUCKETS, labels=("mode",)
+)
+
+# Copied from the component stats at scrape time
+LLM_CACHE_LOOKUPS = REGISTRY.counter(
+    "llm_cache_lookups_total", "LLM answer cache lookups", labels=("result",)
+)
+LLM_CALLS = REGISTRY.counter(
+    "llm_calls_total", "Prompts sent to the model or joined to one already running", labels=("result",)
+)
+LLM_ACTIVE = REGISTRY.gauge(
+    "llm_requests", "LLM requests holding or waiting for a slot", labels=("state",)
+)
+DATASETS_CACHED = REGISTRY.gauge(
+    "datasets_cached", "Parsed datasets held in memory"
+)
+DATASET_CACHE_BYTES = REGISTRY.gauge(
+    "dataset_cache_bytes", "Memory used by parsed datasets"
+)
+JOBS = REGISTRY.gauge(
+    "llm_jobs", "Background LLM jobs", labels=("status",)
+)
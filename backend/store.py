@@ -0,0 +1,201 @@
+# backend/store.py
+# In-memory registry of parsed uploads, keyed by content hash (backed by the
+# on-disk Feather cache in shared/ingest.py), and the per-dataset analysis
+# contexts used for question answering.
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from backend.metrics import PARSE_SECONDS
+from shared.ingest import ParseStats, content_hash, frame_bytes, load_dataset, read_cached
+
+
+def file_format(filename: str | None) -> str:
+    return os.path.splitext(filename or "")[1].lstrip(".").lower() or "unknown"
+
+
+@dataclass
+class DatasetEntry:
+    dataset_id: str
+    file_name: str
+    df: pd.DataFrame
+    nbytes: int
+    parse_stats: ParseStats
+
+
+class DatasetStore:
+    """
+    Keeps each uploaded file parsed exactly once.
+
+    Datasets are evicted least-recently-used first once the store holds more
+    than `max_items` datasets or more than `max_bytes` of DataFrame memory.
+    The most recent dataset is always kept so a caller can use the ID it
+    was just given. Evicted datasets (and those parsed by another worker)
+    are reloaded from the Feather cache on the next get().
+    """
+
+    def __init__(self, max_bytes: int, max_items: int):
+        self.max_bytes = max_bytes
+        self.max_items = max_items
+        self._entries: "OrderedDict[str, DatasetEntry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, dataset_id: str) -> DatasetEntry | None:
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None:
+                self._entries.move_to_end(dataset_id)
+                return entry
+
+        start = time.perf_counter()
+        cached = read_cached(dataset_id)
+        if cached is None:
+            return None
+
+        df, file_name, memory_before = cached
+        nbytes = frame_bytes(df)
+        stats = ParseStats(
+            engine="feather cache",
+            seconds=time.perf_counter() - start,
+            bytes=0,
+            memory_before=memory_before or nbytes,
+            memory_after=nbytes
+        )
+        PARSE_SECONDS.observe(stats.seconds, format="feather", engine=stats.engine)
+        return self._insert(DatasetEntry(
+            dataset_id=dataset_id,
+            file_name=file_name,
+            df=df,
+            nbytes=nbytes,
+            parse_stats=stats
+        ))
+
+    def add(self, data: bytes, filename: str) -> DatasetEntry:
+        """
+        Returns the stored dataset for these bytes, parsing them only on a miss.
+        Raises ValueError if the file cannot be parsed.
+        """
+        dataset_id = content_hash(data)
+
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is not None:
+                self._entries.move_to_end(dataset_id)
+                return entry
+
+        dataset_id, df, parse_stats = load_dataset(data, filename, dataset_id)
+        PARSE_SECONDS.observe(parse_stats.seconds, format=file_format(filename), engine=parse_stats.engine)
+        return self._insert(DatasetEntry(
+            dataset_id=dataset_id,
+            file_name=filename,
+            df=df,
+            nbytes=parse_stats.memory_after,
+            parse_stats=parse_stats
+        ))
+
+    def _insert(self, entry: DatasetEntry) -> DatasetEntry:
+        dataset_id = entry.dataset_id
+        with self._lock:
+            if dataset_id not in self._entries:
+                self._entries[dataset_id] = entry
+                self._bytes += entry.nbytes
+            entry = self._entries[dataset_id]
+            self._entries.move_to_end(dataset_id)
+            self._evict()
+
+        return entry
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "datasets": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "max_items": self.max_items
+            }
+
+    def _evict(self):
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_items or self._bytes > self.max_bytes
+        ):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= evicted.nbytes
+
+
+class AnalysisStore:
+    """
+    EDA results per dataset_id, so every user asks questions about their own data.
+
+    Entries expire after `ttl` seconds and at most `max_items` are kept in memory.
+    With `db_path`, results are also written to a SQLite file so every uvicorn
+    worker can answer questions about a dataset analyzed by another one.
+    """
+
+    def __init__(self, max_items: int, ttl: float, db_path: str | None = None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "dataset_id TEXT PRIMARY KEY, analysis TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def put(self, dataset_id: str, analysis: dict):
+        now = time.time()
+
+        with self._lock:
+            self._remember(dataset_id, now, analysis)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO analyses (dataset_id, analysis, created_at) VALUES (?, ?, ?)",
+                    (dataset_id, json.dumps(analysis, default=str), now)
+                )
+                self._db.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,))
+                self._db.commit()
+
+    def get(self, dataset_id: str) -> dict | None:
+        now = time.time()
+
+        with self._lock:
+            item = self._entries.get(dataset_id)
+            if item is not None and now - item[0] <= self.ttl:
+                self._entries.move_to_end(dataset_id)
+                return item[1]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT analysis, created_at FROM analyses WHERE dataset_id = ? AND created_at >= ?",
+                    (dataset_id, now - self.ttl)
+                ).fetchone()
+                if row is not None:
+                    analysis = json.loads(row[0])
+                    self._remember(dataset_id, row[1], analysis)
+                    return analysis
+
+            return None
+
+    def _remember(self, dataset_id: str, created_at: float, analysis: dict):
+        self._entries[dataset_id] = (created_at, analysis)
+        self._entries.move_to_end(dataset_id)
+
+        now = time.time()
+        for key in [k for k, (t, _) in self._entries.items() if now - t > self.ttl]:
+            del self._entries[key]
+        while len(self._entries) > self.max_items:
+            self._entries.popitem(last=False)
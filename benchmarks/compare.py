@@ -0,0 +1,66 @@
+# benchmarks/compare.py
+# Compares two benchmark result files, case by case:
+#
+#     python -m benchmarks.compare base.json new.json --threshold 0.2
+#
+# Exits 1 if any case got slower than the threshold allows.
+
+import argparse
+import json
+import sys
+
+
+KEY = ("case", "rows", "width", "cardinality", "missing", "dtypes")
+
+# Differences below this are timer noise, whatever the ratio
+MIN_SECONDS = 0.005
+
+
+def load(path: str) -> dict:
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(base: dict, new: dict, threshold: float = 0.2, out=sys.stderr) -> int:
+    """
+    Prints median time per case (base -> new) and returns 1 if any case
+    is more than `threshold` slower, else 0. Cases in only one file are skipped.
+    """
+    before = {tuple(r.get(k) for k in KEY): r for r in base["results"] if "error" not in r}
+    regressions = 0
+
+    print(f"base {base['environment'].get('commit')} -> new {new['environment'].get('commit')}", file=out)
+    for result in new["results"]:
+        old = before.get(tuple(result.get(k) for k in KEY))
+        if old is None or "error" in result:
+            continue
+
+        a, b = old["seconds_median"], result["seconds_median"]
+        ratio = b / a if a else float("inf")
+        slower = ratio > 1 + threshold and b - a > MIN_SECONDS
+        regressions += slower
+
+        memory = ""
+        if old.get("peak_rss_mb") and result.get("peak_rss_mb"):
+            memory = f"  rss {old['peak_rss_mb']:.0f} -> {result['peak_rss_mb']:.0f} MB"
+        print(
+            f"{'REGRESSION' if slower else 'ok':10} {result['case']:24} rows={result['rows']:<10} "
+            f"width={result['width']:<4} {a * 1000:9.1f} -> {b * 1000:9.1f} ms ({ratio:.2f}x){memory}",
+            file=out
+        )
+
+    print(f"{regressions} regression(s)", file=out)
+    return 1 if regressions else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("base", help="earlier results file")
+    parser.add_argument("new", help="later results file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    return compare(load(args.base), load(args.new), args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# benchmarks/datasets.py
+# Synthetic datasets for the benchmarks, reproducible from their parameters.
+
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+
+DTYPE_MIXES = ("numeric", "mixed", "text")
+
+
+def make_dataset(
+    rows: int,
+    width: int = 10,
+    cardinality: int = 100,
+    missing: float = 0.0,
+    dtypes: str = "mixed",
+    seed: int = 0
+) -> pd.DataFrame:
+    """
+    DataFrame with `width` columns. `dtypes` picks the column mix:
+    "numeric" = floats and ints, "mixed" = mostly numbers plus text
+    categories and a date, "text" = mostly text categories.
+    Text columns have `cardinality` distinct values; `missing` is the share
+    of empty cells in every column except the first.
+    """
+    if dtypes not in DTYPE_MIXES:
+        raise ValueError(f"dtypes must be one of {DTYPE_MIXES}")
+
+    rng = np.random.default_rng(seed)
+    if dtypes == "numeric":
+        kinds = ["float", "int"] * width
+    elif dtypes == "mixed":
+        kinds = ["cat", "date"] + ["float", "float", "int", "float", "cat"] * width
+    else:
+        kinds = ["cat", "float"] + ["cat"] * width
+    kinds = kinds[:width]
+
+    labels = np.array([f"group_{k}" for k in range(max(cardinality, 1))], dtype=object)
+    columns = {}
+    for i, kind in enumerate(kinds):
+        if kind == "float":
+            values = rng.lognormal(3, 1, rows) if i % 2 else rng.normal(100, 15, rows)
+        elif kind == "int":
+            values = rng.integers(0, 1000, rows)
+        elif kind == "cat":
+            # Skewed like real categories: a few values are very common
+            values = labels[rng.zipf(1.3, rows) % len(labels)]
+        else:
+            values = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 1500, rows), unit="D")
+        columns[f"{kind}_{i}"] = values
+
+    df = pd.DataFrame(columns)
+    if missing > 0:
+        for col in df.columns[1:]:
+            df[col] = df[col].mask(rng.random(rows) < missing)
+    return df
+
+
+class BenchData:
+    """
+    A generated dataset and the inputs cases derive from it, built lazily.
+    """
+
+    def __init__(self, **params):
+        self.params = params
+        self.df = make_dataset(**params)
+
+    @cached_property
+    def csv(self) -> bytes:
+        return self.df.to_csv(index=False).encode()
+
+    @cached_property
+    def numeric_columns(self) -> list[str]:
+        return self.df.select_dtypes(include=["number"]).columns.tolist()
+
+    @cached_property
+    def group_by(self) -> str:
+        # Grouped charts group by a text column; numeric-only data uses an int column
+        text = [col for col in self.df.columns if col.startswith("cat_")]
+        ints = [col for col in self.df.columns if col.startswith("int_")]
+        return (text or ints or list(self.df.columns))[0]
@@ -0,0 +1,250 @@
+# benchmarks/run.py
+# Times ingestion, EDA, the API endpoints and the chart aggregation helpers
+# on generated datasets and prints the results as JSON:
+#
+#     python -m benchmarks.run --rows 1e3,1e5,1e6 --width 10,100 > results.json
+#     python -m benchmarks.run --rows 1e5 --baseline results.json
+#
+# Each (case, dataset) pair runs in a fresh process, so its peak RSS is its own.
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.datasets import DTYPE_MIXES, BenchData
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+# --------------------------------------------------
+# Cases: each takes a BenchData and returns run(i),
+# so setup is not timed
+# --------------------------------------------------
+def case_parse_csv(data: BenchData):
+    from shared.ingest import parse_dataset
+    csv = data.csv
+    return lambda i: parse_dataset(csv, "bench.csv")
+
+
+def case_build_analysis(data: BenchData):
+    from shared.eda import build_analysis
+    return lambda i: build_analysis(data.df)
+
+
+def case_describe_approximate(data: BenchData):
+    from shared.eda import describe_numeric
+    return lambda i: describe_numeric(data.df, mode="approximate")
+
+
+def case_profile_csv(data: BenchData):
+    from shared.eda import profile_csv
+    csv = data.csv
+    return lambda i: profile_csv(BytesIO(csv))
+
+
+def _client():
+    # Keep the benchmark's feather files and job queue out of the real cache
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    os.environ.setdefault("DATASET_CACHE_DIR", os.path.join(scratch, "datasets"))
+    os.environ.setdefault("JOBS_DB", os.path.join(scratch, "jobs.sqlite"))
+
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    return TestClient(app)
+
+
+def case_api_analyze_upload(data: BenchData):
+    client = _client()
+    csv = data.csv
+
+    def run(i):
+        # Trailing blank lines change the hash but not the data, so every
+        # repeat is a cold upload
+        files = {"file": ("bench.csv", csv + b"\n" * (i + 1))}
+        return client.post("/analyze", files=files).json()
+    return run
+
+
+def case_api_analyze_cached(data: BenchData):
+    client = _client()
+    dataset_id = client.post("/analyze", files={"file": ("bench.csv", data.csv)}).json()["dataset_id"]
+    return lambda i: client.post("/analyze", data={"dataset_id": dataset_id}).json()
+
+
+def case_groupby_mean(data: BenchData):
+    columns = [col for col in data.numeric_columns if col != data.group_by]
+    return lambda i: data.df.groupby(data.group_by)[columns].mean()
+
+
+def case_value_counts(data: BenchData):
+    return lambda i: data.df[data.group_by].value_counts()
+
+
+def case_split_groups(data: BenchData):
+    from shared.aggregations import split_groups
+    column = data.numeric_columns[-1]
+    return lambda i: split_groups(data.df[data.group_by], data.df[column], limit=10)
+
+
+def case_grouped_histogram(data: BenchData):
+    from shared.aggregations import grouped_histogram
+    column = data.numeric_columns[-1]
+    return lambda i: grouped_histogram(data.df[data.group_by], data.df[column], limit=10)
+
+
+def case_correlation(data: BenchData):
+    from shared.correlation import correlation_matrix
+    return lambda i: correlation_matrix(data.df, data.numeric_columns)
+
+
+def case_downsample(data: BenchData):
+    from shared.downsample import CHART_POINT_BUDGET, downsample
+    frame = data.df[data.numeric_columns]
+    return lambda i: downsample(frame, CHART_POINT_BUDGET, "lttb")
+
+
+CASES = {
+    name[len("case_"):]: fn for name, fn in globals().items() if name.startswith("case_")
+}
+
+
+# --------------------------------------------------
+# Runner
+# --------------------------------------------------
+def peak_rss_mb() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_case(case: str, params: dict, repeat: int) -> dict:
+    """
+    Runs in a child process: builds the dataset, then times `repeat` runs.
+    """
+    result = {"case": case, **params}
+    try:
+        data = BenchData(**params)
+        run = CASES[case](data)
+        base_rss = peak_rss_mb()
+
+        times = []
+        for i in range(repeat):
+            start = time.perf_counter()
+            run(i)
+            times.append(time.perf_counter() - start)
+
+    except Exception as e:
+        return {**result, "error": f"{type(e).__name__}: {e}"}
+
+    return {
+        **result,
+        "repeat": repeat,
+        "seconds_min": round(min(times), 6),
+        "seconds_median": round(statistics.median(times), 6),
+        "rows_per_sec": round(params["rows"] / min(times)) if min(times) else None,
+        "base_rss_mb": base_rss,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__
+    }
+
+
+def _numbers(text: str, kind=float) -> list:
+    return [kind(float(value)) for value in text.split(",") if value.strip()]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Benchmark ingestion, EDA, API and chart aggregation paths on generated data."
+    )
+    parser.add_argument("--rows", default="1e3,1e4,1e5", help="comma-separated row counts (1e3 to 1e8)")
+    parser.add_argument("--width", default="10", help="comma-separated column counts")
+    parser.add_argument("--cardinality", default="100", help="comma-separated distinct values per text column")
+    parser.add_argument("--missing", default="0.05", help="comma-separated share of empty cells")
+    parser.add_argument("--dtypes", default="mixed", help=f"comma-separated column mixes: {', '.join(DTYPE_MIXES)}")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    parser.add_argument("--output", help="write results here instead of stdout")
+    parser.add_argument("--baseline", help="results file to compare against; exits 1 on a regression")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown counted as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)} (known: {', '.join(CASES)})")
+
+    grid = [
+        {"rows": rows, "width": width, "cardinality": cardinality, "missing": missing, "dtypes": dtypes}
+        for rows, width, cardinality, missing, dtypes in itertools.product(
+            _numbers(args.rows, int), _numbers(args.width, int), _numbers(args.cardinality, int),
+            _numbers(args.missing), [value.strip() for value in args.dtypes.split(",")]
+        )
+    ]
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for params in grid:
+        for case in cases:
+            # One process per case, so peak RSS is not inherited from earlier cases
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, case, params, args.repeat).result()
+            results.append(result)
+            took = result.get("error") or f"{result['seconds_median'] * 1000:.1f} ms"
+            print(
+                f"{case:24} rows={params['rows']:<10} width={params['width']:<4} {params['dtypes']:8} {took}",
+                file=sys.stderr
+            )
+
+    report = {"environment": environment(), "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        from benchmarks.compare import compare, load
+        return compare(load(args.baseline), report, args.threshold)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,10 @@
 
 import streamlit as st
 import requests
-import subprocess
+import json
+import os
+import sys
+from pathlib import Path
 import pandas as pd
 import numpy as np
 from io import BytesIO
@@ -13,6 +16,29 @@ import matplotlib.pyplot as plt
 import matplotlib
 matplotlib.use('Agg')
 
+# Make the repo root importable when run as `streamlit run frontend/app.py`
+ROOT_DIR = str(Path(__file__).resolve().parent.parent)
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from shared.aggregations import group_sizes, grouped_histogram, split_groups
+from shared.charts import ChartCache
+from shared.column_index import ColumnIndex
+from shared.context import build_context, estimate_tokens
+from shared.correlation import correlation_matrix as compute_correlation, top_pairs
+from shared.downsample import CHART_POINT_BUDGET, downsample, point_note, stratified_quotas, stratified_sample
+from shared.dataset_pool import DatasetPool
+from shared.eda import build_analysis
+from shared.llm import CoalescingClient, LLMError, make_client
+from shared.llm_cache import CachedClient, ResponseCache
+from shared.profiling import finish_trace, start_trace, traced
+
+
+# Opt-in profiling (PROFILE_APP=1): every rerun is traced and the trace is
+# shown, with downloads, at the bottom of the page
+PROFILE_APP = os.getenv("PROFILE_APP", "") == "1"
+if PROFILE_APP:
+    rerun_trace = start_trace("streamlit rerun")
+
 
 # --------------------------------------------------
 # Session state
@@ -21,12 +47,24 @@ if "dataset_context" not in st.session_state:
     st.session_state.dataset_context = None
 
 
-if "df" not in st.session_state:
-    st.session_state.df = None
+if "dataset_hash" not in st.session_state:
+    st.session_state.dataset_hash = ""
+
+
+if "upload_id" not in st.session_state:
+    st.session_state.upload_id = None
+
+
+if "parse_stats" not in st.session_state:
+    st.session_state.parse_stats = None
+
+
+if "dataset_lease" not in st.session_state:
+    st.session_state.dataset_lease = None
 
 
 if "selected_chart_type" not in st.session_state:
-    st.session_state.selected_chart_type = "📈 Line Chart"
+    st.session_state.selected_chart_type = "Line Chart"
 
 
 # --------------------------------------------------
@@ -392,30 +430,203 @@ st.markdown("""
 
 BACKEND_URL = "http://127.0.0.1:8000"
 
+# (connect, read) seconds for backend calls; a dead backend fails fast instead of hanging
+BACKEND_TIMEOUT = (5, 300)
+
 
 # --------------------------------------------------
 # Ollama helper
 # --------------------------------------------------
-def ask_ollama_local(prompt: str) -> str:
-    try:
-        result = subprocess.run(
-            ["ollama", "run", "gemma:2b"],
-            input=prompt,
-            text=True,
-            capture_output=True,
-            timeout=120
-        )
+@st.cache_resource
+def get_llm_client():
+    # One client (and answer cache) per server process, shared by all sessions and reruns;
+    # sessions asking the same thing at the same time share one generation
+    return CachedClient(CoalescingClient(make_client(timeout=120)), ResponseCache())
 
 
-        if result.returncode != 0:
-            return f"Ollama error: {result.stderr}"
+def stream_ollama_local(prompt: str, fingerprint: str = ""):
+    try:
+        yield from get_llm_client().stream(prompt, fingerprint)
 
 
-        return result.stdout.strip()
+    except LLMError as e:
+        yield str(e)
 
 
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield f"Error: {str(e)}"
+
+
+def stream_from_backend(path: str, **kwargs):
+    """
+    Yields the text of a streaming backend endpoint as it arrives.
+    """
+    try:
+        with requests.post(f"{BACKEND_URL}{path}", stream=True, timeout=BACKEND_TIMEOUT, **kwargs) as response:
+            if response.status_code == 429:
+                # Backend LLM queue is full
+                yield response.json().get("error", "The AI is busy. Please try again shortly.")
+                return
+            response.raise_for_status()
+            response.encoding = "utf-8"
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                if chunk:
+                    yield chunk
+
+
+    except requests.RequestException as e:
+        yield f"Error: {str(e)}"
+
+
+# --------------------------------------------------
+# Chart computations (memoized)
+# --------------------------------------------------
+# Keyed on (dataset hash, function, arguments); the frame itself is passed as
+# `_df` so Streamlit never hashes it. Switching chart types or toggling a
+# widget back reuses results instead of rescanning the data.
+# st.cache_data pickles results in and out on every hit, so only results
+# that stay small whatever the row count are cached here (top values, bin
+# counts, downsampled series, statistics). Per-row group arrays are built
+# only when a chart image has to be drawn; the image itself is what is kept.
+CHART_CACHE_ITEMS = int(os.getenv("CHART_CACHE_ITEMS", "64"))
+CHART_CACHE_TTL = float(os.getenv("CHART_CACHE_TTL", "3600"))
+
+# Heatmaps wider than this many columns are drawn without per-cell labels
+CORR_ANNOTATE_MAX = int(os.getenv("CORR_ANNOTATE_MAX", "25"))
+
+
+def dataset_key(df: pd.DataFrame) -> str:
+    # Uploads already carry a content hash; anything else is hashed once here
+    if st.session_state.dataset_hash:
+        return st.session_state.dataset_hash
+    return str(pd.util.hash_pandas_object(df).sum())
+
+
+@traced("app.grouped_mean")
+def grouped_mean(_df: pd.DataFrame, group_by: str, columns: tuple):
+    # One row per group, so not cached itself: chart_series keeps the downsampled result
+    return _df.groupby(group_by)[list(columns)].mean()
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.chart_series")
+def chart_series(dataset_id: str, _df: pd.DataFrame, columns: tuple, group_by: str | None, method: str):
+    # (points to plot, rows before downsampling) for line/area/bar charts
+    data = grouped_mean(_df, group_by, columns) if group_by else _df[list(columns)]
+    return downsample(data, CHART_POINT_BUDGET, method), len(data)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.grouped_sum")
+def grouped_sum(dataset_id: str, _df: pd.DataFrame, group_by: str, column: str, limit: int):
+    # First `limit` positive group totals (pie wedges cannot be negative)
+    sums = _df.groupby(group_by)[column].sum()
+    return sums[sums > 0].head(limit)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.value_counts")
+def value_counts(dataset_id: str, _df: pd.DataFrame, column: str, limit: int):
+    return _df[column].value_counts().head(limit)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.column_stats")
+def column_stats(dataset_id: str, _df: pd.DataFrame, column: str) -> dict:
+    data = _df[column].dropna()
+    q1, median, q3 = data.quantile([0.25, 0.5, 0.75]).tolist()
+    return {
+        "count": len(data),
+        "mean": data.mean(),
+        "median": median,
+        "std": data.std(),
+        "q1": q1,
+        "q3": q3
+    }
+
+
+@traced("app.group_values")
+def group_values(_df: pd.DataFrame, group_by: str, column: str, limit: int):
+    # Every row of every group: call from draw() only, where the image is cached
+    return split_groups(_df[group_by], _df[column], limit)
+
+
+@traced("app.group_points")
+def group_points(_df: pd.DataFrame, group_by: str, columns: tuple, limit: int):
+    # Sampled to the point budget; call from draw() only, where the image is cached
+    groups = split_groups(_df[group_by], _df[list(columns)], limit)
+    return stratified_sample(groups, CHART_POINT_BUDGET)  # Same share of points per group
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.group_point_counts")
+def group_point_counts(dataset_id: str, _df: pd.DataFrame, group_by: str, columns: tuple, limit: int):
+    # (points drawn, points in total) for the caption under a grouped scatter plot
+    sizes = group_sizes(_df[group_by], _df[list(columns)], limit)
+    return sum(stratified_quotas(sizes, CHART_POINT_BUDGET)), sum(sizes)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.group_histogram")
+def group_histogram(dataset_id: str, _df: pd.DataFrame, group_by: str, column: str, limit: int):
+    return grouped_histogram(_df[group_by], _df[column], bins=30, limit=limit)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.correlation_matrix")
+def correlation_matrix(dataset_id: str, _df: pd.DataFrame, columns: tuple):
+    return compute_correlation(_df, list(columns))
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.strongest_correlations")
+def strongest_correlations(dataset_id: str, _df: pd.DataFrame, columns: tuple, k: int = 10):
+    return top_pairs(correlation_matrix(dataset_id, _df, columns), k)
+
+
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.linear_fit")
+def linear_fit(dataset_id: str, _df: pd.DataFrame, x: str, y: str):
+    # Fit on rows where both values are present so x and y stay aligned
+    pairs = _df[[x, y]].dropna()
+    return np.polyfit(pairs[x], pairs[y], 1)
+
+
+# --------------------------------------------------
+# Question context (built once per dataset)
+# --------------------------------------------------
+@st.cache_data(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+@traced("app.dataset_analysis")
+def dataset_analysis(dataset_id: str, _df: pd.DataFrame) -> dict:
+    return build_analysis(_df)
+
+
+@st.cache_resource(max_entries=CHART_CACHE_ITEMS, ttl=CHART_CACHE_TTL, show_spinner=False)
+def get_column_index(dataset_id: str, _df: pd.DataFrame) -> ColumnIndex:
+    # Searched on every question; only the top columns go into the prompt
+    return ColumnIndex.from_analysis(dataset_analysis(dataset_id, _df), _df)
+
+
+# --------------------------------------------------
+# Chart images (cached)
+# --------------------------------------------------
+CHART_THEME = "dark"
+
+
+@st.cache_resource
+def get_chart_cache():
+    # One image cache per server process; keys carry the dataset hash
+    return ChartCache()
+
+
+def show_chart(key: tuple, draw):
+    """
+    Shows the chart for `key` = (dataset hash, chart type, columns, group_by),
+    calling `draw()` to build the figure only if it is not cached yet.
+    """
+    png, seconds, cached = get_chart_cache().render(key + (CHART_THEME,), draw)
+    st.image(png, use_container_width=True)
+    st.caption(f"🖼️ {'Served from cache' if cached else 'Rendered'} in {seconds * 1000:.1f} ms")
 
 
 # --------------------------------------------------
@@ -467,6 +678,22 @@ uploaded_file = st.file_uploader(
 st.markdown('</div>', unsafe_allow_html=True)
 
 
+# --------------------------------------------------
+# Shared datasets
+# --------------------------------------------------
+@st.cache_resource
+def get_dataset_pool():
+    # One copy of each dataset per server process, leased to every session that opens it
+    return DatasetPool()
+
+
+def session_df() -> pd.DataFrame | None:
+    # Read through the lease on every rerun: the frame is never kept in session
+    # state, so a session that goes idle stops pinning it once its lease expires
+    lease = st.session_state.dataset_lease
+    return lease.frame() if lease is not None else None
+
+
 # --------------------------------------------------
 # Analyze section
 # --------------------------------------------------
@@ -477,14 +704,26 @@ if uploaded_file:
     # File info columns
     col1, col2, col3 = st.columns(3)
    
-    # Load dataframe locally
-    if uploaded_file.name.endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
-
-
-    st.session_state.df = df
+    # Load dataframe locally, only once per upload (not on every rerun);
+    # sessions opening the same file share one read-only copy. A lease
+    # returned while the session was idle is acquired again.
+    lease = st.session_state.dataset_lease
+    if st.session_state.upload_id != uploaded_file.file_id or lease is None or lease.released:
+        try:
+            lease = get_dataset_pool().acquire(uploaded_file.getvalue(), uploaded_file.name)
+        except ValueError as e:
+            st.error(f"❌ Could not read this file: {e}")
+            st.stop()
+
+        if st.session_state.dataset_lease is not None:
+            st.session_state.dataset_lease.release()
+        st.session_state.dataset_lease = lease
+        st.session_state.dataset_hash = lease.dataset_id
+        st.session_state.parse_stats = lease.stats
+        st.session_state.upload_id = uploaded_file.file_id
+
+    df = session_df()
+    parse_stats = st.session_state.parse_stats
    
     with col1:
         st.metric("📊 Rows", f"{len(df):,}")
@@ -493,6 +732,7 @@ if uploaded_file:
     with col3:
         file_size = len(uploaded_file.getvalue()) / 1024
         st.metric("💾 Size", f"{file_size:.1f} KB")
+    st.caption(f"⚡ Loaded in {parse_stats.seconds:.2f}s with the {parse_stats.engine} engine ({parse_stats.mb_per_sec:.1f} MB/s)")
    
     st.markdown('</div>', unsafe_allow_html=True)
    
@@ -504,8 +744,14 @@ if uploaded_file:
     if analyze_btn:
         with st.spinner("🔍 Analyzing your data with AI... This may take a moment."):
             files = {"file": (uploaded_file.name, uploaded_file.getvalue())}
-            eda_response = requests.post(f"{BACKEND_URL}/analyze", files=files)
-            llm_response = requests.post(f"{BACKEND_URL}/analyze-with-llm", files=files)
+            try:
+                eda_response = requests.post(f"{BACKEND_URL}/analyze", files=files, timeout=BACKEND_TIMEOUT)
+            except requests.RequestException as e:
+                st.error(f"❌ Could not reach the backend at {BACKEND_URL}: {e}")
+                st.stop()
+
+            # The backend keeps the parsed upload; reuse it instead of sending the file twice
+            dataset_id = eda_response.json().get("dataset_id") if eda_response.status_code == 200 else None
 
 
         if eda_response.status_code == 200:
@@ -518,11 +764,18 @@ if uploaded_file:
                 </h2>
             """, unsafe_allow_html=True)
            
-            overview_col1, overview_col2 = st.columns(2)
+            overview_col1, overview_col2, overview_col3 = st.columns(3)
             with overview_col1:
                 st.metric("Total Rows", f"{eda['shape']['rows']:,}")
             with overview_col2:
                 st.metric("Total Columns", eda['shape']['columns'])
+            with overview_col3:
+                st.metric(
+                    "In Memory",
+                    f"{parse_stats.memory_after / 1024 / 1024:.1f} MB",
+                    delta=f"-{parse_stats.memory_saved:.0%} vs. {parse_stats.memory_before / 1024 / 1024:.1f} MB as parsed",
+                    delta_color="inverse"
+                )
            
             st.markdown('</div>', unsafe_allow_html=True)
            
@@ -554,41 +807,35 @@ if uploaded_file:
                 st.markdown('</div>', unsafe_allow_html=True)
 
 
-        if llm_response.status_code == 200:
-            llm_data = llm_response.json()
-            st.session_state.dataset_context = llm_data["llm_explanation"]
-
+        st.markdown("""
+        <div class="card">
+            <h2 style="color: #e0e0e0; font-size: 1.8rem; font-weight: 700; margin: 0 0 1rem 0; padding: 0;">
+                🤖 AI-Powered Explanation
+            </h2>
+        """, unsafe_allow_html=True)
 
-            st.markdown(f"""
-            <div class="card">
-                <h2 style="color: #e0e0e0; font-size: 1.8rem; font-weight: 700; margin: 0 0 1rem 0; padding: 0;">
-                    🤖 AI-Powered Explanation
-                </h2>
-            """, unsafe_allow_html=True)
-            st.markdown(f"""
-            <div style="background: rgba(76, 175, 80, 0.15); padding: 1.5rem;
-                        border-radius: 10px; border-left: 4px solid #4CAF50;">
-                <p style="color: #e0e0e0; line-height: 1.8; font-size: 1.05rem;">
-                    {llm_data["llm_explanation"].replace(chr(10), '<br>')}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-           
-            pdf = generate_pdf_report(llm_data["llm_explanation"])
-            st.download_button(
-                "📄 Download PDF Report",
-                data=pdf,
-                file_name="data_analysis_report.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
-            st.markdown('</div>', unsafe_allow_html=True)
+        # Tokens are rendered as the model writes them
+        if dataset_id:
+            explanation = st.write_stream(stream_from_backend("/analyze-with-llm/stream", data={"dataset_id": dataset_id}))
+        else:
+            explanation = st.write_stream(stream_from_backend("/analyze-with-llm/stream", files=files))
+        st.session_state.dataset_context = explanation
+
+        pdf = generate_pdf_report(explanation)
+        st.download_button(
+            "📄 Download PDF Report",
+            data=pdf,
+            file_name="data_analysis_report.pdf",
+            mime="application/pdf",
+            use_container_width=True
+        )
+        st.markdown('</div>', unsafe_allow_html=True)
 
 
 # --------------------------------------------------
 # Visualizations
 # --------------------------------------------------
-if st.session_state.df is not None:
+if session_df() is not None:
     st.markdown("---")
     st.markdown("""
     <div class="card">
@@ -601,8 +848,9 @@ if st.session_state.df is not None:
     """, unsafe_allow_html=True)
 
 
-    df = st.session_state.df
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    df = session_df()
+    dataset_id = dataset_key(df)
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
     categorical_cols = df.select_dtypes(include=["object", "category", "string"]).columns.tolist()
     all_cols = df.columns.tolist()
 
@@ -625,12 +873,12 @@ if st.session_state.df is not None:
         multi_select = False
        
         with filter_col2:
-            if st.session_state.selected_chart_type in ["🔍 Scatter Plot"]:
+            if st.session_state.selected_chart_type in ["Scatter Plot"]:
                 if len(numeric_cols) > 1:
                     secondary_col = st.selectbox("📈 Secondary Variable (X-axis)",
                                                  [col for col in numeric_cols if col != selected_col],
                                                  key="secondary_var")
-            elif st.session_state.selected_chart_type in ["📈 Line Chart", "📊 Area Chart"]:
+            elif st.session_state.selected_chart_type in ["Line Chart", "Area Chart", "Box Plot"]:
                 multi_select = st.checkbox("📊 Show Multiple Variables", key="multi_var")
                 if multi_select and len(numeric_cols) > 1:
                     selected_vars = st.multiselect("Select Variables",
@@ -643,7 +891,7 @@ if st.session_state.df is not None:
                     selected_vars = [selected_col]
        
         # Grouping option for categorical data
-        if categorical_cols and st.session_state.selected_chart_type in ["📈 Line Chart", "📊 Area Chart", "🥧 Pie Chart"]:
+        if categorical_cols and st.session_state.selected_chart_type in ["Line Chart", "Area Chart", "Pie Chart", "Histogram", "Box Plot", "Scatter Plot"]:
             group_by = st.selectbox("📂 Group By (Optional)", ["None"] + categorical_cols, key="group_by")
             if group_by == "None":
                 group_by = None
@@ -753,67 +1001,65 @@ if st.session_state.df is not None:
         if st.session_state.selected_chart_type == "Line Chart":
             st.markdown("### 📈 Line Chart Visualization")
             if multi_select and len(selected_vars) > 0:
-                chart_data = df[selected_vars]
-                if group_by:
-                    chart_data = df.groupby(group_by)[selected_vars].mean()
+                chart_data, total = chart_series(dataset_id, df, tuple(selected_vars), group_by, "lttb")
                 st.line_chart(chart_data, height=450)
-                st.caption(f"📈 Showing {len(selected_vars)} variable(s)" + (f" grouped by {group_by}" if group_by else ""))
+                st.caption(f"📈 Showing {len(selected_vars)} variable(s)" + (f" grouped by {group_by}" if group_by else "")
+                           + point_note(len(chart_data), total, "LTTB"))
             else:
-                chart_data = df[selected_col]
-                if group_by:
-                    chart_data = df.groupby(group_by)[selected_col].mean()
-                st.line_chart(chart_data, height=450)
-                st.caption(f"📈 {selected_col}" + (f" grouped by {group_by}" if group_by else ""))
+                chart_data, total = chart_series(dataset_id, df, (selected_col,), group_by, "lttb")
+                st.line_chart(chart_data[selected_col], height=450)
+                st.caption(f"📈 {selected_col}" + (f" grouped by {group_by}" if group_by else "")
+                           + point_note(len(chart_data), total, "LTTB"))
        
         elif st.session_state.selected_chart_type == "Area Chart":
             st.markdown("### 📊 Area Chart Visualization")
             if multi_select and len(selected_vars) > 0:
-                chart_data = df[selected_vars]
-                if group_by:
-                    chart_data = df.groupby(group_by)[selected_vars].mean()
+                chart_data, total = chart_series(dataset_id, df, tuple(selected_vars), group_by, "minmax")
                 st.area_chart(chart_data, height=450)
-                st.caption(f"📊 Showing {len(selected_vars)} variable(s)" + (f" grouped by {group_by}" if group_by else ""))
+                st.caption(f"📊 Showing {len(selected_vars)} variable(s)" + (f" grouped by {group_by}" if group_by else "")
+                           + point_note(len(chart_data), total, "min/max envelope"))
             else:
-                chart_data = df[selected_col]
-                if group_by:
-                    chart_data = df.groupby(group_by)[selected_col].mean()
-                st.area_chart(chart_data, height=450)
-                st.caption(f"📊 {selected_col}" + (f" grouped by {group_by}" if group_by else ""))
+                chart_data, total = chart_series(dataset_id, df, (selected_col,), group_by, "minmax")
+                st.area_chart(chart_data[selected_col], height=450)
+                st.caption(f"📊 {selected_col}" + (f" grouped by {group_by}" if group_by else "")
+                           + point_note(len(chart_data), total, "min/max envelope"))
        
         elif st.session_state.selected_chart_type == "Pie Chart":
             st.markdown("### 🥧 Distribution Pie Chart")
            
             # Allow grouping by categorical column
             if group_by:
-                pie_data = df.groupby(group_by)[selected_col].sum().head(10)
+                pie_data = grouped_sum(dataset_id, df, group_by, selected_col, 10)
                 title = f"Distribution of {selected_col} by {group_by}"
             else:
-                pie_data = df[selected_col].value_counts().head(10)
+                pie_data = value_counts(dataset_id, df, selected_col, 10)
                 title = f"Distribution of {selected_col}"
            
             if len(pie_data) > 0:
-                fig, ax = plt.subplots(figsize=(7, 5), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
-               
-                # Use a better color scheme
-                colors = plt.cm.viridis(np.linspace(0, 1, len(pie_data)))
-               
-                wedges, texts, autotexts = ax.pie(
-                    pie_data.values,
-                    labels=pie_data.index,
-                    autopct="%1.1f%%",
-                    colors=colors,
-                    startangle=90,
-                    textprops={'color': '#e0e0e0', 'fontsize': 9, 'fontweight': 'bold'}
-                )
-               
-                ax.set_title(title, color='#e0e0e0', fontsize=14, fontweight='bold', pad=20)
+                def draw():
+                    fig, ax = plt.subplots(figsize=(7, 5), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    # Use a better color scheme
+                    colors = plt.cm.viridis(np.linspace(0, 1, len(pie_data)))
+                   
+                    wedges, texts, autotexts = ax.pie(
+                        pie_data.values,
+                        labels=pie_data.index,
+                        autopct="%1.1f%%",
+                        colors=colors,
+                        startangle=90,
+                        textprops={'color': '#e0e0e0', 'fontsize': 9, 'fontweight': 'bold'}
+                    )
+                   
+                    ax.set_title(title, color='#e0e0e0', fontsize=14, fontweight='bold', pad=20)
+                    return fig
                
                 # Add summary stats
                 total = pie_data.sum()
                 st.caption(f"📊 Total: {total:,.2f} | Categories: {len(pie_data)} | Top category: {pie_data.index[0]} ({pie_data.iloc[0]/total*100:.1f}%)")
                
-                st.pyplot(fig)
+                show_chart((dataset_id, "Pie Chart", (selected_col,), group_by), draw)
             else:
                 st.warning("⚠️ No data available for pie chart.")
        
@@ -822,45 +1068,50 @@ if st.session_state.df is not None:
            
             # Allow grouping by categorical column
             if group_by:
-                fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
-               
-                groups = df[group_by].unique()[:10]  # Limit to 10 groups
-                colors = plt.cm.viridis(np.linspace(0, 1, len(groups)))
-               
-                for i, group in enumerate(groups):
-                    group_data = df[df[group_by] == group][selected_col].dropna()
-                    if len(group_data) > 0:
-                        ax.hist(group_data, bins=30, alpha=0.6, label=str(group),
-                               color=colors[i], edgecolor='white', linewidth=0.5)
-               
-                ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_ylabel('Frequency', color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_title(f'Histogram of {selected_col} by {group_by}', color='#e0e0e0', fontsize=14, fontweight='bold')
-                ax.legend(title=group_by, title_fontsize=10, fontsize=9, facecolor='#2d3436', edgecolor='#4CAF50')
-                ax.tick_params(colors='#e0e0e0')
-                ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                def draw():
+                    fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    edges, groups = group_histogram(dataset_id, df, group_by, selected_col, 10)  # Limit to 10 groups
+                    colors = plt.cm.viridis(np.linspace(0, 1, len(groups)))
+                   
+                    for i, (group, counts) in enumerate(groups):
+                        if counts.sum() > 0:
+                            # Counts are precomputed on shared edges; draw them as weights
+                            ax.hist(edges[:-1], bins=edges, weights=counts, alpha=0.6, label=str(group),
+                                   color=colors[i], edgecolor='white', linewidth=0.5)
+                   
+                    ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_ylabel('Frequency', color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_title(f'Histogram of {selected_col} by {group_by}', color='#e0e0e0', fontsize=14, fontweight='bold')
+                    ax.legend(title=group_by, title_fontsize=10, fontsize=9, facecolor='#2d3436', edgecolor='#4CAF50')
+                    ax.tick_params(colors='#e0e0e0')
+                    ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                    return fig
             else:
-                fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
-               
-                data = df[selected_col].dropna()
-                n, bins, patches = ax.hist(data, bins=30, color='#4CAF50', edgecolor='#66BB6A', alpha=0.7, linewidth=1.5)
-               
                 # Add statistics
-                mean_val = data.mean()
-                median_val = data.median()
-                std_val = data.std()
+                stats = column_stats(dataset_id, df, selected_col)
+                mean_val = stats["mean"]
+                median_val = stats["median"]
+                std_val = stats["std"]
                
-                ax.axvline(mean_val, color='#FF6B6B', linestyle='--', linewidth=2, label=f'Mean: {mean_val:.2f}')
-                ax.axvline(median_val, color='#4ECDC4', linestyle='--', linewidth=2, label=f'Median: {median_val:.2f}')
-               
-                ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_ylabel('Frequency', color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_title(f'Histogram of {selected_col}', color='#e0e0e0', fontsize=14, fontweight='bold')
-                ax.legend(facecolor='#2d3436', edgecolor='#4CAF50', fontsize=10)
-                ax.tick_params(colors='#e0e0e0')
-                ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                def draw():
+                    fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    data = df[selected_col].dropna()
+                    n, bins, patches = ax.hist(data, bins=30, color='#4CAF50', edgecolor='#66BB6A', alpha=0.7, linewidth=1.5)
+                   
+                    ax.axvline(mean_val, color='#FF6B6B', linestyle='--', linewidth=2, label=f'Mean: {mean_val:.2f}')
+                    ax.axvline(median_val, color='#4ECDC4', linestyle='--', linewidth=2, label=f'Median: {median_val:.2f}')
+                   
+                    ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_ylabel('Frequency', color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_title(f'Histogram of {selected_col}', color='#e0e0e0', fontsize=14, fontweight='bold')
+                    ax.legend(facecolor='#2d3436', edgecolor='#4CAF50', fontsize=10)
+                    ax.tick_params(colors='#e0e0e0')
+                    ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                    return fig
                
                 # Display statistics
                 col1, col2, col3, col4 = st.columns(4)
@@ -871,68 +1122,80 @@ if st.session_state.df is not None:
                 with col3:
                     st.metric("Std Dev", f"{std_val:,.2f}")
                 with col4:
-                    st.metric("Count", f"{len(data):,}")
+                    st.metric("Count", f"{stats['count']:,}")
            
-            st.pyplot(fig)
+            show_chart((dataset_id, "Histogram", (selected_col,), group_by), draw)
        
         elif st.session_state.selected_chart_type == "Box Plot":
             st.markdown("### 📊 Box Plot Analysis")
+            box_style = dict(
+                patch_artist=True,
+                boxprops=dict(facecolor='#4CAF50', alpha=0.7, linewidth=1.5),
+                medianprops=dict(color='#66BB6A', linewidth=2.5),
+                whiskerprops=dict(color='#e0e0e0', linewidth=1.5),
+                capprops=dict(color='#e0e0e0', linewidth=1.5),
+                flierprops=dict(marker='o', markerfacecolor='#FF6B6B', markersize=5, alpha=0.5)
+            )
            
             # Allow grouping by categorical column or multiple variables
             if group_by:
-                fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
-               
-                groups = df[group_by].dropna().unique()[:15]  # Limit to 15 groups
-                data_to_plot = [df[df[group_by] == group][selected_col].dropna().values for group in groups]
+                box_cols = (selected_col,)
                
-                bp = ax.boxplot(data_to_plot, labels=[str(g) for g in groups], patch_artist=True,
-                               boxprops=dict(facecolor='#4CAF50', alpha=0.7, linewidth=1.5),
-                               medianprops=dict(color='#66BB6A', linewidth=2.5),
-                               whiskerprops=dict(color='#e0e0e0', linewidth=1.5),
-                               capprops=dict(color='#e0e0e0', linewidth=1.5),
-                               flierprops=dict(marker='o', markerfacecolor='#FF6B6B', markersize=5, alpha=0.5))
-               
-                ax.set_xlabel(group_by, color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_ylabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_title(f'Box Plot of {selected_col} by {group_by}', color='#e0e0e0', fontsize=14, fontweight='bold')
-                plt.xticks(rotation=45, ha='right')
+                def draw():
+                    fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    groups = group_values(df, group_by, selected_col, 15)  # Limit to 15 groups
+                    data_to_plot = [values for _, values in groups]
+                   
+                    bp = ax.boxplot(data_to_plot, tick_labels=[str(g) for g, _ in groups], **box_style)
+                   
+                    ax.set_xlabel(group_by, color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_ylabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_title(f'Box Plot of {selected_col} by {group_by}', color='#e0e0e0', fontsize=14, fontweight='bold')
+                    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+                    ax.tick_params(colors='#e0e0e0')
+                    ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--', axis='y')
+                    return fig
             elif multi_select and len(selected_vars) > 1:
-                fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
-               
-                data_to_plot = [df[var].dropna().values for var in selected_vars]
-               
-                bp = ax.boxplot(data_to_plot, labels=selected_vars, patch_artist=True,
-                               boxprops=dict(facecolor='#4CAF50', alpha=0.7, linewidth=1.5),
-                               medianprops=dict(color='#66BB6A', linewidth=2.5),
-                               whiskerprops=dict(color='#e0e0e0', linewidth=1.5),
-                               capprops=dict(color='#e0e0e0', linewidth=1.5),
-                               flierprops=dict(marker='o', markerfacecolor='#FF6B6B', markersize=5, alpha=0.5))
+                box_cols = tuple(selected_vars)
                
-                ax.set_ylabel('Value', color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_title('Box Plot Comparison', color='#e0e0e0', fontsize=14, fontweight='bold')
-                plt.xticks(rotation=45, ha='right')
+                def draw():
+                    fig, ax = plt.subplots(figsize=(12, 6), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    data_to_plot = [df[var].dropna().values for var in selected_vars]
+                   
+                    bp = ax.boxplot(data_to_plot, tick_labels=selected_vars, **box_style)
+                   
+                    ax.set_ylabel('Value', color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_title('Box Plot Comparison', color='#e0e0e0', fontsize=14, fontweight='bold')
+                    plt.setp(ax.get_xticklabels(), rotation=45, ha='right')
+                    ax.tick_params(colors='#e0e0e0')
+                    ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--', axis='y')
+                    return fig
             else:
-                fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
-                ax.set_facecolor('#2d3436')
+                box_cols = (selected_col,)
                
-                data = df[selected_col].dropna()
-                bp = ax.boxplot([data], labels=[selected_col], patch_artist=True,
-                               boxprops=dict(facecolor='#4CAF50', alpha=0.7, linewidth=1.5),
-                               medianprops=dict(color='#66BB6A', linewidth=2.5),
-                               whiskerprops=dict(color='#e0e0e0', linewidth=1.5),
-                               capprops=dict(color='#e0e0e0', linewidth=1.5),
-                               flierprops=dict(marker='o', markerfacecolor='#FF6B6B', markersize=5, alpha=0.5))
+                def draw():
+                    fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
+                    ax.set_facecolor('#2d3436')
+                   
+                    data = df[selected_col].dropna()
+                    bp = ax.boxplot([data], tick_labels=[selected_col], **box_style)
+                   
+                    ax.set_ylabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                    ax.set_title(f'Box Plot of {selected_col}', color='#e0e0e0', fontsize=14, fontweight='bold')
+                    ax.tick_params(colors='#e0e0e0')
+                    ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--', axis='y')
+                    return fig
                
                 # Add statistics
-                q1 = data.quantile(0.25)
-                q3 = data.quantile(0.75)
+                stats = column_stats(dataset_id, df, selected_col)
+                q1 = stats["q1"]
+                q3 = stats["q3"]
                 iqr = q3 - q1
-                median_val = data.median()
-               
-                ax.set_ylabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                ax.set_title(f'Box Plot of {selected_col}', color='#e0e0e0', fontsize=14, fontweight='bold')
+                median_val = stats["median"]
                
                 # Display statistics
                 col1, col2, col3, col4 = st.columns(4)
@@ -945,9 +1208,7 @@ if st.session_state.df is not None:
                 with col4:
                     st.metric("IQR", f"{iqr:,.2f}")
            
-            ax.tick_params(colors='#e0e0e0')
-            ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--', axis='y')
-            st.pyplot(fig)
+            show_chart((dataset_id, "Box Plot", box_cols, group_by), draw)
        
         elif st.session_state.selected_chart_type == "Scatter Plot":
             if len(numeric_cols) > 1 and secondary_col:
@@ -955,45 +1216,67 @@ if st.session_state.df is not None:
                
                 # Allow grouping by categorical column
                 if group_by:
-                    fig, ax = plt.subplots(figsize=(11, 7), facecolor='#2d3436')
-                    ax.set_facecolor('#2d3436')
-                   
-                    groups = df[group_by].dropna().unique()[:10]  # Limit to 10 groups
-                    colors = plt.cm.viridis(np.linspace(0, 1, len(groups)))
+                    def draw():
+                        fig, ax = plt.subplots(figsize=(11, 7), facecolor='#2d3436')
+                        ax.set_facecolor('#2d3436')
+                       
+                        groups = group_points(df, group_by, (selected_col, secondary_col), 10)  # Limit to 10 groups
+                        colors = plt.cm.viridis(np.linspace(0, 1, len(groups)))
+                       
+                        for i, (group, group_data) in enumerate(groups):
+                            if len(group_data) > 0:
+                                ax.scatter(group_data[:, 0], group_data[:, 1],
+                                         alpha=0.6, s=60, label=str(group), color=colors[i], edgecolors='white', linewidth=0.5)
+                       
+                        ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                        ax.set_ylabel(secondary_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                        ax.set_title(f'Scatter Plot: {selected_col} vs {secondary_col} by {group_by}',
+                                   color='#e0e0e0', fontsize=14, fontweight='bold')
+                        ax.legend(title=group_by, title_fontsize=10, fontsize=9, facecolor='#2d3436', edgecolor='#4CAF50')
+                        ax.tick_params(colors='#e0e0e0')
+                        ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                        return fig
                    
-                    for i, group in enumerate(groups):
-                        group_data = df[df[group_by] == group]
-                        if len(group_data) > 0:
-                            ax.scatter(group_data[selected_col], group_data[secondary_col],
-                                     alpha=0.6, s=60, label=str(group), color=colors[i], edgecolors='white', linewidth=0.5)
-                   
-                    ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                    ax.set_ylabel(secondary_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                    ax.set_title(f'Scatter Plot: {selected_col} vs {secondary_col} by {group_by}',
-                               color='#e0e0e0', fontsize=14, fontweight='bold')
-                    ax.legend(title=group_by, title_fontsize=10, fontsize=9, facecolor='#2d3436', edgecolor='#4CAF50')
+                    shown, total = group_point_counts(dataset_id, df, group_by, (selected_col, secondary_col), 10)
+                    note = point_note(shown, total, "stratified sample")
+                    if note:
+                        st.caption(f"🔍 Sampled per {group_by}" + note)
                 else:
-                    fig, ax = plt.subplots(figsize=(11, 7), facecolor='#2d3436')
-                    ax.set_facecolor('#2d3436')
-                   
                     # Calculate correlation
-                    correlation = df[[selected_col, secondary_col]].corr().iloc[0, 1]
+                    correlation = correlation_matrix(dataset_id, df, (selected_col, secondary_col)).iloc[0, 1]
                    
-                    ax.scatter(df[selected_col], df[secondary_col], alpha=0.6, color='#4CAF50',
-                             s=60, edgecolors='white', linewidth=0.5)
+                    def draw():
+                        fig, ax = plt.subplots(figsize=(11, 7), facecolor='#2d3436')
+                        ax.set_facecolor('#2d3436')
+                       
+                        if len(df) > CHART_POINT_BUDGET:
+                            # Too many points to draw one by one: show density per hexagon
+                            hb = ax.hexbin(df[selected_col], df[secondary_col], gridsize=60, cmap='viridis', mincnt=1)
+                            cbar = plt.colorbar(hb, ax=ax)
+                            cbar.set_label('Points per cell', color='#e0e0e0', fontsize=11)
+                            cbar.ax.tick_params(colors='#e0e0e0')
+                        else:
+                            ax.scatter(df[selected_col], df[secondary_col], alpha=0.6, color='#4CAF50',
+                                     s=60, edgecolors='white', linewidth=0.5)
+                       
+                        # Add trend line (a straight line only needs its end points)
+                        z = linear_fit(dataset_id, df, selected_col, secondary_col)
+                        p = np.poly1d(z)
+                        x_range = np.array([df[selected_col].min(), df[selected_col].max()], dtype=float)
+                        ax.plot(x_range, p(x_range),
+                               "r--", alpha=0.8, linewidth=2, label=f'Trend (r={correlation:.3f})')
+                       
+                        ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                        ax.set_ylabel(secondary_col, color='#e0e0e0', fontsize=12, fontweight='bold')
+                        ax.set_title(f'Scatter Plot: {selected_col} vs {secondary_col}',
+                                   color='#e0e0e0', fontsize=14, fontweight='bold')
+                        ax.legend(facecolor='#2d3436', edgecolor='#4CAF50', fontsize=10)
+                        ax.tick_params(colors='#e0e0e0')
+                        ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
+                        return fig
                    
-                    # Add trend line
-                    z = np.polyfit(df[selected_col].dropna(), df[secondary_col].dropna(), 1)
-                    p = np.poly1d(z)
-                    ax.plot(df[selected_col].dropna().sort_values(),
-                           p(df[selected_col].dropna().sort_values()),
-                           "r--", alpha=0.8, linewidth=2, label=f'Trend (r={correlation:.3f})')
-                   
-                    ax.set_xlabel(selected_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                    ax.set_ylabel(secondary_col, color='#e0e0e0', fontsize=12, fontweight='bold')
-                    ax.set_title(f'Scatter Plot: {selected_col} vs {secondary_col}',
-                               color='#e0e0e0', fontsize=14, fontweight='bold')
-                    ax.legend(facecolor='#2d3436', edgecolor='#4CAF50', fontsize=10)
+                    if len(df) > CHART_POINT_BUDGET:
+                        st.caption(f"🔍 Density of {len(df):,} points (hexbin, budget {CHART_POINT_BUDGET:,})")
                    
                     # Display correlation
                     col1, col2 = st.columns(2)
@@ -1003,9 +1286,7 @@ if st.session_state.df is not None:
                         strength = "Strong" if abs(correlation) > 0.7 else "Moderate" if abs(correlation) > 0.3 else "Weak"
                         st.metric("Relationship", strength)
                
-                ax.tick_params(colors='#e0e0e0')
-                ax.grid(True, alpha=0.3, color='#4CAF50', linestyle='--')
-                st.pyplot(fig)
+                show_chart((dataset_id, "Scatter Plot", (selected_col, secondary_col), group_by), draw)
             else:
                 st.info("ℹ️ Need at least 2 numeric columns for scatter plot. Please select a secondary variable.")
        
@@ -1022,37 +1303,43 @@ if st.session_state.df is not None:
                 )
                
                 if len(selected_corr_cols) > 1:
-                    corr = df[selected_corr_cols].corr()
-                   
-                    # Create a visual heatmap
-                    fig, ax = plt.subplots(figsize=(max(10, len(selected_corr_cols)*0.8),
-                                                    max(8, len(selected_corr_cols)*0.8)),
-                                         facecolor='#2d3436')
-                    ax.set_facecolor('#2d3436')
+                    corr = correlation_matrix(dataset_id, df, tuple(selected_corr_cols))
                    
-                    im = ax.imshow(corr.values, cmap='coolwarm', aspect='auto', vmin=-1, vmax=1)
+                    def draw():
+                        # Create a visual heatmap
+                        fig, ax = plt.subplots(figsize=(min(24, max(10, len(selected_corr_cols)*0.8)),
+                                                        min(24, max(8, len(selected_corr_cols)*0.8))),
+                                             facecolor='#2d3436')
+                        ax.set_facecolor('#2d3436')
+                       
+                        im = ax.imshow(corr.values, cmap='coolwarm', aspect='auto', vmin=-1, vmax=1)
+                       
+                        # Set ticks and labels
+                        ax.set_xticks(np.arange(len(selected_corr_cols)))
+                        ax.set_yticks(np.arange(len(selected_corr_cols)))
+                        ax.set_xticklabels(selected_corr_cols, rotation=45, ha='right', color='#e0e0e0')
+                        ax.set_yticklabels(selected_corr_cols, color='#e0e0e0')
+                       
+                        # Add text annotations (unreadable and slow to draw on wide matrices)
+                        if len(selected_corr_cols) <= CORR_ANNOTATE_MAX:
+                            values = corr.to_numpy()
+                            for i in range(len(selected_corr_cols)):
+                                for j in range(len(selected_corr_cols)):
+                                    text = ax.text(j, i, f'{values[i, j]:.2f}',
+                                                 ha="center", va="center", color="white" if abs(values[i, j]) > 0.5 else "#b0b0b0",
+                                                 fontweight='bold' if abs(values[i, j]) > 0.7 else 'normal')
+                       
+                        ax.set_title('Correlation Heatmap', color='#e0e0e0', fontsize=14, fontweight='bold', pad=20)
+                       
+                        # Add colorbar
+                        cbar = plt.colorbar(im, ax=ax)
+                        cbar.set_label('Correlation Coefficient', color='#e0e0e0', fontsize=11)
+                        cbar.ax.tick_params(colors='#e0e0e0')
+                        return fig
                    
-                    # Set ticks and labels
-                    ax.set_xticks(np.arange(len(selected_corr_cols)))
-                    ax.set_yticks(np.arange(len(selected_corr_cols)))
-                    ax.set_xticklabels(selected_corr_cols, rotation=45, ha='right', color='#e0e0e0')
-                    ax.set_yticklabels(selected_corr_cols, color='#e0e0e0')
-                   
-                    # Add text annotations
-                    for i in range(len(selected_corr_cols)):
-                        for j in range(len(selected_corr_cols)):
-                            text = ax.text(j, i, f'{corr.iloc[i, j]:.2f}',
-                                         ha="center", va="center", color="white" if abs(corr.iloc[i, j]) > 0.5 else "#b0b0b0",
-                                         fontweight='bold' if abs(corr.iloc[i, j]) > 0.7 else 'normal')
-                   
-                    ax.set_title('Correlation Heatmap', color='#e0e0e0', fontsize=14, fontweight='bold', pad=20)
-                   
-                    # Add colorbar
-                    cbar = plt.colorbar(im, ax=ax)
-                    cbar.set_label('Correlation Coefficient', color='#e0e0e0', fontsize=11)
-                    cbar.ax.tick_params(colors='#e0e0e0')
-                   
-                    st.pyplot(fig)
+                    show_chart((dataset_id, "Correlation", tuple(selected_corr_cols), None), draw)
+                    if len(selected_corr_cols) > CORR_ANNOTATE_MAX:
+                        st.caption(f"Cell values hidden above {CORR_ANNOTATE_MAX} variables; see the matrix below.")
                    
                     # Display correlation matrix as dataframe
                     st.markdown("#### 📋 Correlation Matrix (Detailed)")
@@ -1061,16 +1348,8 @@ if st.session_state.df is not None:
                    
                     # Find strongest correlations
                     st.markdown("#### 🔍 Strongest Correlations")
-                    corr_pairs = []
-                    for i in range(len(selected_corr_cols)):
-                        for j in range(i+1, len(selected_corr_cols)):
-                            corr_pairs.append({
-                                'Variable 1': selected_corr_cols[i],
-                                'Variable 2': selected_corr_cols[j],
-                                'Correlation': corr.iloc[i, j]
-                            })
-                    corr_df = pd.DataFrame(corr_pairs).sort_values('Correlation', key=abs, ascending=False)
-                    st.dataframe(corr_df.head(10), use_container_width=True, hide_index=True)
+                    corr_df = strongest_correlations(dataset_id, df, tuple(selected_corr_cols), 10)
+                    st.dataframe(corr_df, use_container_width=True, hide_index=True)
                 else:
                     st.warning("⚠️ Please select at least 2 variables for correlation analysis.")
             else:
@@ -1103,44 +1382,61 @@ question = st.text_input(
 )
 
 
-if question and st.session_state.df is not None:
+if question and session_df() is not None:
     q = question.lower()
-    df = st.session_state.df
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns.tolist()
+    df = session_df()
+    numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
 
 
     # Chart intelligence
     if numeric_cols:
         if "trend" in q or "over time" in q:
             st.markdown("### 📈 Trend Analysis")
-            st.line_chart(df[numeric_cols], height=400)
+            chart_data, total = chart_series(dataset_key(df), df, tuple(numeric_cols), None, "lttb")
+            st.line_chart(chart_data, height=400)
+            if len(chart_data) < total:
+                st.caption(f"📈 {len(numeric_cols)} variable(s)" + point_note(len(chart_data), total, "LTTB"))
 
 
         elif "distribution" in q:
             st.markdown("### 🥧 Distribution Analysis")
             col = numeric_cols[0]
-            pie_data = df[col].value_counts().head(10)
-            fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
-            ax.set_facecolor('#2d3436')
-            pie_data.plot.pie(autopct="%1.1f%%", ax=ax, colors=plt.cm.Set3.colors,
-                            textprops={'color': '#e0e0e0'})
-            ax.title.set_color('#e0e0e0')
-            st.pyplot(fig)
+            pie_data = value_counts(dataset_key(df), df, col, 10)
+
+            def draw():
+                fig, ax = plt.subplots(figsize=(10, 6), facecolor='#2d3436')
+                ax.set_facecolor('#2d3436')
+                pie_data.plot.pie(autopct="%1.1f%%", ax=ax, colors=plt.cm.Set3.colors,
+                                textprops={'color': '#e0e0e0'})
+                ax.title.set_color('#e0e0e0')
+                return fig
+
+            show_chart((dataset_key(df), "Distribution Analysis", (col,), None), draw)
 
 
         elif "compare" in q:
             st.markdown("### 📊 Comparison Analysis")
-            st.bar_chart(df[numeric_cols], height=400)
+            chart_data, total = chart_series(dataset_key(df), df, tuple(numeric_cols), None, "minmax")
+            st.bar_chart(chart_data, height=400)
+            if len(chart_data) < total:
+                st.caption(f"📊 {len(numeric_cols)} variable(s)" + point_note(len(chart_data), total, "min/max envelope"))
 
 
-    # AI explanation
-    with st.spinner("🤔 AI is thinking about your question..."):
-        prompt = f"""
+    # AI explanation, with facts about the columns the question is about
+    analysis = dataset_analysis(dataset_key(df), df)
+    relevant = get_column_index(dataset_key(df), df).top_columns(question)
+    facts, _ = build_context(analysis, question, relevant=relevant)
+
+    prompt = f"""
 You are a data analyst.
 
 
 Dataset context:
-{st.session_state.dataset_context}
+{st.session_state.dataset_context or ""}
+
+
+Dataset facts:
+{facts}
 
 
 User question:
@@ -1150,19 +1446,13 @@ User question:
 Explain clearly in simple English.
 Focus on insights, not raw numbers.
 """
-        answer = ask_ollama_local(prompt)
 
 
     st.markdown("---")
     st.markdown("### ✨ AI Answer")
-    st.markdown(f"""
-    <div style="background: rgba(76, 175, 80, 0.15); padding: 1.5rem;
-                border-radius: 10px; border-left: 4px solid #4CAF50;">
-        <p style="color: #e0e0e0; line-height: 1.8; font-size: 1.05rem;">
-            {answer.replace(chr(10), '<br>')}
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
+    if relevant:
+        st.caption(f"🔎 Columns used: {', '.join(map(str, relevant))} · ~{estimate_tokens(prompt)} prompt tokens")
+    st.write_stream(stream_ollama_local(prompt, st.session_state.dataset_hash))
 
 
 elif question:
@@ -1183,4 +1473,22 @@ st.markdown("""
         Fully offline. No paid APIs.
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
+
+
+# --------------------------------------------------
+# Profile of this rerun (PROFILE_APP=1)
+# --------------------------------------------------
+if PROFILE_APP:
+    finish_trace(rerun_trace)
+    trace = rerun_trace.to_dict()
+    with st.expander(f"⏱️ Profile of this run ({trace['wall_ms']:.0f} ms)"):
+        st.dataframe(
+            pd.DataFrame(trace["spans"], columns=["name", "start_ms", "wall_ms", "cpu_ms", "rss_delta_kb"]),
+            use_container_width=True,
+            hide_index=True
+        )
+        st.download_button("Download trace (JSON)", json.dumps(trace, indent=2),
+                           file_name=f"trace-{rerun_trace.id}.json", mime="application/json")
+        st.download_button("Download collapsed stacks (flamegraph)", rerun_trace.collapsed(),
+                           file_name=f"trace-{rerun_trace.id}.folded", mime="text/plain")
@@ -4,6 +4,10 @@
 # Data Preview heading inside its card, Data Visualizations heading inside its card,
 # and PDF report generation (ReportLab).
 
+import inspect
+import sys
+from pathlib import Path
+
 import streamlit as st
 import pandas as pd
 import numpy as np
@@ -16,13 +20,33 @@ from reportlab.lib.pagesizes import A4
 import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+
+# Make the repo root importable when run as `streamlit run frontend/app_cloud.py`
+ROOT_DIR = str(Path(__file__).resolve().parent.parent)
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+from shared.charts import ChartCache
+from shared.correlation import correlation_matrix
+from shared.downsample import CHART_POINT_BUDGET, downsample, point_note
+from shared.dataset_pool import DatasetPool
+from shared.eda import describe_numeric, logical_dtype
 
 
 # --------------------------------------------------
 # Session state
 # --------------------------------------------------
-if "df" not in st.session_state:
-    st.session_state.df = None
+if "dataset_hash" not in st.session_state:
+    st.session_state.dataset_hash = ""
+
+if "upload_id" not in st.session_state:
+    st.session_state.upload_id = None
+
+if "parse_stats" not in st.session_state:
+    st.session_state.parse_stats = None
+
+if "dataset_lease" not in st.session_state:
+    st.session_state.dataset_lease = None
 
 if "selected_chart_type" not in st.session_state:
     st.session_state.selected_chart_type = "Line Chart"
@@ -134,6 +158,32 @@ def card_start(title: str, subtitle: str | None = None):
 def card_end():
     st.markdown("</div>", unsafe_allow_html=True)
 
+# --------------------------------------------------
+# Chart images (cached per process, closed after drawing)
+# --------------------------------------------------
+@st.cache_resource
+def get_chart_cache():
+    return ChartCache()
+
+# --------------------------------------------------
+# Shared datasets (one read-only copy per process)
+# --------------------------------------------------
+@st.cache_resource
+def get_dataset_pool():
+    return DatasetPool()
+
+def show_chart(key: tuple, draw):
+    png, seconds, cached = get_chart_cache().render(key + ("dark",), draw)
+    st.image(png, use_container_width=True)
+    st.caption(f"{'Served from cache' if cached else 'Rendered'} in {seconds * 1000:.1f} ms")
+
+# Vertical box plots: matplotlib 3.10+ spells it orientation=, and deprecates vert= from 3.11
+BOXPLOT_VERTICAL = (
+    {"orientation": "vertical"}
+    if "orientation" in inspect.signature(Axes.boxplot).parameters
+    else {"vert": True}
+)
+
 # --------------------------------------------------
 # PDF Generator (Cloud friendly)
 # --------------------------------------------------
@@ -176,9 +226,10 @@ def generate_pdf_report_cloud(
     if not num_cols:
         elems.append(Paragraph("No numeric columns found.", styles["BodyText"]))
     else:
-        desc = df[num_cols].describe().round(2)
         # Keep it short in PDF: first few columns only
         show_cols = num_cols[:6]
+        # Sketch-based quartiles for large files (one pass, no sort)
+        desc = describe_numeric(df[show_cols]).round(2)
         for c in show_cols:
             elems.append(Paragraph(f"<b>{c}</b>", styles["BodyText"]))
             elems.append(Paragraph(
@@ -232,13 +283,27 @@ uploaded_file = st.file_uploader(
 card_end()
 
 if uploaded_file:
-    # Load df
-    if uploaded_file.name.lower().endswith(".csv"):
-        df = pd.read_csv(uploaded_file)
-    else:
-        df = pd.read_excel(uploaded_file)
-
-    st.session_state.df = df
+    # Load df once per upload (Feather cache, else multi-threaded parser + compact dtypes);
+    # sessions opening the same file share one read-only copy from the dataset pool.
+    # Only the lease is kept in session state, so an idle session's lease can
+    # expire and unpin the frame; it is acquired again on the next rerun.
+    lease = st.session_state.dataset_lease
+    if st.session_state.upload_id != uploaded_file.file_id or lease is None or lease.released:
+        try:
+            lease = get_dataset_pool().acquire(uploaded_file.getvalue(), uploaded_file.name)
+        except ValueError as e:
+            st.error(f"Could not read this file: {e}")
+            st.stop()
+
+        if st.session_state.dataset_lease is not None:
+            st.session_state.dataset_lease.release()
+        st.session_state.dataset_lease = lease
+        st.session_state.dataset_hash = lease.dataset_id
+        st.session_state.parse_stats = lease.stats
+        st.session_state.upload_id = uploaded_file.file_id
+
+    df = st.session_state.dataset_lease.frame()
+    parse_stats = st.session_state.parse_stats
 
     # Basic summary
     basic_summary = {
@@ -259,6 +324,11 @@ if uploaded_file:
         st.metric("Columns", f"{basic_summary['cols']:,}")
     with c3:
         st.metric("File Size", f"{basic_summary['size_kb']:.1f} KB")
+    st.caption(f"Loaded in {parse_stats.seconds:.2f}s with the {parse_stats.engine} engine ({parse_stats.mb_per_sec:.1f} MB/s)")
+    st.caption(
+        f"In memory: {parse_stats.memory_after / 1024 / 1024:.1f} MB "
+        f"(was {parse_stats.memory_before / 1024 / 1024:.1f} MB as parsed, -{parse_stats.memory_saved:.0%} after dtype compaction)"
+    )
 
     # Missing + dtypes
     colA, colB = st.columns(2)
@@ -273,7 +343,7 @@ if uploaded_file:
 
     with colB:
         st.markdown("### 🧾 Data Types")
-        types_df = (df.dtypes.astype(str)
+        types_df = (df.dtypes.map(logical_dtype)
                     .reset_index())
         types_df.columns = ["Column", "Data Type"]
         st.dataframe(types_df, use_container_width=True, hide_index=True)
@@ -340,11 +410,17 @@ if uploaded_file:
         # Render chart
         if selected_chart == "Line Chart":
             data = df.groupby(group_by)[y_col].mean() if group_by else df[y_col]
-            st.line_chart(data, height=450)
+            points = downsample(data, CHART_POINT_BUDGET, "lttb")
+            st.line_chart(points, height=450)
+            if len(points) < len(data):
+                st.caption(y_col + point_note(len(points), len(data), "LTTB"))
 
         elif selected_chart == "Area Chart":
             data = df.groupby(group_by)[y_col].mean() if group_by else df[y_col]
-            st.area_chart(data, height=450)
+            points = downsample(data, CHART_POINT_BUDGET, "minmax")
+            st.area_chart(points, height=450)
+            if len(points) < len(data):
+                st.caption(y_col + point_note(len(points), len(data), "min/max envelope"))
 
         elif selected_chart == "Pie Chart":
             if group_by:
@@ -354,40 +430,59 @@ if uploaded_file:
                 pie_data = df[y_col].value_counts().head(10)
                 title = f"Top 10 values of {y_col}"
 
-            fig, ax = plt.subplots(figsize=(8, 5), facecolor="#2d3436")
-            ax.set_facecolor("#2d3436")
-            ax.pie(pie_data.values, labels=pie_data.index, autopct="%1.1f%%")
-            ax.set_title(title, color="#e0e0e0")
-            st.pyplot(fig)
+            def draw():
+                fig, ax = plt.subplots(figsize=(8, 5), facecolor="#2d3436")
+                ax.set_facecolor("#2d3436")
+                ax.pie(pie_data.values, labels=pie_data.index, autopct="%1.1f%%")
+                ax.set_title(title, color="#e0e0e0")
+                return fig
+
+            show_chart((st.session_state.dataset_hash, "Pie Chart", (y_col,), group_by), draw)
 
         elif selected_chart == "Histogram":
-            fig, ax = plt.subplots(figsize=(10, 5), facecolor="#2d3436")
-            ax.set_facecolor("#2d3436")
-            ax.hist(df[y_col].dropna(), bins=30)
-            ax.set_title(f"Histogram of {y_col}", color="#e0e0e0")
-            ax.tick_params(colors="#e0e0e0")
-            st.pyplot(fig)
+            def draw():
+                fig, ax = plt.subplots(figsize=(10, 5), facecolor="#2d3436")
+                ax.set_facecolor("#2d3436")
+                ax.hist(df[y_col].dropna(), bins=30)
+                ax.set_title(f"Histogram of {y_col}", color="#e0e0e0")
+                ax.tick_params(colors="#e0e0e0")
+                return fig
+
+            show_chart((st.session_state.dataset_hash, "Histogram", (y_col,), None), draw)
 
         elif selected_chart == "Box Plot":
-            fig, ax = plt.subplots(figsize=(8, 5), facecolor="#2d3436")
-            ax.set_facecolor("#2d3436")
-            ax.boxplot(df[y_col].dropna(), vert=True)
-            ax.set_title(f"Box plot of {y_col}", color="#e0e0e0")
-            ax.tick_params(colors="#e0e0e0")
-            st.pyplot(fig)
+            def draw():
+                fig, ax = plt.subplots(figsize=(8, 5), facecolor="#2d3436")
+                ax.set_facecolor("#2d3436")
+                ax.boxplot(df[y_col].dropna(), **BOXPLOT_VERTICAL)
+                ax.set_title(f"Box plot of {y_col}", color="#e0e0e0")
+                ax.tick_params(colors="#e0e0e0")
+                return fig
+
+            show_chart((st.session_state.dataset_hash, "Box Plot", (y_col,), None), draw)
 
         elif selected_chart == "Scatter Plot":
             if x_col is None:
                 st.info("Pick a secondary numeric column to build the scatter plot.")
             else:
-                fig, ax = plt.subplots(figsize=(9, 6), facecolor="#2d3436")
-                ax.set_facecolor("#2d3436")
-                ax.scatter(df[x_col], df[y_col], alpha=0.6)
-                ax.set_xlabel(x_col, color="#e0e0e0")
-                ax.set_ylabel(y_col, color="#e0e0e0")
-                ax.set_title(f"{y_col} vs {x_col}", color="#e0e0e0")
-                ax.tick_params(colors="#e0e0e0")
-                st.pyplot(fig)
+                def draw():
+                    fig, ax = plt.subplots(figsize=(9, 6), facecolor="#2d3436")
+                    ax.set_facecolor("#2d3436")
+                    if len(df) > CHART_POINT_BUDGET:
+                        # Density instead of millions of individual markers
+                        hb = ax.hexbin(df[x_col], df[y_col], gridsize=60, mincnt=1)
+                        fig.colorbar(hb, ax=ax).set_label("Points per cell", color="#e0e0e0")
+                    else:
+                        ax.scatter(df[x_col], df[y_col], alpha=0.6)
+                    ax.set_xlabel(x_col, color="#e0e0e0")
+                    ax.set_ylabel(y_col, color="#e0e0e0")
+                    ax.set_title(f"{y_col} vs {x_col}", color="#e0e0e0")
+                    ax.tick_params(colors="#e0e0e0")
+                    return fig
+
+                if len(df) > CHART_POINT_BUDGET:
+                    st.caption(f"Density of {len(df):,} points (hexbin, budget {CHART_POINT_BUDGET:,})")
+                show_chart((st.session_state.dataset_hash, "Scatter Plot", (x_col, y_col), None), draw)
 
         elif selected_chart == "Correlation":
             if len(numeric_cols) < 2:
@@ -401,7 +496,7 @@ if uploaded_file:
                 if len(selected_corr_cols) < 2:
                     st.warning("Select at least 2 columns.")
                 else:
-                    corr = df[selected_corr_cols].corr()
+                    corr = correlation_matrix(df, selected_corr_cols)
                     st.dataframe(
                         corr.style.background_gradient(cmap="coolwarm", axis=None).format("{:.3f}"),
                         use_container_width=True
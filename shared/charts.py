@@ -0,0 +1,94 @@
+# shared/charts.py
+# Rendered chart images, cached by what they show.
+# A matplotlib draw + PNG encode costs tens to hundreds of milliseconds; a
+# repeat view of the same chart should only cost a dictionary lookup.
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from typing import Callable
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+from shared.profiling import span
+
+
+CHART_IMAGE_CACHE_MB = float(os.getenv("CHART_IMAGE_CACHE_MB", "64"))
+
+# Same output settings st.pyplot uses, so cached images look identical
+CHART_DPI = 200
+
+
+class ChartCache:
+    """
+    LRU of PNG bytes keyed on (dataset hash, chart type, columns, group_by,
+    theme, ...), bounded by total image size. Thread-safe, so one instance
+    can serve every Streamlit session in the process.
+    """
+
+    def __init__(self, max_bytes: int = int(CHART_IMAGE_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._images: "OrderedDict[tuple, bytes]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.render_seconds = 0.0
+
+    def render(self, key: tuple, draw: Callable[[], "plt.Figure"]) -> tuple[bytes, float, bool]:
+        """
+        (png, seconds, cached) for `key`. On a miss `draw()` builds the
+        figure, which is encoded and then closed so pyplot does not keep it.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            png = self._images.get(key)
+            if png is not None:
+                self._images.move_to_end(key)
+                self.hits += 1
+                return png, time.perf_counter() - start, True
+
+        with span("chart.draw"):
+            fig = draw()
+        try:
+            with span("chart.encode"):
+                buffer = BytesIO()
+                fig.savefig(buffer, format="png", dpi=CHART_DPI, bbox_inches="tight",
+                            facecolor=fig.get_facecolor())
+                png = buffer.getvalue()
+        finally:
+            plt.close(fig)
+        seconds = time.perf_counter() - start
+
+        with self._lock:
+            self.misses += 1
+            self.render_seconds += seconds
+            if key not in self._images:
+                self._images[key] = png
+                self._bytes += len(png)
+                self._evict()
+        return png, seconds, False
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "images": len(self._images),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "avg_render_ms": round(1000 * self.render_seconds / self.misses, 1) if self.misses else 0.0
+            }
+
+    def _evict(self):
+        # Caller holds the lock; the newest image always stays
+        while self._bytes > self.max_bytes and len(self._images) > 1:
+            _, png = self._images.popitem(last=False)
+            self._bytes -= len(png)
@@ -0,0 +1,114 @@
+# shared/column_index.py
+# Finds the columns a question is about, so prompts for wide datasets only
+# describe those. Each column is a small "document" (name, type, sample
+# values, missing flag) and questions are scored against them with BM25.
+# Built once per dataset; a search only touches the question's terms.
+
+import math
+import os
+from collections import Counter
+
+import pandas as pd
+
+from shared.context import words
+from shared.profiling import traced
+
+
+# Columns described per question
+COLUMN_TOP_K = int(os.getenv("COLUMN_TOP_K", "8"))
+
+# Most frequent values of a text column added to its document
+SAMPLE_VALUES = 5
+
+# Name words count this many times, so a named column beats a sample-value hit
+NAME_WEIGHT = 3
+
+
+def stem(word: str) -> str:
+    # Just enough to match "prices" with "price" and "categories" with "category"
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def terms(text) -> list[str]:
+    return [stem(word) for word in words(text)]
+
+
+def _type_terms(dtype: str) -> list[str]:
+    if dtype.startswith(("int", "uint", "float", "Int", "Float")):
+        return ["numeric", "number"]
+    if dtype.startswith("datetime"):
+        return ["date", "time"]
+    if dtype == "bool":
+        return ["flag", "boolean"]
+    return ["text", "category"]
+
+
+def column_document(col, dtype: str, missing: int = 0, samples: list | None = None) -> list[str]:
+    doc = terms(col) * NAME_WEIGHT + _type_terms(dtype)
+    if missing:
+        doc.append("missing")
+    for value in samples or []:
+        doc.extend(terms(value))
+    return doc
+
+
+class ColumnIndex:
+    """
+    BM25 over one document per column.
+    search() returns (column, score) pairs, best first, skipping columns
+    that share no terms with the question.
+    """
+
+    def __init__(self, documents: dict, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.columns = list(documents)
+        self.lengths = {col: len(doc) for col, doc in documents.items()}
+        self.avg_length = sum(self.lengths.values()) / max(len(documents), 1)
+
+        # term -> {column: term frequency}
+        self.postings: dict[str, dict] = {}
+        for col, doc in documents.items():
+            for term, tf in Counter(doc).items():
+                self.postings.setdefault(term, {})[col] = tf
+
+        n = len(documents)
+        self.idf = {
+            term: math.log(1 + (n - len(cols) + 0.5) / (len(cols) + 0.5))
+            for term, cols in self.postings.items()
+        }
+
+    @classmethod
+    @traced("column_index.build")
+    def from_analysis(cls, analysis: dict, df: pd.DataFrame | None = None) -> "ColumnIndex":
+        """
+        Index for an analysis dict; with the DataFrame, the most frequent
+        values of text columns are indexed too ("sales in Paris" -> city).
+        """
+        dtypes = analysis.get("data_types", {})
+        missing = analysis.get("missing_values", {})
+
+        documents = {}
+        for col in analysis["column_names"]:
+            dtype = dtypes.get(col, "object")
+            samples = None
+            if df is not None and col in df.columns and _type_terms(dtype)[0] == "text":
+                samples = df[col].value_counts().head(SAMPLE_VALUES).index.tolist()
+            documents[col] = column_document(col, dtype, missing.get(col, 0), samples)
+        return cls(documents)
+
+    @traced("column_index.search")
+    def search(self, question: str, k: int = COLUMN_TOP_K) -> list[tuple]:
+        scores: dict = {}
+        for term in set(terms(question)):
+            for col, tf in self.postings.get(term, {}).items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[col] / self.avg_length)
+                scores[col] = scores.get(col, 0.0) + self.idf[term] * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+    def top_columns(self, question: str, k: int = COLUMN_TOP_K) -> list:
+        return [col for col, _ in self.search(question, k)]
@@ -0,0 +1,167 @@
+# shared/context.py
+# Dataset facts for LLM prompts, ranked and cut to a token budget.
+# Dumping the whole analysis (a describe() dict per column) makes prompts for
+# wide datasets huge; prefill time grows with prompt length and small models
+# run out of context. Only the facts most useful for the question are kept.
+
+import math
+import os
+import re
+
+from shared.profiling import traced
+
+
+# Budget for the dataset part of a prompt, in (estimated) tokens
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "1024"))
+
+# Rough size of one token for English text and numbers; no tokenizer needed
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def words(text: str) -> list[str]:
+    """
+    Lowercase word pieces; "unitPrice", "unit_price" and "Unit Price" all
+    give ["unit", "price"].
+    """
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", str(text))
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def mentioned_columns(question: str, columns: list) -> list:
+    """
+    Columns whose name appears in the question (every word of the name).
+    """
+    asked = set(words(question))
+    return [col for col in columns if words(col) and set(words(col)) <= asked]
+
+
+def _num(value) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "n/a"
+    return f"{value:.4g}" if isinstance(value, float) else str(value)
+
+
+def _stats_line(col, dtype: str, stats: dict | None, missing: int, rows: int) -> str:
+    line = f"{col} ({dtype})"
+    if stats:
+        line += (
+            f": mean {_num(stats.get('mean'))}, median {_num(stats.get('50%'))}, "
+            f"range {_num(stats.get('min'))} to {_num(stats.get('max'))}, std {_num(stats.get('std'))}"
+        )
+    if missing:
+        line += f", {missing} missing ({100 * missing / max(rows, 1):.1f}%)"
+    return line
+
+
+def _skew(stats: dict) -> float:
+    # Mean far from median (in std units) marks a skewed, noteworthy column
+    mean, median, std = stats.get("mean"), stats.get("50%"), stats.get("std")
+    try:
+        score = float(abs(mean - median) / std)
+    except (TypeError, ValueError, ZeroDivisionError):
+        # Missing stats (None where a stat was NaN, e.g. std of one value)
+        return 0.0
+    return 0.0 if math.isnan(score) else min(score, 1.0)
+
+
+SECTIONS = (
+    ("asked", "Columns relevant to the question:"),
+    ("missing", "Missing values:"),
+    ("numeric", "Other numeric columns:")
+)
+
+
+@traced("context.build")
+def build_context(
+    analysis: dict,
+    question: str = "",
+    budget: int = LLM_CONTEXT_TOKENS,
+    relevant: list | None = None
+) -> tuple[str, dict]:
+    """
+    (text, info) describing the dataset in at most about `budget` tokens.
+
+    Facts are ranked: columns relevant to the question (`relevant`, default:
+    columns named in it), then the columns with the most missing values,
+    then the most skewed numeric columns. Remaining column names fill what is
+    left of the budget. info reports tokens used and facts kept / dropped.
+    """
+    rows = analysis["rows"]
+    columns = analysis["column_names"]
+    missing = analysis.get("missing_values", {})
+    dtypes = analysis.get("data_types", {})
+    summary = analysis.get("numeric_summary", {})
+
+    if relevant is None:
+        relevant = mentioned_columns(question, columns)
+
+    # (score, section, column, line)
+    facts = []
+    for rank, col in enumerate(relevant):
+        line = _stats_line(col, dtypes.get(col, "?"), summary.get(col), missing.get(col, 0), rows)
+        facts.append((3.0 - rank / (len(relevant) + 1), "asked", col, line))
+
+    asked = set(relevant)
+    for col, count in missing.items():
+        if count and col not in asked:
+            share = count / max(rows, 1)
+            facts.append((1.0 + share, "missing", col, f"{col}: {count} ({100 * share:.1f}%)"))
+
+    for col, stats in summary.items():
+        if col not in asked:
+            line = _stats_line(col, dtypes.get(col, "?"), stats, 0, rows)
+            facts.append((0.5 + 0.5 * _skew(stats), "numeric", col, line))
+
+    facts.sort(key=lambda fact: -fact[0])
+
+    header = f"Rows: {rows}, columns: {len(columns)}"
+    used = estimate_tokens(header) + 1
+    chosen = {name: [] for name, _ in SECTIONS}
+    titles = dict(SECTIONS)
+    shown = set()
+
+    for _, section, col, line in facts:
+        cost = estimate_tokens("- " + line) + 1
+        if not chosen[section]:
+            cost += estimate_tokens(titles[section]) + 1
+        if used + cost > budget:
+            continue
+        chosen[section].append(line)
+        shown.add(col)
+        used += cost
+
+    parts = [header]
+    for name, title in SECTIONS:
+        if chosen[name]:
+            parts.append(title)
+            parts.extend(f"- {line}" for line in chosen[name])
+
+    # Names of the columns not described above, as many as still fit
+    rest = [col for col in columns if col not in shown]
+    if rest:
+        listed = []
+        line = "Other columns: "
+        for col in rest:
+            item = f"{col} ({dtypes.get(col, '?')})"
+            more = f" and {len(rest) - len(listed) - 1} more"
+            if used + estimate_tokens(line + ", ".join(listed + [item]) + more) > budget:
+                break
+            listed.append(item)
+        if listed:
+            line += ", ".join(listed)
+            if len(listed) < len(rest):
+                line += f" and {len(rest) - len(listed)} more"
+            parts.append(line)
+            used += estimate_tokens(line) + 1
+
+    text = "\n".join(parts)
+    kept = sum(len(lines) for lines in chosen.values())
+    return text, {
+        "context_tokens": estimate_tokens(text),
+        "facts_kept": kept,
+        "facts_dropped": len(facts) - kept
+    }
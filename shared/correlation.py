@@ -0,0 +1,89 @@
+# shared/correlation.py
+# Pearson correlation for wide frames: float32 matrix products, top pairs.
+
+import numpy as np
+import pandas as pd
+
+from shared.profiling import traced
+
+
+# Rows multiplied per block; partial sums are accumulated in float64
+CORR_BLOCK_ROWS = 65536
+
+
+@traced("correlation.matrix")
+def correlation_matrix(df: pd.DataFrame, columns: list | None = None) -> pd.DataFrame:
+    """
+    Pairwise-complete Pearson correlation, like df.corr(), via matrix products.
+
+    Columns are centered in float64, then multiplied as float32 blocks of
+    CORR_BLOCK_ROWS rows. Missing values are handled with a 0/1 presence
+    mask, so every pair still only uses rows where both values exist.
+    """
+    columns = list(df.columns if columns is None else columns)
+    data = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    present = ~np.isnan(data)
+    data = np.where(present, data, 0.0)
+    # Centering first keeps the float32 sums from cancelling
+    data -= data.sum(axis=0) / np.maximum(present.sum(axis=0), 1)
+    data[~present] = 0.0
+
+    k = len(columns)
+    xy = np.zeros((k, k))
+    if present.all():
+        for start in range(0, len(data), CORR_BLOCK_ROWS):
+            block = data[start:start + CORR_BLOCK_ROWS].astype(np.float32)
+            xy += block.T @ block
+        var = np.diag(xy).copy()
+        cov, var_i, var_j = xy, var[:, None], var[None, :]
+        count = np.full((k, k), float(len(data)))
+    else:
+        x_m, x2_m, count = np.zeros((k, k)), np.zeros((k, k)), np.zeros((k, k))
+        for start in range(0, len(data), CORR_BLOCK_ROWS):
+            block = data[start:start + CORR_BLOCK_ROWS].astype(np.float32)
+            mask = present[start:start + CORR_BLOCK_ROWS].astype(np.float32)
+            xy += block.T @ block
+            # x_m[i, j]: sum of column i over rows where column j is present
+            x_m += block.T @ mask
+            x2_m += (block * block).T @ mask
+            count += mask.T @ mask
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = xy - x_m * x_m.T / count
+            var_i = x2_m - x_m ** 2 / count
+            var_j = var_i.T
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        corr = cov / np.sqrt(var_i * var_j)
+    # Constant columns and pairs with fewer than 2 shared rows are undefined
+    corr[(count < 2) | (var_i <= 0) | (var_j <= 0)] = np.nan
+    corr = np.clip(corr, -1.0, 1.0)
+    defined = ~np.isnan(np.diag(corr))
+    corr[np.diag_indices(k)] = np.where(defined, 1.0, np.nan)
+
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+@traced("correlation.top_pairs")
+def top_pairs(corr: pd.DataFrame, k: int = 10) -> pd.DataFrame:
+    """
+    The k most strongly correlated column pairs (by absolute value),
+    taken from the upper triangle with argpartition instead of a full sort.
+    """
+    rows, cols = np.triu_indices(len(corr), k=1)
+    values = corr.to_numpy()[rows, cols]
+    strength = np.nan_to_num(np.abs(values), nan=-1.0)
+
+    k = min(k, len(values))
+    if k < len(values):
+        best = np.argpartition(-strength, k - 1)[:k]
+    else:
+        best = np.arange(len(values))
+    best = best[np.argsort(-strength[best], kind="stable")]
+
+    names = corr.columns.to_numpy()
+    return pd.DataFrame({
+        "Variable 1": names[rows[best]],
+        "Variable 2": names[cols[best]],
+        "Correlation": values[best]
+    })
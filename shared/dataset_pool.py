@@ -0,0 +1,200 @@
+# shared/dataset_pool.py
+# One copy of each uploaded dataset per Streamlit process, shared by every
+# browser session that opens it. Datasets are keyed by content hash and
+# handed out as leases. A session holds its lease in st.session_state (not the
+# frame itself), and the lease is returned when the session switches files, its
+# state is dropped, or it has not been used for DATASET_LEASE_IDLE seconds.
+#
+# Resident memory is therefore the datasets of sessions active within the idle
+# timeout, plus up to DATASET_POOL_MB of datasets nobody holds. An idle session
+# that comes back re-acquires its file, usually from the Feather cache.
+#
+# Frames are reopened from the memory-mapped Feather cache (shared/ingest.py),
+# so numeric columns are backed by the page cache rather than private copies.
+# Each lease gets a shallow copy: the column data is shared, but with pandas
+# copy-on-write (pandas 3, pinned in requirements.txt) a session that
+# modifies its frame gets its own copy of those columns, and the pooled
+# frame and other sessions never see the change.
+
+import os
+import queue
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import pandas as pd
+
+from shared.ingest import ParseStats, content_hash, frame_bytes, load_dataset, read_cached
+
+
+# Memory kept for datasets no session holds any more
+DATASET_POOL_MB = float(os.getenv("DATASET_POOL_MB", "1024"))
+
+# Leases unused for this many seconds are returned, unpinning their dataset
+DATASET_LEASE_IDLE = float(os.getenv("DATASET_LEASE_IDLE", "1800"))
+
+
+@dataclass
+class _Entry:
+    df: pd.DataFrame
+    file_name: str
+    stats: ParseStats
+    nbytes: int
+    leases: int = 0
+
+
+class Lease:
+    """
+    One session's handle on a pooled dataset. release() returns it; so do
+    garbage collection, for sessions that simply go away, and the pool once
+    the lease has been idle for DATASET_LEASE_IDLE seconds.
+    """
+
+    def __init__(self, pool: "DatasetPool", dataset_id: str, entry: _Entry):
+        self.dataset_id = dataset_id
+        self.file_name = entry.file_name
+        self.stats = entry.stats
+        self.last_used = time.monotonic()
+        self._df = entry.df.copy(deep=False)
+        self._pool = pool
+        # Garbage collection can run this at any moment, even while the pool's
+        # lock is held, so it only queues the return for the pool to apply
+        self._finalizer = weakref.finalize(self, pool._returned.put, dataset_id)
+
+    def frame(self) -> pd.DataFrame | None:
+        """
+        The dataset, or None once the lease was returned (acquire it again).
+        Keep the result for one rerun only: holding it longer pins the frame.
+        """
+        self.last_used = time.monotonic()
+        self._pool.reap()
+        return self._df
+
+    @property
+    def released(self) -> bool:
+        return not self._finalizer.alive
+
+    def release(self):
+        self._df = None
+        self._finalizer()
+
+
+class DatasetPool:
+    """
+    Datasets by content hash, each parsed or reopened once per process.
+
+    Datasets with leases are always kept. When the last lease is returned the
+    dataset stays for the next session to open it, until the pool holds more
+    than `max_bytes`; then idle datasets are dropped least-recently-used first.
+    Leases idle for longer than `lease_idle` seconds are returned by reap(),
+    which runs whenever any session acquires or reads a dataset.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = int(DATASET_POOL_MB * 1024 * 1024),
+        lease_idle: float = DATASET_LEASE_IDLE
+    ):
+        self.max_bytes = max_bytes
+        self.lease_idle = lease_idle
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # One loader per dataset; other sessions opening it wait for that load
+        self._loading: dict[str, threading.Lock] = {}
+        self._leases: "weakref.WeakSet[Lease]" = weakref.WeakSet()
+        self._returned: "queue.SimpleQueue[str]" = queue.SimpleQueue()
+        self._next_reap = 0.0
+
+    def acquire(self, data: bytes, filename: str) -> Lease:
+        """
+        A lease on the dataset in these bytes, loading it only if no session
+        has it open. Raises ValueError if the file cannot be parsed.
+        """
+        self.reap()
+        dataset_id = content_hash(data)
+
+        with self._lock:
+            loading = self._loading.setdefault(dataset_id, threading.Lock())
+
+        try:
+            with loading:
+                with self._lock:
+                    entry = self._entries.get(dataset_id)
+                    if entry is not None:
+                        return self._lease(dataset_id, entry)
+
+                entry = self._load(data, filename, dataset_id)
+                with self._lock:
+                    self._entries[dataset_id] = entry
+                    self._bytes += entry.nbytes
+                    lease = self._lease(dataset_id, entry)
+                    self._evict()
+                return lease
+        finally:
+            with self._lock:
+                if self._loading.get(dataset_id) is loading:
+                    del self._loading[dataset_id]
+
+    def _load(self, data: bytes, filename: str, dataset_id: str) -> _Entry:
+        dataset_id, df, stats = load_dataset(data, filename, dataset_id)
+        if stats.engine != "feather cache":
+            # Swap the freshly parsed frame for the memory-mapped copy just written
+            cached = read_cached(dataset_id)
+            if cached is not None:
+                df = cached[0]
+        return _Entry(df=df, file_name=filename, stats=stats, nbytes=frame_bytes(df))
+
+    def _lease(self, dataset_id: str, entry: _Entry) -> Lease:
+        # Called with self._lock held
+        entry.leases += 1
+        self._entries.move_to_end(dataset_id)
+        lease = Lease(self, dataset_id, entry)
+        self._leases.add(lease)
+        return lease
+
+    def reap(self):
+        """
+        Returns leases idle for longer than lease_idle. Cheap to call often:
+        it scans at most once per tenth of the timeout.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if now >= self._next_reap:
+                self._next_reap = now + self.lease_idle / 10
+                for lease in [lease for lease in self._leases if now - lease.last_used > self.lease_idle]:
+                    lease.release()
+            self._apply_returns()
+
+    def _apply_returns(self):
+        # Called with self._lock held
+        while True:
+            try:
+                dataset_id = self._returned.get_nowait()
+            except queue.Empty:
+                break
+            # Datasets with leases are never evicted, so the entry is still here
+            self._entries[dataset_id].leases -= 1
+        self._evict()
+
+    def _evict(self):
+        for dataset_id in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                break
+            entry = self._entries[dataset_id]
+            if entry.leases == 0:
+                del self._entries[dataset_id]
+                self._bytes -= entry.nbytes
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._apply_returns()
+            return {
+                "datasets": len(self._entries),
+                "leases": sum(entry.leases for entry in self._entries.values()),
+                "lease_idle": self.lease_idle,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
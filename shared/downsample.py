@@ -0,0 +1,138 @@
+# shared/downsample.py
+# Reduce large series and point clouds to a fixed point budget before plotting.
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from shared.profiling import traced
+
+
+# Most points sent to the browser (or matplotlib) per chart
+CHART_POINT_BUDGET = int(os.getenv("CHART_POINT_BUDGET", "2000"))
+
+
+def lttb(y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Indices of `n_out` points chosen by Largest-Triangle-Three-Buckets.
+
+    Rows are treated as evenly spaced on x. The first and last points are
+    always kept; each bucket in between keeps the point forming the largest
+    triangle with the previous pick and the next bucket's average, which
+    preserves peaks and troughs far better than striding.
+    """
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return np.arange(n)
+
+    x = np.arange(n, dtype=np.float64)
+    bounds = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = bounds[i], bounds[i + 1]
+        next_hi = bounds[i + 2] if i + 2 < len(bounds) else n
+        avg_x = x[hi:next_hi].mean()
+        avg_y = y[hi:next_hi].mean()
+        area = np.abs(
+            (x[a] - avg_x) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (avg_y - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        picked[i + 1] = a
+    return picked
+
+
+def minmax_envelope(y: np.ndarray, n_buckets: int) -> np.ndarray:
+    """
+    Sorted indices of the minimum and maximum of each of `n_buckets` equal
+    buckets, plus the first and last row. Keeps the full vertical extent,
+    which is what an area chart shows. Missing values are ignored.
+    """
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+
+    size = -(-n // n_buckets)
+    padded = np.full(size * n_buckets, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, size)
+
+    offsets = np.arange(n_buckets) * size
+    lows = offsets + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1)
+    highs = offsets + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)
+    picked = np.concatenate(([0, n - 1], lows, highs))
+    return np.unique(picked[picked < n])
+
+
+@traced("downsample")
+def downsample(
+    data: pd.Series | pd.DataFrame,
+    budget: int = CHART_POINT_BUDGET,
+    method: str = "lttb"
+) -> pd.Series | pd.DataFrame:
+    """
+    The rows of `data` worth plotting within `budget` points, index intact.
+
+    method="lttb" suits line charts, method="minmax" area and bar charts.
+    Each column of a DataFrame gets an equal share of the budget and the
+    union of the chosen rows is returned.
+    """
+    if len(data) <= budget:
+        return data
+
+    frame = data.to_frame() if isinstance(data, pd.Series) else data
+    share = max(3, budget // max(1, frame.shape[1]))
+
+    picked = []
+    for column in frame.columns:
+        y = frame[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if method == "minmax":
+            picked.append(minmax_envelope(y, max(1, (share - 2) // 2)))
+        else:
+            valid = np.flatnonzero(~np.isnan(y))
+            picked.append(valid[lttb(y[valid], share)])
+
+    rows = np.unique(np.concatenate(picked))
+    return data.iloc[rows]
+
+
+@traced("downsample.stratified_sample")
+def stratified_sample(
+    groups: list[tuple[object, np.ndarray]],
+    budget: int = CHART_POINT_BUDGET,
+    seed: int = 0
+) -> list[tuple[object, np.ndarray]]:
+    """
+    Random sample of [(group, rows)] within `budget` rows in total, each
+    group keeping its share of the rows (at least one row). Deterministic
+    for a given seed so reruns draw the same points.
+    """
+    quotas = stratified_quotas([len(rows) for _, rows in groups], budget)
+    if quotas == [len(rows) for _, rows in groups]:
+        return groups
+
+    rng = np.random.default_rng(seed)
+    sampled = []
+    for (group, rows), quota in zip(groups, quotas):
+        keep = np.sort(rng.choice(len(rows), size=quota, replace=False))
+        sampled.append((group, rows[keep]))
+    return sampled
+
+
+def stratified_quotas(sizes: list[int], budget: int = CHART_POINT_BUDGET) -> list[int]:
+    """Rows stratified_sample keeps from groups of these sizes."""
+    total = sum(sizes)
+    if total <= budget:
+        return list(sizes)
+    return [min(size, max(1, round(budget * size / total))) for size in sizes]
+
+
+def point_note(shown: int, total: int, method: str) -> str:
+    """Caption fragment for a chart, empty when nothing was dropped."""
+    if shown >= total:
+        return ""
+    return f" · {shown:,} of {total:,} points ({method}, budget {CHART_POINT_BUDGET:,})"
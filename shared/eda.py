@@ -0,0 +1,219 @@
+# shared/eda.py
+# Automatic data analysis (EDA), in memory or streamed chunk by chunk.
+
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from shared.profiling import traced
+from shared.sketches import KLLSketch, Moments
+
+
+# Rows per chunk in streaming mode; peak memory scales with this, not file size
+EDA_CHUNK_ROWS = 100_000
+
+DESCRIBE_QUANTILES = (0.25, 0.5, 0.75)
+
+# Above this many rows, "auto" summaries use quantile sketches instead of sorting
+APPROX_SUMMARY_ROWS = int(os.getenv("APPROX_SUMMARY_ROWS", "1000000"))
+
+# Target normalized rank error of approximate quartiles (0.01 = 1%)
+QUANTILE_RANK_ERROR = float(os.getenv("QUANTILE_RANK_ERROR", "0.01"))
+
+
+@traced("eda.describe")
+def describe_numeric(
+    df: pd.DataFrame,
+    mode: str = "auto",
+    rank_error: float = QUANTILE_RANK_ERROR
+) -> pd.DataFrame:
+    """
+    df.describe() with an approximate mode for large frames.
+
+    Only numeric columns are summarised (dates and text never are).
+    mode="exact" is df.describe() on them. mode="approximate" makes one linear
+    pass per numeric column: moments are exact, quartiles come from a KLL
+    sketch within about `rank_error`. mode="auto" is exact up to
+    APPROX_SUMMARY_ROWS rows.
+    """
+    numeric = df.select_dtypes(include=["number"])
+    if numeric.columns.empty:
+        return pd.DataFrame()
+
+    if mode == "auto":
+        mode = "approximate" if len(df) > APPROX_SUMMARY_ROWS else "exact"
+    if mode == "exact":
+        return numeric.describe()
+
+    summary = {}
+    for col in numeric.columns:
+        values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        moments = Moments()
+        moments.update(values)
+        sketch = KLLSketch.for_error(rank_error)
+        sketch.update(values)
+        summary[col] = _summary_stats(moments, sketch)
+    return pd.DataFrame(summary)
+
+
+def _summary_stats(moments: Moments, sketch: KLLSketch) -> dict:
+    q25, q50, q75 = sketch.quantiles(DESCRIBE_QUANTILES)
+    empty = moments.count == 0
+    return {
+        "count": float(moments.count),
+        "mean": math.nan if empty else moments.mean,
+        "std": moments.std,
+        "min": math.nan if empty else moments.min,
+        "25%": q25,
+        "50%": q50,
+        "75%": q75,
+        "max": math.nan if empty else moments.max
+    }
+
+
+def _json_number(value) -> float | None:
+    # NaN and infinity (the std of a single value, an empty column) are not JSON
+    value = float(value)
+    return round(value, 2) if math.isfinite(value) else None
+
+
+def logical_dtype(dtype) -> str:
+    """
+    The type a column holds, not how it is stored: compacted int8/float32,
+    category and Arrow strings report like a plain read (int64, float64,
+    object), so in-memory and streamed analyses (and the prompts and cache
+    keys built from them) agree for the same file.
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_integer_dtype(dtype):
+        return "int64"
+    if pd.api.types.is_float_dtype(dtype):
+        return "float64"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime64[ns]" if getattr(dtype, "tz", None) is None else f"datetime64[ns, {dtype.tz}]"
+    if isinstance(dtype, (pd.CategoricalDtype, pd.StringDtype)) or dtype == object:
+        return "object"
+    return str(dtype)
+
+
+@traced("eda.build_analysis")
+def build_analysis(df: pd.DataFrame) -> dict:
+    return {
+        "rows": df.shape[0],
+        "columns": df.shape[1],
+        "column_names": list(df.columns),
+        "missing_values": df.isnull().sum().to_dict(),
+        "data_types": {col: logical_dtype(dtype) for col, dtype in df.dtypes.items()},
+        "numeric_summary": {
+            col: {stat: _json_number(value) for stat, value in stats.items()}
+            for col, stats in describe_numeric(df).to_dict().items()
+        }
+    }
+
+
+def _merge_dtype(a: str | None, b: str) -> str:
+    if a is None or a == b:
+        return b
+    if a in ("int64", "float64") and b in ("int64", "float64"):
+        return "float64"
+    return "object"
+
+
+class StreamingProfile:
+    """
+    Accumulates the same outputs as build_analysis from a sequence of chunks.
+
+    Row counts, missing counts and moments are exact. Quartiles come from a
+    KLL sketch: exact while a column has at most about 3 / rank_error values
+    (300 at the default 1%), within about rank_error beyond that. Profiles of
+    different chunks (or files split across workers) can be merged.
+    """
+
+    def __init__(self, rank_error: float = QUANTILE_RANK_ERROR):
+        self.rank_error = rank_error
+        self.rows = 0
+        self.column_names: list = []
+        self.missing: dict = {}
+        self.dtypes: dict = {}
+        self.moments: dict = {}
+        self.sketches: dict = {}
+
+    def update(self, chunk: pd.DataFrame):
+        if not self.column_names:
+            self.column_names = list(chunk.columns)
+
+        self.rows += len(chunk)
+        nulls = chunk.isnull().sum()
+
+        for col in chunk.columns:
+            self.missing[col] = self.missing.get(col, 0) + int(nulls[col])
+
+            numeric = pd.api.types.is_numeric_dtype(chunk[col]) and not pd.api.types.is_bool_dtype(chunk[col])
+            if numeric and col not in self.moments:
+                self.moments[col] = Moments()
+                self.sketches[col] = KLLSketch.for_error(self.rank_error)
+
+            # An all-empty chunk says nothing about the column's real type
+            if nulls[col] == len(chunk):
+                continue
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), logical_dtype(chunk[col].dtype))
+
+            if numeric:
+                values = chunk[col].to_numpy(dtype=np.float64, na_value=np.nan)
+                self.moments[col].update(values)
+                self.sketches[col].update(values)
+
+    def merge(self, other: "StreamingProfile"):
+        if not self.column_names:
+            self.column_names = list(other.column_names)
+
+        self.rows += other.rows
+        for col, count in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + count
+        for col, dtype in other.dtypes.items():
+            self.dtypes[col] = _merge_dtype(self.dtypes.get(col), dtype)
+        for col, moments in other.moments.items():
+            if col not in self.moments:
+                self.moments[col] = Moments()
+                self.sketches[col] = KLLSketch.for_error(self.rank_error)
+            self.moments[col].merge(moments)
+            self.sketches[col].merge(other.sketches[col])
+
+    def to_analysis(self) -> dict:
+        dtypes = {}
+        for col in self.column_names:
+            dtype = self.dtypes.get(col, "float64")
+            # Like a full read: an integer column with gaps becomes float
+            if dtype == "int64" and self.missing.get(col, 0) > 0:
+                dtype = "float64"
+            dtypes[col] = dtype
+
+        numeric_summary = {}
+        for col in self.column_names:
+            if col not in self.moments or dtypes[col] not in ("int64", "float64"):
+                continue
+            stats = _summary_stats(self.moments[col], self.sketches[col])
+            numeric_summary[col] = {k: _json_number(v) for k, v in stats.items()}
+
+        return {
+            "rows": self.rows,
+            "columns": len(self.column_names),
+            "column_names": list(self.column_names),
+            "missing_values": {col: self.missing.get(col, 0) for col in self.column_names},
+            "data_types": dtypes,
+            "numeric_summary": numeric_summary
+        }
+
+
+@traced("eda.profile_csv")
+def profile_csv(source, chunk_rows: int = EDA_CHUNK_ROWS, **read_kwargs) -> dict:
+    """
+    EDA for a CSV path or file object without loading it whole.
+    """
+    profile = StreamingProfile()
+    for chunk in pd.read_csv(source, chunksize=chunk_rows, **read_kwargs):
+        profile.update(chunk)
+    return profile.to_analysis()
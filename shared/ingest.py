@@ -0,0 +1,318 @@
+# shared/ingest.py
+# Dataset parsing shared by the FastAPI backend and the Streamlit apps.
+# CSVs are parsed with the multi-threaded pyarrow engine when it is installed,
+# Excel files with calamine when it is installed, and dtypes are compacted
+# (categoricals, downcast integers, Arrow-backed strings) after loading.
+# Parsed datasets are also written to an on-disk Feather cache keyed by
+# content hash, so the same file is only ever parsed once per machine.
+
+import hashlib
+import os
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from shared.profiling import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.feather as feather
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+try:
+    import python_calamine  # noqa: F401
+    HAS_CALAMINE = True
+except ImportError:
+    HAS_CALAMINE = False
+
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls")
+
+# Text columns with at most this share of distinct values become categoricals
+CATEGORY_MAX_RATIO = 0.5
+
+# Opt-in: float64 columns whose values all fit float32 exactly are stored as
+# float32. Storage stays exact, but means, sums and quantiles over them are then
+# computed in float32 (about 7 significant digits), so reported stats can shift.
+DOWNCAST_FLOATS = os.getenv("DOWNCAST_FLOATS", "0") == "1"
+
+DATASET_CACHE_DIR = Path(os.getenv(
+    "DATASET_CACHE_DIR",
+    str(Path(__file__).resolve().parent.parent / ".cache" / "datasets")
+))
+DATASET_DISK_CACHE_MB = float(os.getenv("DATASET_DISK_CACHE_MB", "4096"))
+
+
+@dataclass
+class ParseStats:
+    engine: str
+    seconds: float
+    bytes: int
+    # DataFrame memory as parsed and after optimize_dtypes
+    memory_before: int = 0
+    memory_after: int = 0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / 1024 / 1024 / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def memory_saved(self) -> float:
+        # Share of the as-parsed memory removed by optimize_dtypes
+        return 1 - self.memory_after / self.memory_before if self.memory_before else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "engine": self.engine,
+            "seconds": round(self.seconds, 4),
+            "bytes": self.bytes,
+            "mb_per_sec": round(self.mb_per_sec, 2),
+            "memory_before": self.memory_before,
+            "memory_after": self.memory_after
+        }
+
+
+@traced("ingest.hash")
+def content_hash(data: bytes) -> str:
+    """
+    Stable ID for an uploaded file, derived from its bytes only.
+    The same upload always maps to the same ID, whatever its file name.
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def content_hash_file(f, block_size: int = 1 << 20) -> str:
+    """
+    Same ID as content_hash, read from a binary file object block by block.
+    The file is rewound afterwards.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    f.seek(0)
+    for block in iter(lambda: f.read(block_size), b""):
+        digest.update(block)
+    f.seek(0)
+    return digest.hexdigest()
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Smaller dtypes with the same values:
+    low-cardinality text -> category, other text -> Arrow-backed string,
+    integers -> the narrowest integer type that holds them,
+    float64 -> float32 when every value round-trips and DOWNCAST_FLOATS is on.
+    """
+    converted = {}
+
+    for col in df.columns:
+        series = df[col]
+
+        if pd.api.types.is_integer_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            converted[col] = pd.to_numeric(series, downcast="integer")
+
+        elif DOWNCAST_FLOATS and series.dtype == np.float64:
+            values = series.to_numpy()
+            with np.errstate(over="ignore"):
+                narrow = values.astype(np.float32)
+            if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+                converted[col] = pd.Series(narrow, index=series.index, name=col)
+
+        elif series.dtype == object or isinstance(series.dtype, pd.StringDtype):
+            if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) != "string":
+                continue  # mixed Python objects: leave alone
+            non_null = series.count()
+            if non_null and series.nunique(dropna=True) <= CATEGORY_MAX_RATIO * non_null:
+                converted[col] = series.astype("category")
+            elif series.dtype == object and HAS_PYARROW:
+                converted[col] = series.astype(pd.StringDtype("pyarrow"))
+
+    if not converted:
+        return df
+
+    # Shallow copy: untouched columns are shared, not duplicated
+    df = df.copy(deep=False)
+    for col, series in converted.items():
+        df[col] = series
+    return df
+
+
+def frame_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True).sum())
+
+
+@traced("ingest.parse")
+def parse_dataset(data: bytes, filename: str, compact: bool = True) -> tuple[pd.DataFrame, ParseStats]:
+    """
+    Parses raw CSV / Excel bytes and reports how long it took.
+    Raises ValueError for unsupported files or unreadable content.
+    """
+    name = filename.lower()
+    start = time.perf_counter()
+
+    if name.endswith(".csv"):
+        df, engine = _read_csv(data)
+    elif name.endswith((".xlsx", ".xls")):
+        engine = "calamine" if HAS_CALAMINE else "default"
+        df = pd.read_excel(BytesIO(data), engine="calamine" if HAS_CALAMINE else None)
+    else:
+        raise ValueError("Only CSV or Excel files are allowed")
+
+    memory_before = frame_bytes(df)
+    if compact:
+        df = optimize_dtypes(df)
+
+    return df, ParseStats(
+        engine=engine,
+        seconds=time.perf_counter() - start,
+        bytes=len(data),
+        memory_before=memory_before,
+        memory_after=frame_bytes(df)
+    )
+
+
+def read_dataframe(data: bytes, filename: str, compact: bool = True) -> pd.DataFrame:
+    return parse_dataset(data, filename, compact)[0]
+
+
+def _read_csv(data: bytes) -> tuple[pd.DataFrame, str]:
+    if HAS_PYARROW:
+        try:
+            return _read_csv_arrow(data), "pyarrow"
+        except Exception:
+            # The pyarrow parser is stricter than the C one (ragged rows, odd quoting)
+            pass
+    return pd.read_csv(BytesIO(data)), "c"
+
+
+def _read_csv_arrow(data: bytes) -> pd.DataFrame:
+    """
+    pd.read_csv(engine="pyarrow") without its date inference: pyarrow turns
+    date and timestamp text into datetimes, which the C engine (and so the
+    chunked analysis of large files) leaves as text. Those columns are read
+    again as strings, so a file gets the same column types on either path.
+    """
+    table = pa_csv.read_csv(BytesIO(data))
+    if len(set(table.column_names)) != table.num_columns:
+        raise ValueError("duplicate column names")  # the C engine renames them
+
+    temporal = {f.name: pa.string() for f in table.schema if pa.types.is_temporal(f.type)}
+    if temporal:
+        table = pa_csv.read_csv(
+            BytesIO(data),
+            convert_options=pa_csv.ConvertOptions(column_types=temporal)
+        )
+
+    # All-empty columns are float64, as pandas reads them
+    schema = table.schema
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.float64()))
+    return table.cast(schema).to_pandas()
+
+
+# --------------------------------------------------
+# Columnar on-disk cache (Feather, memory-mapped)
+# --------------------------------------------------
+def cache_path(dataset_id: str) -> Path:
+    return DATASET_CACHE_DIR / f"{dataset_id}.feather"
+
+
+@traced("ingest.read_feather")
+def read_cached(dataset_id: str) -> tuple[pd.DataFrame, str, int] | None:
+    """
+    (df, file_name, memory as first parsed) from the Feather cache, or None on a miss.
+    The file is memory-mapped, so numeric columns without gaps are not copied.
+    """
+    path = cache_path(dataset_id)
+    if not HAS_PYARROW or not path.exists():
+        return None
+
+    try:
+        table = feather.read_table(str(path), memory_map=True)
+        df = table.to_pandas(split_blocks=True)
+    except Exception:
+        # Truncated or from an incompatible version: drop it and parse again
+        path.unlink(missing_ok=True)
+        return None
+
+    os.utime(path)  # recently used, evicted last
+    metadata = table.schema.metadata or {}
+    file_name = metadata.get(b"file_name", b"").decode("utf-8")
+    return df, file_name, int(metadata.get(b"memory_before", b"0"))
+
+
+@traced("ingest.write_feather")
+def write_cached(dataset_id: str, df: pd.DataFrame, file_name: str, memory_before: int = 0):
+    """
+    Stores df in the Feather cache. Frames Feather cannot hold (e.g. non-string
+    column names) are skipped; the cache is an optimization only.
+    """
+    if not HAS_PYARROW or not all(isinstance(c, str) for c in df.columns):
+        return
+
+    path = cache_path(dataset_id)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        DATASET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(df)
+        table = table.replace_schema_metadata({
+            **(table.schema.metadata or {}),
+            b"file_name": file_name.encode("utf-8"),
+            b"memory_before": str(memory_before).encode()
+        })
+        # Uncompressed so it can be memory-mapped on read
+        feather.write_feather(table, str(tmp), compression="uncompressed")
+        os.replace(tmp, path)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        return
+
+    _prune_cache()
+
+
+def _prune_cache():
+    files = sorted(DATASET_CACHE_DIR.glob("*.feather"), key=lambda p: p.stat().st_mtime)
+    total = sum(p.stat().st_size for p in files)
+    budget = DATASET_DISK_CACHE_MB * 1024 * 1024
+
+    for path in files[:-1]:
+        if total <= budget:
+            break
+        total -= path.stat().st_size
+        path.unlink(missing_ok=True)
+
+
+def load_dataset(
+    data: bytes,
+    filename: str,
+    dataset_id: str | None = None
+) -> tuple[str, pd.DataFrame, ParseStats]:
+    """
+    (dataset_id, df, stats) for an upload: from the Feather cache when this
+    content was parsed before, otherwise parsed and then cached.
+    Pass dataset_id if the content hash is already known.
+    """
+    dataset_id = dataset_id or content_hash(data)
+
+    start = time.perf_counter()
+    cached = read_cached(dataset_id)
+    if cached is not None:
+        df, _, memory_before = cached
+        memory_after = frame_bytes(df)
+        return dataset_id, df, ParseStats(
+            engine="feather cache",
+            seconds=time.perf_counter() - start,
+            bytes=len(data),
+            memory_before=memory_before or memory_after,
+            memory_after=memory_after
+        )
+
+    df, stats = parse_dataset(data, filename)
+    write_cached(dataset_id, df, filename, stats.memory_before)
+    return dataset_id, df, stats
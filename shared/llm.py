@@ -0,0 +1,410 @@
+# shared/llm.py
+# LLM client layer used by the backend and the Streamlit app.
+# Talks to a local Ollama-compatible HTTP server over a pooled keep-alive
+# session, and falls back to the `ollama run` CLI when no server is reachable.
+
+import codecs
+import json
+import os
+import subprocess
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gemma:2b")
+
+# How long Ollama keeps the model loaded after a request ("30m", "-1" = forever)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# "auto" (HTTP, then CLI), "http" or "cli"
+LLM_BACKEND = os.getenv("LLM_BACKEND", "auto")
+
+
+class LLMError(Exception):
+    """The model could not produce an answer. The message is user-facing."""
+
+
+class LLMUnavailable(LLMError):
+    """This client cannot reach a model at all; another client may."""
+
+
+class LLMCancelled(LLMError):
+    """A shared generation was stopped because every reader had gone."""
+
+
+# --------------------------------------------------
+# HTTP client (preferred)
+# --------------------------------------------------
+class OllamaHTTPClient:
+    """
+    Calls POST /api/generate on an Ollama-compatible server.
+    One requests.Session is reused for every call so TCP connections stay open.
+    """
+
+    def __init__(
+        self,
+        host: str = OLLAMA_HOST,
+        model: str = OLLAMA_MODEL,
+        keep_alive: str = OLLAMA_KEEP_ALIVE,
+        timeout: float = 300,
+        pool_size: int = 8
+    ):
+        self.host = host.rstrip("/")
+        self.model = model
+        self.keep_alive = keep_alive
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def generate(self, prompt: str) -> str:
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": False,
+            "keep_alive": self.keep_alive
+        }
+
+        try:
+            response = self.session.post(
+                f"{self.host}/api/generate",
+                json=payload,
+                timeout=(5, self.timeout)
+            )
+        except requests.ConnectionError:
+            raise LLMUnavailable(f"Ollama server is not reachable at {self.host}.")
+        except requests.Timeout:
+            raise LLMError("Ollama took too long to respond. Try again.")
+
+        if response.status_code != 200:
+            raise LLMError(f"Ollama error: {response.text}")
+
+        return response.json().get("response", "").strip()
+
+    def stream(self, prompt: str):
+        """
+        Yields response text as the model produces it.
+        Closing the generator early closes the connection, which stops generation.
+        """
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": self.keep_alive
+        }
+
+        try:
+            response = self.session.post(
+                f"{self.host}/api/generate",
+                json=payload,
+                stream=True,
+                timeout=(5, self.timeout)
+            )
+        except requests.ConnectionError:
+            raise LLMUnavailable(f"Ollama server is not reachable at {self.host}.")
+        except requests.Timeout:
+            raise LLMError("Ollama took too long to respond. Try again.")
+
+        try:
+            if response.status_code != 200:
+                raise LLMError(f"Ollama error: {response.text}")
+
+            # Ollama streams one JSON object per line
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get("error"):
+                    raise LLMError(f"Ollama error: {chunk['error']}")
+                if chunk.get("response"):
+                    yield chunk["response"]
+                if chunk.get("done"):
+                    break
+        except requests.Timeout:
+            raise LLMError("Ollama took too long to respond. Try again.")
+        finally:
+            response.close()
+
+
+# --------------------------------------------------
+# CLI client (fallback, Windows-safe)
+# --------------------------------------------------
+class OllamaCLIClient:
+    """
+    Runs `ollama run <model>` with the prompt on stdin.
+    Starts a new process per call, so it is only used when no server answers.
+    """
+
+    def __init__(self, model: str = OLLAMA_MODEL, timeout: float = 300):
+        self.model = model
+        self.timeout = timeout
+
+    def generate(self, prompt: str) -> str:
+        try:
+            result = subprocess.run(
+                ["ollama", "run", self.model],
+                input=prompt,              # 👈 prompt sent via stdin
+                capture_output=True,
+                text=True,
+                timeout=self.timeout
+            )
+        except FileNotFoundError:
+            raise LLMUnavailable("Ollama is not installed or not available in PATH.")
+        except subprocess.TimeoutExpired:
+            raise LLMError("Ollama took too long to respond. Try again.")
+
+        if result.returncode != 0:
+            raise LLMError(f"Ollama error: {result.stderr}")
+
+        return result.stdout.strip()
+
+    def stream(self, prompt: str):
+        """
+        Yields stdout as the CLI prints it.
+        The process is killed if the generator is closed early or times out.
+        """
+        try:
+            process = subprocess.Popen(
+                ["ollama", "run", self.model],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE
+            )
+        except FileNotFoundError:
+            raise LLMUnavailable("Ollama is not installed or not available in PATH.")
+
+        timer = threading.Timer(self.timeout, process.kill)
+        timer.start()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+        try:
+            process.stdin.write(prompt.encode("utf-8"))
+            process.stdin.close()
+
+            while True:
+                data = process.stdout.read1(1024)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+
+            tail = decoder.decode(b"", final=True)
+            if tail:
+                yield tail
+
+            process.wait()
+            if not timer.is_alive():
+                raise LLMError("Ollama took too long to respond. Try again.")
+            if process.returncode != 0:
+                stderr = process.stderr.read().decode("utf-8", errors="replace")
+                raise LLMError(f"Ollama error: {stderr}")
+        finally:
+            timer.cancel()
+            if process.poll() is None:
+                process.kill()
+                process.wait()
+            process.stdout.close()
+            process.stderr.close()
+
+
+class FallbackClient:
+    """Tries each client in order, moving on only when one is unavailable."""
+
+    def __init__(self, *clients):
+        self.clients = clients
+
+    def generate(self, prompt: str) -> str:
+        error = LLMUnavailable("No LLM client configured.")
+        for client in self.clients:
+            try:
+                return client.generate(prompt)
+            except LLMUnavailable as e:
+                error = e
+        raise error
+
+    def stream(self, prompt: str):
+        error = LLMUnavailable("No LLM client configured.")
+        for client in self.clients:
+            tokens = client.stream(prompt)
+            try:
+                # A client is only skipped if it fails before producing anything
+                try:
+                    first = next(tokens)
+                except StopIteration:
+                    return
+                except LLMUnavailable as e:
+                    error = e
+                    continue
+
+                yield first
+                yield from tokens
+                return
+            finally:
+                tokens.close()
+        raise error
+
+
+# --------------------------------------------------
+# Single-flight: identical prompts in flight share one generation
+# --------------------------------------------------
+class _Flight:
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.tokens: list[str] = []
+        self.result: str | None = None
+        self.error: Exception | None = None
+        self.done = False
+        self.readers = 0
+        self.cancelled = False
+
+
+class CoalescingClient:
+    """
+    Wraps an LLM client so that concurrent calls with a byte-identical prompt
+    wait on one generation instead of each starting their own.
+
+    stream(): the first caller starts a producer thread; every caller
+    (including late ones) replays the tokens produced so far, then follows
+    live. The generation stops early only when every reader has gone; a
+    caller arriving after that starts a new one.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._generating: dict[str, _Flight] = {}
+        self._streaming: dict[str, _Flight] = {}
+
+        self.calls = 0
+        self.coalesced = 0
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            flight = self._generating.get(prompt)
+            leader = flight is None
+            if leader:
+                flight = self._generating[prompt] = _Flight()
+                self.calls += 1
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight.result = self.client.generate(prompt)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._generating[prompt]
+                with flight.cond:
+                    flight.done = True
+                    flight.cond.notify_all()
+        else:
+            with flight.cond:
+                flight.cond.wait_for(lambda: flight.done)
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def stream(self, prompt: str):
+        with self._lock:
+            flight = self._streaming.get(prompt)
+            if flight is not None:
+                with flight.cond:
+                    if flight.cancelled:
+                        flight = None
+                    else:
+                        flight.readers += 1
+            if flight is None:
+                flight = self._streaming[prompt] = _Flight()
+                flight.readers = 1
+                self.calls += 1
+                threading.Thread(
+                    target=self._produce, args=(prompt, flight), name="llm-stream", daemon=True
+                ).start()
+            else:
+                self.coalesced += 1
+
+        position = 0
+        try:
+            while True:
+                with flight.cond:
+                    flight.cond.wait_for(lambda: position < len(flight.tokens) or flight.done)
+                    new = flight.tokens[position:]
+                    finished = flight.done
+                position += len(new)
+                yield from new
+                if finished and position >= len(flight.tokens):
+                    break
+            if flight.error is not None:
+                raise flight.error
+        finally:
+            with flight.cond:
+                flight.readers -= 1
+                cancel = flight.readers == 0 and not flight.done
+                if cancel:
+                    flight.cancelled = True
+            if cancel:
+                # Nobody may join it from now on, even before the producer notices
+                self._forget(prompt, flight)
+
+    def in_flight(self, prompt: str, stream: bool = False) -> bool:
+        """
+        True if a call for this prompt is running now, so a new one would
+        only wait on it (callers can skip their own concurrency limit).
+        """
+        with self._lock:
+            return prompt in (self._streaming if stream else self._generating)
+
+    def _produce(self, prompt: str, flight: _Flight):
+        tokens = self.client.stream(prompt)
+        try:
+            for token in tokens:
+                with flight.cond:
+                    if flight.cancelled:
+                        # Partial: must not look like a complete answer to anyone
+                        flight.error = LLMCancelled("The answer was cancelled before it finished.")
+                        break
+                    flight.tokens.append(token)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            tokens.close()
+            self._forget(prompt, flight)
+            with flight.cond:
+                flight.done = True
+                flight.cond.notify_all()
+
+    def _forget(self, prompt: str, flight: _Flight):
+        with self._lock:
+            if self._streaming.get(prompt) is flight:
+                del self._streaming[prompt]
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.calls + self.coalesced
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "coalesced_rate": round(self.coalesced / total, 3) if total else 0.0,
+                "in_flight": len(self._generating) + len(self._streaming)
+            }
+
+
+def make_client(timeout: float = 300, backend: str = LLM_BACKEND):
+    if backend == "http":
+        return OllamaHTTPClient(timeout=timeout)
+    if backend == "cli":
+        return OllamaCLIClient(timeout=timeout)
+    return FallbackClient(
+        OllamaHTTPClient(timeout=timeout),
+        OllamaCLIClient(timeout=timeout)
+    )
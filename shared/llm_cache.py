@@ -0,0 +1,177 @@
+# shared/llm_cache.py
+# Cache of LLM answers keyed on (model, normalized prompt, dataset fingerprint).
+# Memory tier: small LRU. Disk tier (optional): SQLite file with a TTL, so
+# answers survive restarts and can be shared by several worker processes.
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from shared.llm import OLLAMA_MODEL
+
+
+LLM_CACHE_ITEMS = int(os.getenv("LLM_CACHE_ITEMS", "256"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(24 * 3600)))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB")  # e.g. ".cache/llm_cache.sqlite"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """
+    Case, spacing and closing sentence punctuation do not change the answer
+    we want, so "Show trends?" and "show  trends" share one cache entry.
+    Everything else is kept: "price > 100" and "price < 100" differ.
+    """
+    return re.sub(r"[\s.?!,;:]+$", "", " ".join(prompt.casefold().split()))
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        max_items: int = LLM_CACHE_ITEMS,
+        ttl: float = LLM_CACHE_TTL,
+        db_path: str | None = LLM_CACHE_DB
+    ):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+            # Several workers may share the file: wait for their writes, readers never block
+            self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model: str, prompt: str, fingerprint: str = "") -> str:
+        raw = "\0".join([model, fingerprint, normalize_prompt(prompt)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None and now - item[0] <= self.ttl:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return item[1]
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning("Could not read the LLM answer cache: %s", e)
+                    row = None
+                if row is not None and now - row[1] <= self.ttl:
+                    self._remember(key, row[1], row[0])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, response: str):
+        """
+        Stores an answer. A failed disk write (e.g. the file stayed locked)
+        is logged and skipped: the caller already has its answer.
+        """
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, now, response)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)",
+                    (key, response, now)
+                )
+                self._db.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+                self._db.commit()
+            except sqlite3.Error as e:
+                self._db.rollback()
+                logger.warning("Could not write the LLM answer cache: %s", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk": self._db is not None
+            }
+
+    def _remember(self, key: str, created_at: float, response: str):
+        self._memory[key] = (created_at, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+
+
+class CachedClient:
+    """
+    Wraps an LLM client with a ResponseCache.
+    Only complete, successful answers are stored; errors always go to the model again.
+    """
+
+    def __init__(self, client, cache: ResponseCache, model: str = OLLAMA_MODEL):
+        self.client = client
+        self.cache = cache
+        self.model = model
+
+    def lookup(self, prompt: str, fingerprint: str = "") -> str | None:
+        """
+        The stored answer, or None. No model call, so servers can answer hits
+        before queueing for a model slot (then pass check_cache=False).
+        """
+        return self.cache.get(self.cache.key(self.model, prompt, fingerprint))
+
+    def generate(self, prompt: str, fingerprint: str = "", check_cache: bool = True) -> str:
+        key = self.cache.key(self.model, prompt, fingerprint)
+
+        answer = self.cache.get(key) if check_cache else None
+        if answer is not None:
+            return answer
+
+        answer = self.client.generate(prompt)
+        self.cache.put(key, answer)
+        return answer
+
+    def stream(self, prompt: str, fingerprint: str = "", check_cache: bool = True):
+        key = self.cache.key(self.model, prompt, fingerprint)
+
+        answer = self.cache.get(key) if check_cache else None
+        if answer is not None:
+            yield answer
+            return
+
+        # Nothing is stored if the consumer stops early or the model fails
+        parts = []
+        for token in self.client.stream(prompt):
+            parts.append(token)
+            yield token
+        self.cache.put(key, "".join(parts).strip())
@@ -0,0 +1,231 @@
+# shared/profiling.py
+# Opt-in per-request traces: named spans with wall time, CPU time and memory
+# change, nested by call structure. Helpers are wrapped with @traced; when no
+# trace is active a span costs one ContextVar lookup.
+#
+# A trace downloads as JSON or as collapsed stacks ("a;b;c 1234" lines, self
+# time in microseconds), which flamegraph.pl and speedscope read directly.
+
+import contextvars
+import functools
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager, nullcontext
+
+
+# Finished traces kept for download
+PROFILE_TRACES = int(os.getenv("PROFILE_TRACES", "50"))
+
+_TRACE: contextvars.ContextVar["Trace | None"] = contextvars.ContextVar("trace", default=None)
+_PARENT: contextvars.ContextVar["int | None"] = contextvars.ContextVar("span_parent", default=None)
+
+_NO_SPAN = nullcontext()
+
+try:
+    _PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024
+except (AttributeError, ValueError, OSError):
+    _PAGE_KB = None
+
+
+def rss_kb() -> int | None:
+    """
+    Resident memory of the process (Linux); None where /proc is missing.
+    Process-wide, so concurrent requests show up in each other's deltas.
+    """
+    if _PAGE_KB is None:
+        return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_KB
+    except OSError:
+        return None
+
+
+class _Span:
+    def __init__(self, trace: "Trace", name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self):
+        self.parent = _PARENT.get()
+        self.id = self.trace._next_id()
+        self._token = _PARENT.set(self.id)
+        self.thread = threading.get_ident()
+        self.rss = rss_kb()
+        self.cpu = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.start
+        # CPU time is per thread; a span that moved threads has none
+        cpu = time.thread_time() - self.cpu if threading.get_ident() == self.thread else None
+        rss = rss_kb()
+        _PARENT.reset(self._token)
+        self.trace._add({
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "start_ms": round((self.start - self.trace.start) * 1000, 3),
+            "wall_ms": round(wall * 1000, 3),
+            "cpu_ms": None if cpu is None else round(cpu * 1000, 3),
+            "rss_delta_kb": None if rss is None or self.rss is None else rss - self.rss,
+            "error": exc[0].__name__ if exc[0] else None
+        })
+        return False
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.spans: list[dict] = []
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._root: _Span | None = None
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def _next_id(self) -> int:
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def _add(self, span: dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+        root = next((span for span in spans if span["parent"] is None), None)
+        return {
+            "trace_id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "wall_ms": root["wall_ms"] if root else None,
+            "spans": spans
+        }
+
+    def collapsed(self) -> str:
+        """
+        One "root;child;grandchild self_us" line per distinct stack. Self
+        time is a span's wall time minus its children's (spans run in
+        parallel threads can exceed their parent, so it is floored at 0).
+        """
+        with self._lock:
+            spans = {span["id"]: span for span in self.spans}
+
+        children_ms: dict = {}
+        for span in spans.values():
+            if span["parent"] in spans:
+                children_ms[span["parent"]] = children_ms.get(span["parent"], 0.0) + span["wall_ms"]
+
+        stacks: dict[str, int] = {}
+        for span in spans.values():
+            path, node = [], span
+            while node is not None:
+                path.append(node["name"].replace(";", ",").replace(" ", "_"))
+                node = spans.get(node["parent"])
+            stack = ";".join(reversed(path))
+            self_us = max(span["wall_ms"] - children_ms.get(span["id"], 0.0), 0.0) * 1000
+            stacks[stack] = stacks.get(stack, 0) + round(self_us)
+
+        return "".join(f"{stack} {value}\n" for stack, value in stacks.items())
+
+
+# --------------------------------------------------
+# Instrumentation
+# --------------------------------------------------
+def span(name: str):
+    """
+    `with span("stage"):` times the block if a trace is active, else does nothing.
+    """
+    trace = _TRACE.get()
+    return _NO_SPAN if trace is None else trace.span(name)
+
+
+def traced(name: str):
+    """
+    Decorator: the function body becomes a span named `name` when traced.
+    """
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            trace = _TRACE.get()
+            if trace is None:
+                return fn(*args, **kwargs)
+            with trace.span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def start_trace(name: str) -> Trace:
+    """
+    Makes a new trace current for this context, with a root span `name`
+    that runs until finish_trace(). Use trace() when a with-block fits.
+    """
+    trace = Trace(name)
+    _TRACE.set(trace)
+    _PARENT.set(None)
+    trace._root = trace.span(name).__enter__()
+    return trace
+
+
+def finish_trace(trace: Trace):
+    if _TRACE.get() is trace:
+        trace._root.__exit__(None, None, None)
+        _TRACE.set(None)
+
+
+@contextmanager
+def trace(name: str):
+    token_trace = _TRACE.set(Trace(name))
+    token_parent = _PARENT.set(None)
+    current = _TRACE.get()
+    try:
+        with current.span(name):
+            yield current
+    finally:
+        _PARENT.reset(token_parent)
+        _TRACE.reset(token_trace)
+
+
+def current_trace() -> Trace | None:
+    return _TRACE.get()
+
+
+class TraceLog:
+    """
+    The most recent finished traces, by ID.
+    """
+
+    def __init__(self, max_items: int = PROFILE_TRACES):
+        self.max_items = max_items
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace):
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.max_items:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Trace | None:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self) -> list[dict]:
+        with self._lock:
+            traces = list(self._traces.values())
+        return [
+            {key: summary[key] for key in ("trace_id", "name", "started_at", "wall_ms")}
+            for summary in (trace.to_dict() for trace in reversed(traces))
+        ]
@@ -0,0 +1,27 @@
+# tests/conftest.py
+# Keeps the backend's Feather cache and job queue out of the real .cache
+# directory; must run before backend.main is imported.
+
+import os
+import tempfile
+
+import pytest
+
+_scratch = tempfile.mkdtemp(prefix="llm-data-analyst-tests-")
+os.environ.setdefault("DATASET_CACHE_DIR", os.path.join(_scratch, "datasets"))
+os.environ.setdefault("JOBS_DB", os.path.join(_scratch, "jobs.sqlite"))
+
+
+@pytest.fixture(scope="session")
+def api():
+    from fastapi.testclient import TestClient
+    from backend.main import app
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def sales_csv() -> bytes:
+    path = os.path.join(os.path.dirname(__file__), "..", "sample_data", "sales_data.csv")
+    with open(path, "rb") as f:
+        return f.read()
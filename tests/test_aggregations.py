@@ -0,0 +1,24 @@
+# tests/test_aggregations.py
+# Grouped splits and the counts the app caches in their place.
+
+import numpy as np
+import pandas as pd
+
+from shared.aggregations import group_sizes, split_groups
+from shared.downsample import stratified_quotas, stratified_sample
+
+
+def test_group_sizes_and_quotas_match_the_drawn_points():
+    rng = np.random.default_rng(3)
+    n = 20_000
+    keys = pd.Series(rng.choice(list("abcdefghijkl"), n, p=[0.5] + [0.5 / 11] * 11))
+    values = pd.DataFrame({"x": rng.normal(size=n), "y": rng.normal(size=n)})
+    values.loc[::9, "x"] = np.nan
+
+    groups = split_groups(keys, values, limit=10)
+    sizes = group_sizes(keys, values, limit=10)
+    assert sizes == [len(rows) for _, rows in groups]
+
+    sampled = stratified_sample(groups, budget=2000)
+    assert stratified_quotas(sizes, budget=2000) == [len(rows) for _, rows in sampled]
+    assert stratified_quotas([3, 4], budget=2000) == [3, 4]
@@ -0,0 +1,52 @@
+# tests/test_batch.py
+# Batch profiling output is strict NDJSON, from the API and the command line.
+
+import json
+import subprocess
+import sys
+
+from backend import batch
+
+ONE_ROW = b"price,qty\n9.5,3\n"
+
+
+def strict_lines(text: str) -> list[dict]:
+    def reject(constant):
+        raise ValueError(f"non-standard JSON constant {constant}")
+    return [json.loads(line, parse_constant=reject) for line in text.splitlines()]
+
+
+def test_json_line_replaces_non_finite_floats():
+    line = batch.json_line({"std": float("nan"), "max": [float("inf"), 1.5]})
+    assert strict_lines(line) == [{"std": None, "max": [None, 1.5]}]
+
+
+def test_analyze_many_lines_are_strict_json(api):
+    response = api.post("/analyze-many", files=[("files", ("one_row.csv", ONE_ROW))])
+    first, summary = strict_lines(response.text)
+    assert first["analysis"]["numeric_summary"]["price"]["std"] is None
+    assert summary["summary"]["files"] == 1
+
+
+def test_command_line_lines_are_strict_json(tmp_path, capsys):
+    (tmp_path / "one_row.csv").write_bytes(ONE_ROW)
+    assert batch.main([str(tmp_path), "--workers", "1"]) == 0
+    first, _ = strict_lines(capsys.readouterr().out)
+    assert first["analysis"]["numeric_summary"]["qty"]["std"] is None
+
+
+def test_app_shutdown_stops_the_worker_processes():
+    # In a fresh interpreter, so the session-wide app and pool are left alone
+    code = (
+        "import multiprocessing\n"
+        "from fastapi.testclient import TestClient\n"
+        "from backend.main import app\n"
+        "with TestClient(app) as client:\n"
+        "    client.post('/analyze-many', files=[('files', ('a.csv', b'x\\n1\\n'))])\n"
+        "    print(len(multiprocessing.active_children()))\n"
+        "print(len(multiprocessing.active_children()))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, timeout=120)
+    during, after = map(int, out.stdout.split())
+    assert during > 0
+    assert after == 0
@@ -0,0 +1,44 @@
+# tests/test_column_index.py
+# BM25 column search: which columns a question is about.
+
+import pandas as pd
+
+from shared.column_index import ColumnIndex, column_document, stem
+from shared.eda import logical_dtype
+
+
+def wide_dataset() -> tuple[dict, pd.DataFrame]:
+    df = pd.DataFrame({
+        "unit_price": [9.5, 3.0, 4.25],
+        "price_band": ["low", "low", "high"],
+        "quantity": [3, 1, 2],
+        "city": ["Paris", "Rome", "Paris"],
+        "order_date": ["2024-01-01", "2024-01-02", "2024-01-03"],
+        **{f"metric_{i}": [i, i, i] for i in range(40)},
+    })
+    analysis = {
+        "column_names": list(df.columns),
+        "data_types": {col: logical_dtype(dtype) for col, dtype in df.dtypes.items()},
+        "missing_values": {col: 0 for col in df.columns},
+    }
+    return analysis, df
+
+
+def test_exact_column_name_ranks_first():
+    analysis, df = wide_dataset()
+    index = ColumnIndex.from_analysis(analysis, df)
+    assert index.top_columns("What is the average unit price?")[0] == "unit_price"
+    assert index.top_columns("How does quantity change?")[0] == "quantity"
+    assert index.top_columns("trend of metric_17")[0] == "metric_17"
+
+
+def test_sample_values_and_plurals_find_columns():
+    analysis, df = wide_dataset()
+    index = ColumnIndex.from_analysis(analysis, df)
+    assert index.top_columns("sales in Rome")[0] == "city"
+    assert stem("prices") == "price" and stem("categories") == "category"
+
+
+def test_unrelated_questions_match_nothing():
+    index = ColumnIndex({"a": column_document("revenue", "float64")})
+    assert index.search("weather tomorrow") == []
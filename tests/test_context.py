@@ -0,0 +1,48 @@
+# tests/test_context.py
+# Question context stays within its token budget and keeps the asked-about columns.
+
+import pytest
+
+from shared.context import build_context, estimate_tokens, mentioned_columns, words
+
+
+def wide_analysis(n_columns: int = 300) -> dict:
+    columns = [f"sensor_{i}_reading" for i in range(n_columns)] + ["unit_price", "city"]
+    return {
+        "rows": 10_000,
+        "column_names": columns,
+        "missing_values": {col: (i % 7) * 10 for i, col in enumerate(columns)},
+        "data_types": {col: "object" if col == "city" else "float64" for col in columns},
+        "numeric_summary": {
+            col: {"count": 10_000.0, "mean": i * 1.5, "std": 2.0, "min": 0.0,
+                  "25%": 1.0, "50%": i * 1.0, "75%": 3.0, "max": 9.0}
+            for i, col in enumerate(columns) if col != "city"
+        },
+    }
+
+
+@pytest.mark.parametrize("budget", [64, 256, 1024])
+def test_context_fits_the_budget(budget):
+    text, info = build_context(wide_analysis(), "What is the average unit price by city?", budget=budget)
+    assert estimate_tokens(text) <= budget
+    assert info["context_tokens"] == estimate_tokens(text)
+    assert info["facts_dropped"] > 0
+
+
+def test_asked_columns_are_kept_first():
+    question = "What is the average unit price by city?"
+    text, _ = build_context(wide_analysis(), question, budget=128)
+    lines = text.splitlines()
+    assert lines[1] == "Columns relevant to the question:"
+    assert lines[2].startswith("- unit_price (float64): mean")
+    assert any(line.startswith("- city (object)") for line in lines[2:4])
+
+
+def test_explicit_relevant_columns_override_name_matching():
+    text, _ = build_context(wide_analysis(), "anything", budget=128, relevant=["sensor_42_reading"])
+    assert "- sensor_42_reading (float64)" in text
+
+
+def test_mentioned_columns_match_name_words():
+    assert words("unitPrice and Unit_Price") == ["unit", "price", "and", "unit", "price"]
+    assert mentioned_columns("unit price per city", ["unit_price", "city", "price_band"]) == ["unit_price", "city"]
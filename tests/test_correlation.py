@@ -0,0 +1,49 @@
+# tests/test_correlation.py
+# The float32 blocked correlation engine against pandas.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared import correlation
+from shared.correlation import correlation_matrix, top_pairs
+
+
+def wide_frame(n: int = 3_000, gaps: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(4)
+    base = rng.normal(size=n)
+    df = pd.DataFrame({
+        "a": base * 1e6 + 5e8,  # large offset: float32 sums would cancel without centering
+        "b": base + rng.normal(scale=0.5, size=n),
+        "c": -base + rng.normal(scale=2.0, size=n),
+        "d": rng.normal(size=n),
+        "const": np.full(n, 3.0),
+        "empty": np.full(n, np.nan),
+    })
+    if gaps:
+        df.loc[::5, "b"] = np.nan
+        df.loc[1::7, "c"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("gaps", [False, True])
+def test_matches_pandas_in_blocks(monkeypatch, gaps):
+    monkeypatch.setattr(correlation, "CORR_BLOCK_ROWS", 512)  # several blocks
+    df = wide_frame(gaps=gaps)
+    pd.testing.assert_frame_equal(correlation_matrix(df), df.corr(), atol=1e-5, check_exact=False)
+
+
+def test_undefined_columns_are_nan():
+    corr = correlation_matrix(wide_frame())
+    assert corr[["const", "empty"]].isna().all().all()
+    assert corr.loc["a", "a"] == 1.0
+
+
+def test_top_pairs_ranks_by_absolute_value():
+    corr = correlation_matrix(wide_frame(gaps=False))
+    upper = corr.where(np.triu(np.ones(corr.shape, dtype=bool), k=1)).stack()
+    expected = upper.abs().sort_values(ascending=False).head(3)
+
+    pairs = top_pairs(corr, k=3)
+    assert list(zip(pairs["Variable 1"], pairs["Variable 2"])) == list(expected.index)
+    assert pairs["Correlation"].tolist() == pytest.approx(upper[expected.index].tolist())
@@ -0,0 +1,84 @@
+# tests/test_dataset_pool.py
+# One shared copy per dataset; leases pin it only while sessions use it.
+
+import gc
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from shared.dataset_pool import DatasetPool
+
+
+def sample_csv(seed: int) -> bytes:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "a": rng.integers(0, 9, 5000),
+        "b": rng.random(5000),
+        "c": rng.choice(list("xyz"), 5000),
+    }).to_csv(index=False).encode()
+
+
+def test_sessions_share_one_read_only_copy():
+    pool = DatasetPool()
+    data = sample_csv(1)
+    leases = []
+    threads = [threading.Thread(target=lambda: leases.append(pool.acquire(data, "a.csv"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # One copy of the data behind every session's frame
+    first = leases[0].frame()["b"].to_numpy()
+    assert all(np.shares_memory(first, lease.frame()["b"].to_numpy()) for lease in leases)
+    assert pool.stats()["datasets"] == 1
+    assert pool.stats()["leases"] == 8
+    assert not first.flags.writeable
+
+
+def test_a_session_changing_its_frame_does_not_change_the_pool():
+    pool = DatasetPool()
+    data = sample_csv(4)
+    mine, other = pool.acquire(data, "a.csv"), pool.acquire(data, "a.csv")
+    before = other.frame().copy()
+
+    df = mine.frame()
+    df.loc[0, "a"] = 99
+    df["b"] *= 2
+    df["new"] = 1
+    df.drop(columns="c", inplace=True)
+    mine.release()
+
+    pd.testing.assert_frame_equal(other.frame(), before)
+    pd.testing.assert_frame_equal(pool.acquire(data, "a.csv").frame(), before)
+
+
+def test_returned_leases_unpin_the_dataset():
+    pool = DatasetPool(max_bytes=0)
+    data = sample_csv(2)
+    kept, dropped = pool.acquire(data, "a.csv"), pool.acquire(data, "a.csv")
+
+    dropped.release()
+    assert dropped.frame() is None
+    assert pool.stats()["datasets"] == 1  # still leased by `kept`
+
+    del kept  # the session's state was dropped
+    gc.collect()
+    assert pool.stats() == {**pool.stats(), "datasets": 0, "leases": 0, "bytes": 0}
+
+
+def test_idle_leases_expire():
+    pool = DatasetPool(lease_idle=0.05)
+    idle, active = pool.acquire(sample_csv(3), "idle.csv"), pool.acquire(sample_csv(4), "active.csv")
+
+    time.sleep(0.1)
+    assert active.frame() is not None  # any session's rerun reaps idle leases
+    assert idle.released and idle.frame() is None
+    assert not active.released
+    assert pool.stats()["leases"] == 1
+
+    # A returning session acquires its file again
+    again = pool.acquire(sample_csv(3), "idle.csv")
+    assert again.frame() is not None
@@ -0,0 +1,54 @@
+# tests/test_downsample.py
+# Chart downsampling keeps the shape (endpoints, peaks) within the point budget.
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.downsample import downsample, lttb, minmax_envelope
+
+
+def spiky_series(n: int = 50_000) -> np.ndarray:
+    rng = np.random.default_rng(5)
+    y = np.sin(np.linspace(0, 20, n)) + rng.normal(scale=0.1, size=n)
+    y[12_345] = 40.0   # single-row spike
+    y[33_333] = -40.0  # single-row dip
+    return y
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    y = spiky_series()
+    picked = lttb(y, 500)
+    assert len(picked) == 500
+    assert picked[0] == 0 and picked[-1] == len(y) - 1
+    assert np.all(np.diff(picked) > 0)
+    assert {12_345, 33_333} <= set(picked.tolist())
+
+
+def test_minmax_keeps_endpoints_and_every_extreme():
+    y = spiky_series()
+    picked = minmax_envelope(y, 200)
+    assert len(picked) <= 2 * 200 + 2
+    assert picked[0] == 0 and picked[-1] == len(y) - 1
+    assert y[picked].max() == y.max() and y[picked].min() == y.min()
+
+
+def test_minmax_ignores_missing_values():
+    y = spiky_series()
+    y[::3] = np.nan
+    picked = minmax_envelope(y, 100)
+    assert np.nanmax(y[picked]) == np.nanmax(y)
+    assert np.nanmin(y[picked]) == np.nanmin(y)
+
+
+@pytest.mark.parametrize("method", ["lttb", "minmax"])
+def test_downsample_stays_within_budget(method):
+    y = spiky_series()
+    frame = pd.DataFrame({"a": y, "b": -y[::-1]}, index=pd.RangeIndex(100, 100 + len(y)))
+    out = downsample(frame, budget=1_000, method=method)
+
+    assert len(out) <= 1_000
+    assert out.index[0] == frame.index[0] and out.index[-1] == frame.index[-1]
+    assert out["a"].max() == 40.0 and out["b"].min() == -40.0
+    # Small inputs come back untouched
+    assert len(downsample(frame.head(10), budget=1_000, method=method)) == 10
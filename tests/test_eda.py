@@ -0,0 +1,68 @@
+# tests/test_eda.py
+# In-memory and streamed analyses of the same file must agree.
+
+import numpy as np
+import pandas as pd
+
+
+def sample_csv() -> bytes:
+    rng = np.random.default_rng(1)
+    n = 500
+    return pd.DataFrame({
+        "small_int": rng.integers(0, 50, n),
+        "gappy_int": np.where(rng.random(n) < 0.2, np.nan, rng.integers(0, 9, n)),
+        "price": rng.random(n) * 100,
+        "city": rng.choice(["Paris", "Rome"], n),
+        "note": [f"row {i}" for i in range(n)],
+        "flag": rng.random(n) < 0.5,
+    }).to_csv(index=False).encode()
+
+
+def test_memory_and_streaming_report_the_same_types(api):
+    data = sample_csv()
+    upload = api.post("/analyze", files={"file": ("types.csv", data)}, data={"mode": "memory"}).json()
+    streamed = api.post("/analyze", files={"file": ("types.csv", data)}, data={"mode": "streaming"}).json()
+
+    assert upload["data_types"] == streamed["data_types"] == {
+        "small_int": "int64",
+        "gappy_int": "float64",
+        "price": "float64",
+        "city": "object",
+        "note": "object",
+        "flag": "bool",
+    }
+    assert upload["numeric_summary"].keys() == streamed["numeric_summary"].keys()
+
+
+def test_timestamp_columns_are_text_on_both_paths(api):
+    data = (
+        b"ts,day,city,amount\n"
+        b"2024-01-01 10:00:00,2024-01-01,Paris,10\n"
+        b"2024-01-02 11:30:00,2024-01-02,Rome,20\n"
+        b"2024-01-03 09:15:00,2024-01-03,Paris,30\n"
+    )
+    upload = api.post("/analyze", files={"file": ("dates.csv", data)}, data={"mode": "memory"})
+    streamed = api.post("/analyze", files={"file": ("dates.csv", data)}, data={"mode": "streaming"})
+    assert upload.status_code == streamed.status_code == 200
+
+    upload, streamed = upload.json(), streamed.json()
+    assert upload["data_types"] == streamed["data_types"] == {
+        "ts": "object", "day": "object", "city": "object", "amount": "int64"
+    }
+    assert upload["numeric_summary"] == streamed["numeric_summary"]
+    assert list(upload["numeric_summary"]) == ["amount"]
+
+
+def test_single_row_summary_is_valid_json(api):
+    # The std of one value is NaN, which JSON cannot hold
+    response = api.post("/analyze", files={"file": ("one.csv", b"a,b\n1,x\n")}, data={"mode": "memory"})
+    assert response.status_code == 200
+    assert response.json()["numeric_summary"]["a"]["std"] is None
+
+
+def test_auto_summary_is_exact_below_the_row_threshold():
+    from shared.eda import APPROX_SUMMARY_ROWS, describe_numeric
+
+    df = pd.DataFrame({"x": np.random.default_rng(2).normal(size=5_000)})
+    assert len(df) <= APPROX_SUMMARY_ROWS
+    pd.testing.assert_frame_equal(describe_numeric(df, mode="auto"), df.describe())
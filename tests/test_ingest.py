@@ -0,0 +1,43 @@
+# tests/test_ingest.py
+# Parsing and dtype compaction: smaller frames, same values, same stats.
+
+import numpy as np
+import pandas as pd
+
+from shared import ingest
+from shared.ingest import optimize_dtypes, parse_dataset
+
+
+def sample_csv() -> bytes:
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        "id": np.arange(n),
+        "qty": np.where(rng.random(n) < 0.1, np.nan, 1_500_000 + rng.integers(0, 1000, n)),
+        "price": rng.random(n) * 100,
+        "city": rng.choice(["Paris", "Rome", "Oslo"], n),
+    }).to_csv(index=False).encode()
+
+
+def test_compaction_reports_memory_and_keeps_stats():
+    data = sample_csv()
+    df, stats = parse_dataset(data, "sales.csv")
+    raw, _ = parse_dataset(data, "sales.csv", compact=False)
+
+    assert stats.memory_after < stats.memory_before
+    assert str(df["id"].dtype) == "int16"
+    assert isinstance(df["city"].dtype, pd.CategoricalDtype)
+    # Floats stay float64 by default, so stats are exactly those of the raw frame
+    assert df["qty"].dtype == np.float64
+    assert df.describe().equals(raw.describe())
+
+
+def test_float_downcast_is_opt_in_and_lossless(monkeypatch):
+    monkeypatch.setattr(ingest, "DOWNCAST_FLOATS", True)
+    df = pd.DataFrame({"half": [0.5, 1.0, np.nan], "tenth": [0.1, 0.2, 0.3], "huge": [1e300, 0.0, 1.0]})
+    out = optimize_dtypes(df)
+
+    assert out["half"].dtype == np.float32
+    assert out["tenth"].dtype == np.float64  # 0.1 is not exact in float32
+    assert out["huge"].dtype == np.float64
+    assert np.array_equal(out["half"].to_numpy(np.float64), df["half"].to_numpy(), equal_nan=True)
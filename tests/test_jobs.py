@@ -0,0 +1,71 @@
+# tests/test_jobs.py
+# Background jobs: started with the app, and limited like HTTP LLM calls.
+
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from backend import main
+
+
+class CountingLLM:
+    """Records how many generations run at the same time."""
+
+    def __init__(self):
+        self.running = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, prompt: str, fingerprint: str = ""):
+        return None
+
+    def generate(self, prompt: str, fingerprint: str = "", check_cache: bool = True) -> str:
+        with self._lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(0.05)
+        with self._lock:
+            self.running -= 1
+        return f"answer to {prompt}"
+
+
+def test_queue_is_started_by_the_app_not_the_import(api, tmp_path):
+    db = tmp_path / "jobs.sqlite"
+    env = {**os.environ, "JOBS_DB": str(db)}
+    code = "import threading, backend.main as m; print(m.JOBS, threading.active_count())"
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True).stdout
+    assert out.split()[0] == "None"
+    assert not db.exists()
+
+    # `api` ran the lifespan, which started the workers
+    assert len(main.JOBS._threads) == main.JOBS.workers
+
+
+def test_jobs_share_the_llm_limit(api, monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(main, "LLM", llm)
+    limit = main.LLM_LIMITER.max_in_flight
+    assert main.JOBS.workers + limit > limit  # jobs could exceed it on their own
+
+    dataset_id = api.post("/upload", files={"file": ("jobs.csv", b"a,b\n1,2\n3,4\n")}).json()["dataset_id"]
+
+    # HTTP calls and jobs at once
+    jobs = [
+        api.post("/jobs/ask-question", json={"question": f"q{i}", "dataset_id": dataset_id}).json()["job_id"]
+        for i in range(4)
+    ]
+    threads = [
+        threading.Thread(target=api.post, args=("/ask-question",), kwargs={"json": {"question": f"h{i}", "dataset_id": dataset_id}})
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for job_id in jobs:
+        job = api.get(f"/jobs/{job_id}", params={"wait": 10}).json()
+        assert job["status"] == "done", job
+    assert llm.peak <= limit
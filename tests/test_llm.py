@@ -0,0 +1,208 @@
+# tests/test_llm.py
+# LLM client layer: the Ollama HTTP client against a local stub server,
+# HTTP -> CLI fallback, and request coalescing.
+
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from shared.llm import (
+    CoalescingClient,
+    FallbackClient,
+    LLMError,
+    LLMUnavailable,
+    OllamaHTTPClient
+)
+from shared.llm_cache import CachedClient, ResponseCache
+
+
+# --------------------------------------------------
+# Stub Ollama server: the prompt picks the behaviour
+# --------------------------------------------------
+class StubOllama(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests: list[dict] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubOllama.requests.append({"path": self.path, **body})
+        prompt = body["prompt"]
+
+        if prompt == "status-error":
+            self._send(500, b"model not found", "text/plain")
+        elif not body["stream"]:
+            self._send(200, json.dumps({"response": f" echo: {prompt} ", "done": True}).encode())
+        elif prompt == "chunk-error":
+            self._stream([{"response": "partial"}, {"error": "out of memory"}])
+        else:
+            # Anything after the done chunk must be ignored
+            self._stream([
+                {"response": "Hello"}, {"response": ""}, {"response": " world"},
+                {"response": "", "done": True}, {"response": " ignored"}
+            ])
+
+    def _send(self, status: int, body: bytes, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, chunks: list[dict]):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for chunk in chunks:
+            line = json.dumps(chunk).encode() + b"\n"
+            self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.write(b"0\r\n\r\n")
+
+
+@pytest.fixture
+def ollama():
+    StubOllama.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOllama)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def unused_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class EchoCLI:
+    """Stands in for OllamaCLIClient, which needs the ollama binary."""
+
+    def generate(self, prompt: str) -> str:
+        return f"cli: {prompt}"
+
+    def stream(self, prompt: str):
+        yield "cli: "
+        yield prompt
+
+
+# --------------------------------------------------
+# HTTP client
+# --------------------------------------------------
+def test_generate(ollama):
+    client = OllamaHTTPClient(host=ollama, model="stub", keep_alive="5m")
+    assert client.generate("hi") == "echo: hi"
+    request = StubOllama.requests[0]
+    assert request["path"] == "/api/generate"
+    assert (request["model"], request["stream"], request["keep_alive"]) == ("stub", False, "5m")
+
+
+def test_stream_stops_at_done_chunk(ollama):
+    client = OllamaHTTPClient(host=ollama)
+    assert list(client.stream("hi")) == ["Hello", " world"]
+    assert StubOllama.requests[0]["stream"] is True
+
+
+def test_non_200_is_an_error(ollama):
+    client = OllamaHTTPClient(host=ollama)
+    with pytest.raises(LLMError, match="model not found"):
+        client.generate("status-error")
+    with pytest.raises(LLMError, match="model not found"):
+        list(client.stream("status-error"))
+
+
+def test_error_chunk_ends_the_stream(ollama):
+    tokens = OllamaHTTPClient(host=ollama).stream("chunk-error")
+    assert next(tokens) == "partial"
+    with pytest.raises(LLMError, match="out of memory"):
+        next(tokens)
+
+
+def test_unreachable_server_is_unavailable():
+    client = OllamaHTTPClient(host=f"http://127.0.0.1:{unused_port()}")
+    with pytest.raises(LLMUnavailable):
+        client.generate("hi")
+    with pytest.raises(LLMUnavailable):
+        list(client.stream("hi"))
+
+
+# --------------------------------------------------
+# Fallback
+# --------------------------------------------------
+def test_falls_back_to_cli_when_server_is_down():
+    client = FallbackClient(OllamaHTTPClient(host=f"http://127.0.0.1:{unused_port()}"), EchoCLI())
+    assert client.generate("hi") == "cli: hi"
+    assert "".join(client.stream("hi")) == "cli: hi"
+
+
+def test_server_errors_do_not_fall_back(ollama):
+    # The server answered, so its error is the answer; the CLI is not tried
+    client = FallbackClient(OllamaHTTPClient(host=ollama), EchoCLI())
+    with pytest.raises(LLMError, match="model not found"):
+        client.generate("status-error")
+    assert "".join(client.stream("hi")) == "Hello world"
+
+
+# --------------------------------------------------
+# Coalescing
+# --------------------------------------------------
+
+
+class SlowClient:
+    """Streams "t0 " .. "t4 " with a pause per token; counts calls."""
+
+    def __init__(self, tokens: int = 5, delay: float = 0.02):
+        self.tokens = tokens
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay * self.tokens)
+        return "".join(f"t{i} " for i in range(self.tokens)).strip()
+
+    def stream(self, prompt: str):
+        with self._lock:
+            self.calls += 1
+        for i in range(self.tokens):
+            time.sleep(self.delay)
+            yield f"t{i} "
+
+
+def test_concurrent_generate_shares_one_call():
+    slow = SlowClient()
+    client = CoalescingClient(slow)
+    answers = []
+    threads = [threading.Thread(target=lambda: answers.append(client.generate("q"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert answers == ["t0 t1 t2 t3 t4"] * 8
+    assert slow.calls == 1
+
+
+def test_stream_rejoined_after_cancel_is_complete():
+    slow = SlowClient()
+    cache = ResponseCache(db_path=None)
+    client = CachedClient(CoalescingClient(slow), cache)
+
+    # The only reader leaves early (a Streamlit rerun), cancelling the generation
+    first = client.stream("q")
+    assert next(first) == "t0 "
+    first.close()
+
+    # Same prompt right away: must get a full answer from a new generation
+    assert "".join(client.stream("q")) == "t0 t1 t2 t3 t4 "
+    assert slow.calls == 2
+    assert cache.get(cache.key(client.model, "q")) == "t0 t1 t2 t3 t4"
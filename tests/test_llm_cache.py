@@ -0,0 +1,62 @@
+# tests/test_llm_cache.py
+# Answer cache: which prompts may share an answer, and the SQLite disk tier.
+
+import asyncio
+import sqlite3
+
+from shared.llm_cache import ResponseCache, normalize_prompt
+
+
+def test_case_spacing_and_closing_punctuation_are_ignored():
+    assert normalize_prompt("Show  TRENDS?") == normalize_prompt("show trends")
+    assert normalize_prompt("  What is the mean ?! \n") == "what is the mean"
+
+
+def test_operators_signs_and_symbols_are_kept():
+    pairs = [
+        ("price > 100", "price < 100"),
+        ("growth of -5%", "growth of 5%"),
+        ("sales in $", "sales in €"),
+        ("a/b ratio", "a*b ratio"),
+    ]
+    for first, second in pairs:
+        assert ResponseCache.key("m", first) != ResponseCache.key("m", second)
+
+
+def test_disk_tier_is_shared_and_failures_are_not_fatal(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    first, second = ResponseCache(db_path=path), ResponseCache(db_path=path)
+    key = ResponseCache.key("m", "q")
+    first.put(key, "answer")
+    assert second.get(key) == "answer"
+
+    class LockedDB:
+        def execute(self, *args):
+            raise sqlite3.OperationalError("database is locked")
+
+        def rollback(self):
+            pass
+
+    second._db = LockedDB()
+    second.put(key, "new answer")  # logged, not raised
+    assert second.get(key) == "new answer"  # still served from memory
+    assert second.get(ResponseCache.key("m", "other")) is None
+
+
+def test_cached_answers_skip_a_full_llm_queue(monkeypatch):
+    from backend import main
+    from backend.concurrency import LLMLimiter
+
+    full = LLMLimiter(max_in_flight=1, max_queue=0)
+    full.in_flight = 1  # any caller that needs a slot gets LLMQueueFull
+    monkeypatch.setattr(main, "LLM_LIMITER", full)
+
+    prompt = "What drives revenue in this cached test?"
+    main.LLM_CACHE.put(main.LLM_CACHE.key(main.LLM.model, prompt, "ds-cached"), "Price.")
+
+    async def ask_both():
+        answer = await main.ask_llm(prompt, "ds-cached")
+        streamed = [token async for token in main.stream_llm(prompt, "ds-cached")]
+        return answer, streamed
+
+    assert asyncio.run(ask_both()) == ("Price.", ["Price."])
@@ -0,0 +1,75 @@
+# tests/test_metrics.py
+# Prometheus text exposition from backend/metrics.py and the /metrics endpoint.
+
+from backend.metrics import Registry
+
+
+def test_render_text_format():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests handled", labels=("route",))
+    in_flight = registry.gauge("in_flight", "Requests running")
+    requests.inc(route="/a")
+    requests.inc(2, route='/b"c')
+    in_flight.inc()
+    in_flight.dec()
+
+    assert registry.render() == (
+        "# HELP requests_total Requests handled\n"
+        "# TYPE requests_total counter\n"
+        'requests_total{route="/a"} 1\n'
+        'requests_total{route="/b\\"c"} 2\n'
+        "# HELP in_flight Requests running\n"
+        "# TYPE in_flight gauge\n"
+        "in_flight 0\n"
+    )
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    seconds = registry.histogram("took_seconds", "Time taken", (0.1, 1), labels=("mode",))
+    for value in (0.05, 0.1, 0.5, 3):
+        seconds.observe(value, mode="x")
+
+    lines = registry.render().splitlines()
+    assert lines[2:] == [
+        'took_seconds_bucket{mode="x",le="0.1"} 2',
+        'took_seconds_bucket{mode="x",le="1"} 3',
+        'took_seconds_bucket{mode="x",le="+Inf"} 4',
+        'took_seconds_sum{mode="x"} 3.65',
+        'took_seconds_count{mode="x"} 4',
+    ]
+
+
+def test_metrics_endpoint_reports_route_latency(api, sales_csv):
+    response = api.post("/analyze", files={"file": ("sales.csv", sales_csv)})
+    assert response.status_code == 200
+
+    scrape = api.get("/metrics")
+    assert scrape.status_code == 200
+    assert scrape.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    count = next(
+        line for line in scrape.text.splitlines()
+        if line.startswith('http_request_duration_seconds_count{method="POST",route="/analyze",status="200"}')
+    )
+    assert int(count.split()[-1]) >= 1
+    assert 'dataset_parse_seconds_count{format="csv"' in scrape.text
+    assert 'eda_seconds_count{mode="memory"}' in scrape.text
+
+
+def test_cache_hits_are_counted_but_not_timed():
+    import asyncio
+
+    from backend import main, metrics
+
+    def generations():
+        return sum(state[-2] for state in metrics.LLM_SECONDS._values.values())
+
+    prompt = "Which metric test question is cached?"
+    main.LLM_CACHE.put(main.LLM_CACHE.key(main.LLM.model, prompt, "ds-metrics"), "This one.")
+    hits = metrics.LLM_ANSWERS._values.get(("generate", "cache_hit"), 0)
+    timed = generations()
+
+    assert asyncio.run(main.ask_llm(prompt, "ds-metrics")) == "This one."
+    assert metrics.LLM_ANSWERS._values[("generate", "cache_hit")] == hits + 1
+    assert generations() == timed
@@ -0,0 +1,19 @@
+# tests/test_questions.py
+# Questions are always about the caller's own dataset.
+
+import pytest
+
+
+@pytest.mark.parametrize("path", ["/ask-question", "/ask-question/stream", "/jobs/ask-question"])
+def test_dataset_id_is_required(api, sales_csv, path):
+    # Another user's upload must never be picked up as "the latest dataset"
+    api.post("/analyze", files={"file": ("someone_else.csv", sales_csv)})
+
+    response = api.post(path, json={"question": "What are the trends?"})
+    assert response.status_code == 400
+    assert "dataset_id" in response.json()["error"]
+
+
+def test_unknown_dataset_id(api):
+    response = api.post("/ask-question", json={"question": "Trends?", "dataset_id": "nope"})
+    assert "Unknown dataset_id" in response.json()["error"]
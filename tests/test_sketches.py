@@ -0,0 +1,46 @@
+# tests/test_sketches.py
+# Accuracy of the KLL quantile sketch behind approximate and streamed summaries.
+
+import numpy as np
+import pytest
+
+from shared.sketches import KLLSketch
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def rank_error(sorted_values: np.ndarray, estimates) -> float:
+    # How far each estimate's rank range lies from the requested quantile
+    lo = np.searchsorted(sorted_values, estimates, side="left") / len(sorted_values)
+    hi = np.searchsorted(sorted_values, estimates, side="right") / len(sorted_values)
+    return float(np.maximum(0, np.maximum(lo - QS, QS - hi)).max())
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_rank_error_within_target_on_1e5_values(seed):
+    rng = np.random.default_rng(seed)
+    values = rng.lognormal(size=100_000)
+
+    sketch = KLLSketch.for_error(0.01, seed=seed)
+    for chunk in np.array_split(values, 7):
+        sketch.update(chunk)
+    assert rank_error(np.sort(values), sketch.quantiles(QS)) <= 0.01
+
+
+def test_merged_sketches_keep_the_error_bound():
+    rng = np.random.default_rng(7)
+    values = rng.normal(size=100_000)
+
+    merged = KLLSketch.for_error(0.01)
+    for part in np.array_split(values, 4):
+        sketch = KLLSketch.for_error(0.01)
+        sketch.update(part)
+        merged.merge(KLLSketch.from_dict(sketch.to_dict()))
+    assert rank_error(np.sort(values), merged.quantiles(QS)) <= 0.01
+
+
+def test_exact_up_to_k_values():
+    values = np.random.default_rng(1).normal(size=300)
+    sketch = KLLSketch(k=300)
+    sketch.update(values)
+    assert sketch.quantiles(QS) == pytest.approx(np.quantile(values, QS))
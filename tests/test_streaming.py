@@ -0,0 +1,56 @@
+# tests/test_streaming.py
+# A client that disconnects mid-stream must always release the upstream generation.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import main
+
+
+class SlowTokens:
+    """Token iterator whose second next() is slow; records how it was closed."""
+
+    def __init__(self):
+        self.sent = 0
+        self.busy = False
+        self.closed = threading.Event()
+        self.closed_while_busy = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.busy = True
+        try:
+            if self.sent:
+                time.sleep(0.3)
+            self.sent += 1
+            return f"t{self.sent} "
+        finally:
+            self.busy = False
+
+    def close(self):
+        self.closed_while_busy = self.busy
+        self.closed.set()
+
+
+def test_disconnect_during_next_closes_the_stream(monkeypatch):
+    tokens = SlowTokens()
+    monkeypatch.setattr(main, "stream_ollama", lambda prompt, fingerprint="", check_cache=True: tokens)
+
+    async def disconnect_mid_token():
+        stream = main.stream_llm("disconnect test prompt")
+        assert await stream.__anext__() == "t1 "
+        pending = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0.05)  # the slow next() is now running on a worker
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(disconnect_mid_token())
+
+    assert tokens.closed.wait(2)
+    assert not tokens.closed_while_busy